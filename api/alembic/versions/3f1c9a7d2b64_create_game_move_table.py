@@ -0,0 +1,36 @@
+"""Create game_move table
+
+Revision ID: 3f1c9a7d2b64
+Revises: ee342012a985
+Create Date: 2026-10-19 16:40:12.501943
+
+"""
+from alembic import op
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a7d2b64"
+down_revision = "ee342012a985"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "game_move",
+        sqlalchemy.Column(
+            "game_id",
+            sqlalchemy.BigInteger,
+            sqlalchemy.ForeignKey("game.game_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sqlalchemy.Column("ply", sqlalchemy.Integer, primary_key=True),
+        sqlalchemy.Column("move", sqlalchemy.Integer, nullable=False),
+        sqlalchemy.Column("position_hash", sqlalchemy.BigInteger, nullable=False),
+        sqlalchemy.Column("played_at", sqlalchemy.DateTime, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("game_move")
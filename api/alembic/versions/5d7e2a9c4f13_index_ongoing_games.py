@@ -0,0 +1,50 @@
+"""Index the ongoing games by player and the open games
+
+Revision ID: 5d7e2a9c4f13
+Revises: 8b2e4d61c0fa
+Create Date: 2026-10-19 17:05:21.804127
+
+"""
+from alembic import op
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "5d7e2a9c4f13"
+down_revision = "8b2e4d61c0fa"
+branch_labels = None
+depends_on = None
+
+# the same predicates as api.models.game.Game.ongoing
+ONGOING = sqlalchemy.text("is_ongoing = true")
+OPEN = sqlalchemy.text("is_ongoing = true AND player_two_id = 0")
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_game_ongoing_player_one",
+        "game",
+        ["player_one_id", "game_id"],
+        postgresql_where=ONGOING,
+        sqlite_where=ONGOING,
+    )
+    op.create_index(
+        "ix_game_ongoing_player_two",
+        "game",
+        ["player_two_id", "game_id"],
+        postgresql_where=ONGOING,
+        sqlite_where=ONGOING,
+    )
+    op.create_index(
+        "ix_game_open",
+        "game",
+        ["game_id"],
+        postgresql_where=OPEN,
+        sqlite_where=OPEN,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_game_open", "game")
+    op.drop_index("ix_game_ongoing_player_two", "game")
+    op.drop_index("ix_game_ongoing_player_one", "game")
@@ -0,0 +1,29 @@
+"""Add the ply of the game snapshot
+
+Revision ID: 8b2e4d61c0fa
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-19 16:52:40.118305
+
+"""
+from alembic import op
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "8b2e4d61c0fa"
+down_revision = "3f1c9a7d2b64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "game",
+        sqlalchemy.Column(
+            "ply", sqlalchemy.Integer, nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("game", "ply")
@@ -0,0 +1,43 @@
+"""Add the time a game was last served by a worker
+
+Revision ID: c7d3e5f8a214
+Revises: 5d7e2a9c4f13
+Create Date: 2026-10-19 17:52:08.561930
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "c7d3e5f8a214"
+down_revision = "5d7e2a9c4f13"
+branch_labels = None
+depends_on = None
+
+# the same predicate as api.models.game.Game.ongoing
+ONGOING = sqlalchemy.text("is_ongoing = true")
+
+
+def upgrade() -> None:
+    op.add_column("game", sqlalchemy.Column("active_at", sqlalchemy.DateTime))
+    # the ongoing games get the time of the upgrade, they expire if nobody comes back
+    op.execute(
+        sqlalchemy.text(
+            "UPDATE game SET active_at = :now WHERE is_ongoing = true"
+        ).bindparams(now=datetime.utcnow())
+    )
+    op.create_index(
+        "ix_game_ongoing_active",
+        "game",
+        ["active_at"],
+        postgresql_where=ONGOING,
+        sqlite_where=ONGOING,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_game_ongoing_active", "game")
+    op.drop_column("game", "active_at")
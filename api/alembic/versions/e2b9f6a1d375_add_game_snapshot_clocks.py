@@ -0,0 +1,26 @@
+"""Add the clocks of the game snapshot
+
+Revision ID: e2b9f6a1d375
+Revises: c7d3e5f8a214
+Create Date: 2026-10-19 18:21:47.390215
+
+"""
+from alembic import op
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "e2b9f6a1d375"
+down_revision = "c7d3e5f8a214"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("game", sqlalchemy.Column("player_one_ms", sqlalchemy.Integer))
+    op.add_column("game", sqlalchemy.Column("player_two_ms", sqlalchemy.Integer))
+
+
+def downgrade() -> None:
+    op.drop_column("game", "player_two_ms")
+    op.drop_column("game", "player_one_ms")
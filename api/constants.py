@@ -30,6 +30,61 @@ class Server:
     BASE_URL = config("BASE_URL", default="http://127.0.0.1:8000")
     TEMPLATES = Jinja2Templates(directory="api/templates")
 
+    # seconds between event loop lag samples
+    LOOP_LAG_INTERVAL = config("LOOP_LAG_INTERVAL", default=0.25, cast=float)
+    # log the stack of the event loop when it's blocked for longer than this
+    LOOP_LAG_WARN = config("LOOP_LAG_WARN", default=0.5, cast=float)
+    # reject new games and connections while the lag is above this
+    LOOP_LAG_SHED = config("LOOP_LAG_SHED", default=1.0, cast=float)
+    # seconds rejected clients are told to wait before trying again
+    RETRY_AFTER = config("RETRY_AFTER", default=5, cast=int)
+
+    # longest profile or memory snapshot the admin endpoints will take, in seconds
+    PROFILE_MAX_SECONDS = config("PROFILE_MAX_SECONDS", default=60, cast=float)
+    # record timing traces of every move, can also be switched on at /admin/trace
+    TRACE_MOVES = config("TRACE_MOVES", default=False, cast=bool)
+    # moves kept in memory before being written to the move history in one insert
+    MOVE_BATCH_SIZE = config("MOVE_BATCH_SIZE", default=10, cast=int)
+    # plies between two snapshots of a board, bounds the moves replayed in a recovery
+    SNAPSHOT_INTERVAL = config("SNAPSHOT_INTERVAL", default=50, cast=int)
+    # longest a shutting down worker spends handing its rooms over, in seconds
+    DRAIN_TIMEOUT = config("DRAIN_TIMEOUT", default=30, cast=float)
+    # seconds players wait before reconnecting to a room that moved to another worker
+    RESUME_AFTER = config("RESUME_AFTER", default=1, cast=int)
+    # 0 to 1023, written into the IDs of the games made by this worker, derived from the
+    # process ID when empty, see api.utils.snowflake
+    WORKER_ID = config("WORKER_ID", default="")
+    # rating points per matchmaking band, players are paired within neighbouring bands
+    MATCH_BAND_WIDTH = config("MATCH_BAND_WIDTH", default=200, cast=int)
+    # shortest time between two boards sent to the spectators of a room, in seconds
+    SPECTATE_INTERVAL = config("SPECTATE_INTERVAL", default=0.25, cast=float)
+    # chat messages a player can send each second, and at once after being quiet
+    CHAT_RATE = config("CHAT_RATE", default=1, cast=float)
+    CHAT_BURST = config("CHAT_BURST", default=5, cast=int)
+    # longest chat message accepted, in characters
+    CHAT_MAX_LENGTH = config("CHAT_MAX_LENGTH", default=200, cast=int)
+    # commands a room connection may send, as COMMAND:rate:burst with rate a second,
+    # burst at once and * for the commands not listed, see api.utils.ratelimit
+    COMMAND_LIMITS = config(
+        "COMMAND_LIMITS",
+        default="MOVE:5:20,GET_BOARD:5:20,GET_ALL_MOVES:2:10,RESET:0.2:2,*:5:20",
+    )
+    # refused commands a connection can send in a row before being disconnected, one
+    # more is forgiven every second
+    THROTTLE_STRIKES = config("THROTTLE_STRIKES", default=20, cast=int)
+    # websockets a user can have open at once on a worker
+    MAX_CONNECTIONS_PER_USER = config("MAX_CONNECTIONS_PER_USER", default=5, cast=int)
+    # seconds each player has for a game, plus those gained with each of their moves,
+    # as <initial>+<increment>, games are untimed when empty
+    TIME_CONTROL = config("TIME_CONTROL", default="600+5")
+    # seconds a websocket can be silent before it is pinged, and then before it is
+    # closed as dead if it still doesn't answer
+    HEARTBEAT_INTERVAL = config("HEARTBEAT_INTERVAL", default=20, cast=float)
+    HEARTBEAT_TIMEOUT = config("HEARTBEAT_TIMEOUT", default=20, cast=float)
+    # seconds a room can have no players connected, or a game no room on any worker,
+    # before the game is abandoned
+    ROOM_IDLE_TIMEOUT = config("ROOM_IDLE_TIMEOUT", default=300, cast=float)
+
 
 class AuthState(enum.Enum):
     """Represents possible outcomes of a user attempting to authorize."""
@@ -44,3 +99,4 @@ class AuthState(enum.Enum):
         "/authorize to get a new one."
     )
     BANNED = "You are banned."
+    NOT_STAFF = "Only staff members can use this endpoint."
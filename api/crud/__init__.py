@@ -1,2 +1,3 @@
 from api.crud.crud_game import game  # noqa: F401
+from api.crud.crud_game_move import game_move  # noqa: F401
 from api.crud.crud_user import user  # noqa: F401
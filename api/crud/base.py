@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from api.db.base_class import Base
+from api.utils.metrics import timed_query
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -14,6 +15,17 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Base class for CRUD operations."""
 
+    def __init_subclass__(cls, **kwargs):
+        """Record the latency of every public method of the CRUD class."""
+        super().__init_subclass__(**kwargs)
+        for name in dir(cls):
+            method = getattr(cls, name)
+            if name.startswith("_") or not callable(method):
+                continue
+            if getattr(method, "timed_query", False):
+                continue
+            setattr(cls, name, timed_query(f"{cls.__name__}.{name}")(method))
+
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -48,7 +60,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, dict[str, Any]],
     ) -> ModelType:
         """Update an existing `self.model` object."""
         obj_data = jsonable_encoder(db_obj)
@@ -1,5 +1,7 @@
 import typing as t
+from datetime import datetime
 
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from api.crud.base import CRUDBase
@@ -22,29 +24,68 @@ class CRUDGame(CRUDBase[Game, GameCreate, GameUpdate]):
 
         return game_obj.board
 
-    def get_open_games(self, db: Session) -> list[int]:
-        """Get IDs of all games which have no player 2 set i.e. haven't started yet."""
-        return db.query(Game).filter(Game.player_two_id == 0).all()
+    def get_ongoing_games(self, db: Session) -> list[Game]:
+        """Get all the games which aren't over yet."""
+        return db.query(Game).filter(Game.ongoing).all()
+
+    def get_ongoing_ids(self, db: Session) -> set[int]:
+        """Get the ids of all the games which aren't over yet."""
+        return {game_id for game_id, in db.query(Game.game_id).filter(Game.ongoing)}
+
+    def get_open_games(self, db: Session) -> list[Game]:
+        """Get all the games which have no player 2 set i.e. haven't started yet."""
+        return (
+            db.query(Game)
+            .filter(Game.ongoing, Game.player_two_id == 0)
+            .order_by(Game.game_id)
+            .all()
+        )
 
     def player_already_in_game(self, db: Session, *, user_id: int) -> bool:
         """Returns whether the user is already in a game or not."""
-        user_open_games = (
+        ongoing_games = db.query(Game.game_id).filter(
+            Game.ongoing,
+            or_(Game.player_one_id == user_id, Game.player_two_id == user_id),
+        )
+        return db.query(ongoing_games.exists()).scalar()
+
+    def touch(self, db: Session, *, game_ids: t.Collection[int]) -> None:
+        """Record that the rooms of the games with ids `game_ids` are in memory."""
+        if not game_ids:
+            return
+        db.query(Game).filter(Game.game_id.in_(game_ids)).update(
+            {Game.active_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+    def expire_inactive(self, db: Session, *, before: datetime) -> int:
+        """
+        End the ongoing games whose room no worker had since `before`, returns how many.
+
+        These are the games nobody connected to, or whose worker died, which would keep
+        their players in a game forever. They are over without a winner.
+        """
+        expired = (
             db.query(Game)
-            .filter(Game.player_one_id == user_id)
-            .filter(Game.is_ongoing is False)
-            .all()
+            .filter(Game.ongoing, Game.active_at < before)
+            .update(
+                {Game.is_ongoing: False, Game.winner_id: 0}, synchronize_session=False
+            )
         )
-        return len(user_open_games) > 0
+        db.commit()
+        return expired
 
     def update_board_by_id(
-        self, db: Session, *, game_id: int, board: str
+        self, db: Session, *, game_id: int, board: str, ply: t.Optional[int] = None
     ) -> t.Optional[Game]:
-        """Update the board of the game with id `game_id`."""
+        """Update the board of the game with id `game_id`, and its ply if given."""
         game_obj = self.get_by_game_id(db, game_id=game_id)
         if not game_obj:
             return None
 
         game_obj.board = board
+        if ply is not None:
+            game_obj.ply = ply
         db.add(game_obj)
         db.commit()
         db.refresh(game_obj)
@@ -0,0 +1,130 @@
+import typing as t
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+
+from api.crud.base import CRUDBase
+from api.models import Game, GameMove
+from api.schemas.game_move import GameMoveCreate
+
+
+class CRUDGameMove(CRUDBase[GameMove, GameMoveCreate, GameMoveCreate]):
+    """View providing append-only operations on the moves of games."""
+
+    def append_many(
+        self,
+        db: Session,
+        *,
+        moves: list[dict],
+        game_id: t.Optional[int] = None,
+        board: t.Optional[str] = None,
+        ply: t.Optional[int] = None,
+        player_one_ms: t.Optional[int] = None,
+        player_two_ms: t.Optional[int] = None,
+    ) -> None:
+        """
+        Insert `moves` in a single batch.
+
+        If `board` is given, it is saved as the snapshot of the game `game_id` at
+        `ply` in the same transaction, so the moves and the snapshot are never out
+        of step, with the milliseconds then left to each player if the game is timed.
+        """
+        if moves:
+            db.execute(GameMove.__table__.insert(), moves)
+        if board is not None:
+            db.query(Game).filter(Game.game_id == game_id).update(
+                {
+                    Game.board: board,
+                    Game.ply: ply,
+                    Game.player_one_ms: player_one_ms,
+                    Game.player_two_ms: player_two_ms,
+                },
+                synchronize_session=False,
+            )
+        db.commit()
+
+    def save_rooms(
+        self,
+        db: Session,
+        *,
+        moves: list[dict],
+        boards: list[dict],
+        winners: t.Optional[list[dict]] = None,
+    ) -> None:
+        """
+        Insert the moves and update the snapshots of many games in one transaction.
+
+        The games in `winners`, dicts of `game_id` and `winner_id`, are marked over
+        with them, e.g. those whose clock ran out. A `winner_id` of 0 marks a game
+        abandoned by both players.
+        """
+        if moves:
+            db.execute(GameMove.__table__.insert(), moves)
+        if boards:
+            game_table = Game.__table__
+            db.execute(
+                game_table.update()
+                .where(game_table.c.game_id == bindparam("snapshot_game_id"))
+                .values(
+                    board=bindparam("snapshot_board"),
+                    ply=bindparam("snapshot_ply"),
+                    player_one_ms=bindparam("snapshot_player_one_ms"),
+                    player_two_ms=bindparam("snapshot_player_two_ms"),
+                ),
+                [
+                    {
+                        "snapshot_game_id": board["game_id"],
+                        "snapshot_board": board["board"],
+                        "snapshot_ply": board["ply"],
+                        "snapshot_player_one_ms": board["player_one_ms"],
+                        "snapshot_player_two_ms": board["player_two_ms"],
+                    }
+                    for board in boards
+                ],
+            )
+        if winners:
+            game_table = Game.__table__
+            db.execute(
+                game_table.update()
+                .where(game_table.c.game_id == bindparam("over_game_id"))
+                .values(winner_id=bindparam("over_winner_id"), is_ongoing=False),
+                [
+                    {
+                        "over_game_id": winner["game_id"],
+                        "over_winner_id": winner["winner_id"],
+                    }
+                    for winner in winners
+                ],
+            )
+        db.commit()
+
+    def get_by_game_id(
+        self, db: Session, *, game_id: int, after_ply: int = 0
+    ) -> list[GameMove]:
+        """Get the moves of `game_id` played after `after_ply`, in order."""
+        return (
+            db.query(GameMove)
+            .filter(GameMove.game_id == game_id, GameMove.ply > after_ply)
+            .order_by(GameMove.ply)
+            .all()
+        )
+
+    def get_packed_moves(self, db: Session, *, game_id: int) -> list[int]:
+        """Get only the packed moves of `game_id`, in order."""
+        rows = (
+            db.query(GameMove.move)
+            .filter(GameMove.game_id == game_id)
+            .order_by(GameMove.ply)
+            .all()
+        )
+        return [move for move, in rows]
+
+    def remove_by_game_id(self, db: Session, *, game_id: int) -> None:
+        """Remove every move of `game_id`, e.g. when the board was reset."""
+        db.query(GameMove).filter(GameMove.game_id == game_id).delete(
+            synchronize_session=False
+        )
+        db.commit()
+
+
+game_move = CRUDGameMove(GameMove)
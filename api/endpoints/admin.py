@@ -0,0 +1,96 @@
+import asyncio
+from enum import Enum
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from api.constants import Server
+from api.utils import auth, profiler
+from api.utils.tracing import tracer
+
+router = APIRouter(
+    include_in_schema=False, dependencies=[Depends(auth.JWTBearer(staff_only=True))]
+)
+
+# one profile at a time, two samplers would only measure each other
+profiling = asyncio.Lock()
+
+
+class ProfileFormat(str, Enum):
+    """Output formats of the sampling profiler."""
+
+    collapsed = "collapsed"
+    speedscope = "speedscope"
+
+
+class SnapshotKey(str, Enum):
+    """How the memory snapshot groups allocations."""
+
+    lineno = "lineno"
+    filename = "filename"
+    traceback = "traceback"
+
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=Server.PROFILE_MAX_SECONDS),
+    interval: float = Query(0.005, ge=0.001, le=1),
+    format: ProfileFormat = ProfileFormat.collapsed,
+) -> Response:
+    """
+    Sample where the event loop of this worker spends its time for `seconds`.
+
+    The `collapsed` format can be fed to flamegraph.pl, the `speedscope` one opened
+    on https://www.speedscope.app. Only the worker serving the request is profiled.
+    """
+    if profiling.locked():
+        raise HTTPException(409, "A profile is already being taken.")
+    async with profiling:
+        result = await profiler.profile(seconds, interval)
+
+    if format is ProfileFormat.speedscope:
+        return JSONResponse(
+            result.speedscope(),
+            headers={
+                "Content-Disposition": "attachment; filename=profile.speedscope.json"
+            },
+        )
+    return PlainTextResponse(result.collapsed())
+
+
+@router.get("/memory")
+async def memory_snapshot(
+    seconds: float = Query(10, ge=0, le=Server.PROFILE_MAX_SECONDS),
+    key_type: SnapshotKey = SnapshotKey.lineno,
+    limit: int = Query(25, gt=0, le=500),
+) -> PlainTextResponse:
+    """Report what allocated the memory that grew the most over the next `seconds`."""
+    if profiling.locked():
+        raise HTTPException(409, "A profile is already being taken.")
+    async with profiling:
+        report = await profiler.memory_snapshot(seconds, key_type.value, limit)
+    return PlainTextResponse(report)
+
+
+@router.get("/trace")
+async def trace_status() -> dict:
+    """Whether moves are being traced, and the rooms with traces in this worker."""
+    return {
+        "enabled": tracer.enabled,
+        "rooms": {game_id: len(traces) for game_id, traces in tracer.rooms.items()},
+    }
+
+
+@router.put("/trace")
+async def toggle_tracing(enabled: bool) -> dict:
+    """Switch the move traces of this worker on or off."""
+    tracer.enabled = enabled
+    return {"enabled": tracer.enabled}
+
+
+@router.get("/trace/{game_id}")
+async def room_trace(game_id: str) -> dict:
+    """Summarise how long each stage of the moves of `game_id` took."""
+    if game_id not in tracer.rooms:
+        raise HTTPException(404, "No traces for this game.")
+    return tracer.summary(game_id)
@@ -1,25 +1,67 @@
+import asyncio
 import logging
+import math
 from collections import defaultdict
-from datetime import datetime
+from contextlib import suppress
+from datetime import datetime, timedelta
 from typing import Optional
 
 import Chessnut.game
-from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket
-from starlette.websockets import WebSocketDisconnect
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+)
+from sqlalchemy.orm import Session
+from starlette.websockets import WebSocketDisconnect, WebSocketState
 
 from api import schemas
-from api.crud import game
+from api.constants import Server
+from api.crud import game, game_move
 from api.endpoints import get_db
-from api.utils import auth
+from api.utils import auth, metrics
 from api.utils.chess import ChessBoard
+from api.utils.clocks import (
+    Clock,
+    Clocks,
+    FLAGGED_GAMES,
+    RUNNING_CLOCKS,
+    TIME_CONTROL,
+)
+from api.utils.heartbeat import Beat, heartbeat, wheel
+from api.utils.lobby import lobby
+from api.utils.loop_monitor import monitor
+from api.utils.matchmaking import TIME_TO_MATCH, matchmaker
+from api.utils.moves import encode_game
+from api.utils.ratelimit import (
+    CommandLimits,
+    ConnectionLimit,
+    TokenBucket,
+    parse_limits,
+)
+from api.utils.snowflake import generator
+from api.utils.spectators import spectators
+from api.utils.tracing import MoveTrace, tracer
 
 log = logging.getLogger(__name__)
 router = APIRouter(tags=["Game Endpoints"], dependencies=[Depends(auth.JWTBearer())])
 
 INITIAL_GAME = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 BOARD_PREFIX = "BOARD"
+CHAT_PREFIX = "CHAT"
 INFO_PREFIX = "INFO"
 
+# buckets of the commands of each room connection, CHAT stands for all chat messages
+COMMAND_LIMITS = parse_limits(
+    f"{Server.COMMAND_LIMITS},{CHAT_PREFIX}:{Server.CHAT_RATE}:{Server.CHAT_BURST}"
+)
+user_connections = ConnectionLimit(Server.MAX_CONNECTIONS_PER_USER)
+
 
 @router.get("/new")
 async def new_game_create(request: Request) -> dict:
@@ -44,13 +86,26 @@ async def new_game_create(request: Request) -> dict:
     # /game/1626296948
     ```
     """
+    if notifier.draining:
+        raise HTTPException(
+            503,
+            "The server is restarting, try again later.",
+            headers={"Retry-After": str(Server.RETRY_AFTER)},
+        )
+    if monitor.shed("new_game"):
+        raise HTTPException(
+            503,
+            "The server is overloaded, try again later.",
+            headers={"Retry-After": str(Server.RETRY_AFTER)},
+        )
+
     user_id = await auth.JWTBearer().get_user_by_token(request)
     db = next(get_db())
 
-    if game.player_already_in_game(db, user_id=user_id):
+    if already_playing(db, user_id):
         return {"message": "You are already in a game."}
 
-    game_id = int(datetime.now().timestamp())
+    game_id = generator.next_id()
     new_game_obj = schemas.game.GameCreate(
         game_id=game_id,
         is_ongoing=True,
@@ -60,10 +115,77 @@ async def new_game_create(request: Request) -> dict:
         board=INITIAL_GAME,
     )
     game.create(db, obj_in=new_game_obj)
+    lobby.create(game_id, user_id)
 
     return {"room": f"{game_id}"}
 
 
+@router.get("/open")
+async def open_games(after: int = 0, limit: int = Query(20, ge=1, le=100)) -> dict:
+    """
+    List the games waiting for a second player, by ascending game ID.
+
+    Pass the `next` of a page as `after` to get the following one, it is None on the
+    last page. /game/open/stream sends the games opened and closed from then on.
+    """
+    games = lobby.open_games(after, limit)
+    return {
+        "games": games,
+        "next": games[-1]["game_id"] if len(games) == limit else None,
+    }
+
+
+@router.websocket("/open/stream")
+async def open_games_stream(websocket: WebSocket) -> None:
+    """
+    Send the changes of the open games, see `api.utils.lobby` for the messages.
+
+    The first message asks to list the games with /game/open, so no change is missed.
+    """
+    user_id: int = await auth.JWTBearer().get_user_by_token_websocket(websocket)
+    await websocket.accept()
+    if await too_many_connections(websocket, user_id):
+        return
+    queue = lobby.subscribe()
+    beat = heartbeat.watch(websocket, close_dead)
+    closed = asyncio.ensure_future(wait_closed(websocket, beat))
+    try:
+        while True:
+            change = asyncio.ensure_future(queue.get())
+            await asyncio.wait({change, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                change.cancel()
+                break
+            await websocket.send_text(change.result())
+    finally:
+        lobby.unsubscribe(queue)
+        heartbeat.forget(beat)
+        closed.cancel()
+        user_connections.release(user_id)
+
+
+@router.get("/{game_id}/moves")
+async def game_moves(game_id: int) -> Response:
+    """
+    Download the moves of a game, two little endian bytes per ply.
+
+    See `api.utils.moves` for the encoding, `decode_game` and `unpack_moves` turn the
+    file back into moves like e2e4.
+    """
+    db = next(get_db())
+    if not game.get_by_game_id(db, game_id=game_id):
+        raise HTTPException(404, "Game not found.")
+
+    packed = game_move.get_packed_moves(db, game_id=game_id)
+    board = notifier.chess_boards.get(str(game_id))
+    if board is not None:
+        packed += [move["move"] for move in board.pending]
+    return Response(
+        encode_game(np.array(packed, dtype=np.uint16)),
+        media_type="application/octet-stream",
+    )
+
+
 class ChessNotifier:
     """Manages chess room sessions and members."""
 
@@ -71,6 +193,13 @@ class ChessNotifier:
         self.connections: dict = defaultdict(dict)
         self.generator = self.get_notification_generator()
         self.chess_boards: dict = dict()
+        self.clocks = Clocks(
+            on_flag=lambda flagged: asyncio.ensure_future(self.flag_fall(flagged))
+        )
+        # set once the worker is shutting down, see `drain`
+        self.draining = False
+        # room name -> loop time since which it has no player, see `reap_idle`
+        self.idle: dict[str, float] = dict()
 
         self.db = next(get_db())
 
@@ -84,10 +213,7 @@ class ChessNotifier:
 
     def get_members(self, room_name: str) -> Optional[dict]:
         """Return all the members for a game_id i.e. room_name."""
-        try:
-            return self.connections[room_name]
-        except Exception:
-            return None
+        return self.connections.get(room_name)
 
     async def push(self, msg: str, room_name: str = None) -> None:
         """Ascend notification data contaiing the message and room_name."""
@@ -100,33 +226,45 @@ class ChessNotifier:
         """Connet a websocket connection and register/update it in the DB."""
         # Player 2 returns a string in case of invalid game ID (game doesn't exist)
         # or if the player 2 is already assigned and game has began!
-        game_obj = game.get_by_game_id(self.db, game_id=int(room_name))
+        players = lobby.players_of(int(room_name))
+        if players is None:  # over, or made by another worker
+            game_obj = game.get_by_game_id(self.db, game_id=int(room_name))
+            if not game_obj:
+                return (
+                    "Invalid Game ID, make a game with /game/new and then connect here."
+                )
+            if not game_obj.is_ongoing:
+                return "This game is already over."
+            players = lobby.track(game_obj)
+        started = bool(players[1])
+        if started and user_id not in players:
+            return "only 2 player per game lobby allowed"
+        # the room isn't in memory when the worker restarted since the game began
+        recovering = started and room_name not in self.chess_boards
 
-        if not game_obj:
-            return "Invalid Game ID, make a game with /game/new and then connect here."
         if len(self.connections[room_name]) == 1:  # one user in room
-            player_count = game.get_player_count(
-                self.db, game_id=int(room_name)
-            )  # get how many in db
+            player_count = lobby.player_count(int(room_name))
             if player_count == 1:  # only one in db
-                if game.player_already_in_game(self.db, user_id=user_id):
+                if already_playing(self.db, user_id):
                     return "You are already in a game."
                 crud_response = game.set_player_two(
                     self.db, game_id=int(room_name), player_id=user_id
                 )
                 if isinstance(crud_response, str):
                     return crud_response
+                lobby.join(int(room_name), user_id)
 
             elif (
                 player_count == 2
                 and user_id not in self.connections[room_name].keys()
-                and user_id in [game_obj.player_one_id, game_obj.player_two_id]
+                and user_id in players
             ):  # coming after disconnect
                 self.connections[room_name].update({user_id: websocket})
             else:
                 return "only 2 player per game lobby allowed"
 
         await websocket.accept()
+        metrics.WEBSOCKET_CONNECTS.inc()
 
         if self.connections[room_name] == {} or len(self.connections[room_name]) == 0:
             self.connections[room_name] = {}
@@ -139,13 +277,20 @@ class ChessNotifier:
 
         # notify players after updating connections dict
 
+        # the other player may have rebuilt it while this one was joining
+        if recovering and room_name not in self.chess_boards:
+            log.info(f"recovering board of {room_name} from the database")
+            # its clock runs again only once both players are back, see below
+            self.chess_boards[room_name] = ChessBoard.restore(int(room_name))
+            self.show_board(room_name)
+
         if room_name not in self.chess_boards.keys():  # first connection
             if len(self.connections[room_name]) == 1:  # only one player has joined
-                if game_obj.player_one_id == user_id:
+                if players[0] == user_id:
                     await self._notify_private(
                         websocket, f"{INFO_PREFIX}::PLAYER::p1", room_name
                     )
-            elif game_obj.player_two_id == user_id:
+            elif players[1] == user_id:
                 await self._notify_private(
                     websocket, f"{INFO_PREFIX}::PLAYER::p2", room_name
                 )
@@ -153,49 +298,171 @@ class ChessNotifier:
                 self.chess_boards.update(
                     {f"{room_name}": ChessBoard(INITIAL_GAME, int(room_name))}
                 )  # make a new board for a room
+                self.start_clock(room_name)
                 await self._notify(f"{INFO_PREFIX}::READY", room_name)
+                self.show_board(room_name)
         else:
             # coming here after disconnect
             # tell if player 1 or player 2
-            if game_obj.player_one_id == user_id:
+            if players[0] == user_id:
                 await self._notify_private(
                     websocket, f"{INFO_PREFIX}::PLAYER::p1", room_name
                 )
-            elif game_obj.player_two_id == user_id:
+            elif players[1] == user_id:
                 await self._notify_private(
                     websocket, f"{INFO_PREFIX}::PLAYER::p2", room_name
                 )
 
             await self._notify_private(websocket, f"{INFO_PREFIX}::READY", room_name)
             await self._notify_private(
-                websocket,
-                f"{BOARD_PREFIX}::{BOARD_PREFIX}::{self.chess_boards[room_name].give_board()}",
-                room_name,
+                websocket, self.board_message(room_name), room_name
             )
             log.debug(f"{room_name} not empty, don't init board")
 
+            # a recovered room, whose clock waited for both players to come back
+            if (
+                TIME_CONTROL is not None
+                and self.clocks.get(room_name) is None
+                and len(self.connections[room_name]) == 2
+            ):
+                self.start_clock(room_name)
+                await self._notify(self.board_message(room_name), room_name)
+                self.show_board(room_name)
+
+    def start_game(self, player_one_id: int, player_two_id: int) -> str:
+        """Make a game of two players paired in the queue, returns its room name."""
+        game_id = generator.next_id()
+        game.create(
+            self.db,
+            obj_in=schemas.game.GameCreate(
+                game_id=game_id,
+                is_ongoing=True,
+                winner_id=0,
+                player_one_id=player_one_id,
+                player_two_id=player_two_id,
+                board=INITIAL_GAME,
+            ),
+        )
+        lobby.start(game_id, player_one_id, player_two_id)
+        return str(game_id)
+
+    async def join_started(
+        self, websocket: WebSocket, room_name: str, user_id: int
+    ) -> None:
+        """Add a player of a game made by `start_game`, whose websocket is accepted."""
+        player = ("p2", "p1")[lobby.players_of(int(room_name))[0] == user_id]
+        await websocket.send_text(f"{INFO_PREFIX}::MATCHED::{room_name}")
+        await websocket.send_text(f"{INFO_PREFIX}::PLAYER::{player}")
+        # joining only after being told which player they are, READY always comes last
+        self.connections[room_name][user_id] = websocket
+        if len(self.connections[room_name]) == 2:
+            self.chess_boards[room_name] = ChessBoard(INITIAL_GAME, int(room_name))
+            self.start_clock(room_name)
+            await self._notify(f"{INFO_PREFIX}::READY", room_name)
+            self.show_board(room_name)
+
     def remove(self, _: WebSocket, room_name: str, user_id: int) -> None:
         """Remove a websocket connection and close the chess game and mark the winner."""
+        if user_id not in self.connections.get(room_name, ()):
+            return  # the game is over already
         self.connections[room_name].pop(user_id)
+        if self.draining:
+            # the players were told to resume the game elsewhere, it isn't over
+            if not self.connections[room_name]:
+                del self.connections[room_name]
+            return
 
         if self.connections[room_name]:
             remaing_user = next(iter(self.connections[room_name].keys()))
+            self.clocks.stop(room_name)
+            board = self.chess_boards.pop(room_name, None)
+            if board is not None:
+                board.flush(snapshot=True)
+                board.close()
             game.mark_game_winner(
                 self.db, game_id=int(room_name), winner_id=remaing_user
             )
+            winner = ("p2", "p1")[lobby.players_of(int(room_name))[0] == remaing_user]
+            message = f"{BOARD_PREFIX}::OVER::{winner}"
+            spectators.close(room_name, message)
+            lobby.finish(int(room_name))
+            # the game is over, the winner leaving later mustn't delete it
+            for websocket in self.connections.pop(room_name).values():
+                asyncio.ensure_future(send_quietly(websocket, message))
         else:
             del self.connections[room_name]
-            del self.chess_boards[room_name]
+            # the game is deleted with its moves, so the unsaved moves are dropped
+            board = self.chess_boards.pop(room_name, None)
+            if board is not None:
+                board.close()
+            self.clocks.stop(room_name)
             game.remove(self.db, id=int(room_name))
+            spectators.close(room_name)
+            lobby.finish(int(room_name))
 
-        log.info(
-            f"CONNECTION REMOVED\nREMAINING CONNECTIONS : {self.connections[room_name]}"
-        )
+        remaining = self.connections.get(room_name)
+        log.info(f"CONNECTION REMOVED\nREMAINING CONNECTIONS : {remaining}")
+
+    def board_message(self, room_name: str) -> str:
+        """
+        `BOARD::BOARD::<fen>` message of the board of a room.
+
+        A timed game's board is followed by `::<p1 ms>,<p2 ms>`, the milliseconds left
+        on the clock of each player, those saved while a recovered room's clock waits.
+        """
+        board = self.chess_boards[room_name]
+        message = f"{BOARD_PREFIX}::{BOARD_PREFIX}::{board.give_board()}"
+        left = board.time_left()
+        if left is not None:
+            message += "::{},{}".format(*(int(seconds * 1000) for seconds in left))
+        return message
 
-    async def _notify(self, message: str, room_name: str) -> None:
+    def show_board(self, room_name: str) -> None:
+        """Send the board of a room to its spectators, see `api.utils.spectators`."""
+        spectators.publish(room_name, self.board_message(room_name))
+
+    def start_clock(self, room_name: str) -> None:
+        """
+        Start the clocks of a room, if games are timed.
+
+        A recovered room's clocks go on from the times saved with its board, the
+        others start at the full time control.
+        """
+        if TIME_CONTROL is None:
+            return
+        board = self.chess_boards[room_name]
+        black_to_move = board.give_board().split(" ")[1] == "b"
+        now = asyncio.get_event_loop().time()
+        board.clock = Clock(*TIME_CONTROL, now, int(black_to_move), board.clock_left)
+        board.clock_left = None
+        self.clocks.start(room_name, board.clock)
+
+    async def _notify(
+        self, message: str, room_name: str, trace: Optional[MoveTrace] = None
+    ) -> None:
         """Notify all the members of the connection."""
-        for _, websocket in self.connections[room_name].items():
-            await websocket.send_text(message)
+        members = list(self.connections.get(room_name, {}).items())
+        pending = len(members)
+        metrics.BROADCAST_QUEUE_DEPTH.inc(amount=pending)
+        if trace:
+            trace.mark("broadcast_enqueued")
+        try:
+            for user_id, websocket in members:
+                await websocket.send_text(message)
+                pending -= 1
+                metrics.BROADCAST_QUEUE_DEPTH.dec()
+                if trace:
+                    trace.mark("sent", user_id)
+        finally:
+            metrics.BROADCAST_QUEUE_DEPTH.dec(amount=pending)
+
+    async def chat(self, room_name: str, user_id: int, text: str) -> None:
+        """Send a chat message of `user_id` to both players of the room."""
+        players = lobby.players_of(int(room_name))
+        if players is None:  # the game is over
+            return
+        player = ("p2", "p1")[players[0] == user_id]
+        await self._notify(f"{CHAT_PREFIX}::MESSAGE::{player},{text}", room_name)
 
     async def _notify_private(
         self, web_socket: WebSocket, message: str, room_name: str
@@ -206,64 +473,304 @@ class ChessNotifier:
 
     async def mark_game_over(self, _: WebSocket, user: str, game_id: int) -> None:
         """Mark the `user` as the game winner and send game over message."""
-        game_obj = game.get_by_game_id(self.db, game_id=game_id)
+        self.chess_boards[str(game_id)].flush(snapshot=True)
+        self.clocks.stop(str(game_id))
+        player_one_id, player_two_id = lobby.players_of(game_id)
         game.mark_game_winner(
             self.db,
             game_id=game_id,
-            winner_id=game_obj.player_one_id
-            if user == "p1"
-            else game_obj.player_two_id,
+            winner_id=player_one_id if user == "p1" else player_two_id,
         )
+        lobby.finish(game_id)
+        spectators.close(str(game_id), f"{BOARD_PREFIX}::OVER::{user}")
         for _, websocket in self.connections[str(game_id)].items():
             await websocket.send_text(f"{BOARD_PREFIX}::OVER::{user}")
 
         room_name = str(game_id)
         del self.connections[room_name]
-        del self.chess_boards[room_name]
+        self.chess_boards.pop(room_name).close()
+
+    async def flag_fall(self, flagged: list[tuple[str, int]]) -> None:
+        """
+        End the games of the rooms whose player to move ran out of time.
+
+        `flagged` has the room name and turn of each, as given by `Clocks.take_expired`.
+        The other player wins, the unsaved moves and the winners of all the rooms are
+        written at once.
+        """
+        moves, boards, winners, over = [], [], [], []
+        for room_name, turn in flagged:
+            board = self.chess_boards.pop(room_name, None)
+            players = lobby.players_of(int(room_name))
+            if board is None or players is None:  # over already
+                continue
+            board_moves, snapshot = board.take_unsaved()
+            board.close()
+            moves += board_moves
+            boards.append(snapshot)
+            winners.append({"game_id": int(room_name), "winner_id": players[turn ^ 1]})
+            lobby.finish(int(room_name))
+            over.append((room_name, ("p2", "p1")[turn]))
+        if not over:
+            return
+        game_move.save_rooms(self.db, moves=moves, boards=boards, winners=winners)
+        FLAGGED_GAMES.inc(amount=len(over))
+        log.info(f"Flagged {len(over)} games out of time")
+
+        for room_name, winner in over:
+            message = f"{BOARD_PREFIX}::OVER::{winner}"
+            spectators.close(room_name, message)
+            for websocket in list(self.connections.pop(room_name, {}).values()):
+                try:
+                    await websocket.send_text(message)
+                except Exception:
+                    log.debug(f"Couldn't tell a member of {room_name} the game is over")
+
+    def lost(self, room_name: str, user_id: int, beat: Beat) -> None:
+        """
+        Handle a player whose websocket stopped answering, see `api.utils.heartbeat`.
+
+        The websocket is closed, so the player leaves the game like any other, unless
+        the other player isn't answering either. Nobody is left to win the game then,
+        and the room is reclaimed.
+        """
+        members = self.connections.get(room_name, {})
+        if members.get(user_id) is beat.websocket:
+            others = [socket for user, socket in members.items() if user != user_id]
+            if others and not any(map(heartbeat.responsive, others)):
+                self.reclaim([room_name], "abandoned")
+                return
+        close_dead(beat)
+
+    def reclaim(self, room_names: list[str], reason: str) -> None:
+        """
+        Free the rooms whose players are gone, their games are over without a winner.
+
+        The unsaved moves of all the rooms and the end of their games are written at
+        once, the websockets still open are closed and the spectators are sent
+        `BOARD::OVER::` with no winner.
+        """
+        moves, boards, abandoned = [], [], []
+        for room_name in room_names:
+            self.idle.pop(room_name, None)
+            self.clocks.stop(room_name)
+            board = self.chess_boards.pop(room_name, None)
+            if board is not None:
+                board_moves, snapshot = board.take_unsaved()
+                board.close()
+                moves += board_moves
+                boards.append(snapshot)
+            if lobby.players_of(int(room_name)) is not None:
+                abandoned.append({"game_id": int(room_name), "winner_id": 0})
+                lobby.finish(int(room_name))
+            spectators.close(room_name, f"{BOARD_PREFIX}::OVER::")
+            for websocket in self.connections.pop(room_name, {}).values():
+                asyncio.ensure_future(close_quietly(websocket, 1001))  # Going Away
+            metrics.ROOMS_RECLAIMED.inc(reason)
+        if boards or abandoned:
+            game_move.save_rooms(self.db, moves=moves, boards=boards, winners=abandoned)
+        log.info(f"Reclaimed {len(room_names)} {reason} rooms")
+
+    def start_reaper(self) -> None:
+        """Look for idle rooms and stale games every quarter of `ROOM_IDLE_TIMEOUT`."""
+        wheel.schedule(Server.ROOM_IDLE_TIMEOUT / 4, self._reap)
+
+    def _reap(self) -> None:
+        self.start_reaper()
+        self.reap_idle()
+        self.expire_stale()
+
+    def reap_idle(self) -> None:
+        """
+        Reclaim the rooms which had no player connected for `ROOM_IDLE_TIMEOUT` seconds.
+
+        Rooms are left without players by games which ended without the room being
+        freed, or whose players left while the worker was busy with something else.
+        """
+        if self.draining:  # the rooms are handed over, not over
+            return
+        now = asyncio.get_event_loop().time()
+        rooms = self.connections.keys() | self.chess_boards.keys()
+        for room_name in list(self.idle):
+            if room_name not in rooms or self.connections.get(room_name):
+                del self.idle[room_name]
+        for room_name in rooms:
+            if not self.connections.get(room_name):
+                self.idle.setdefault(room_name, now)
+        idle = [
+            room_name
+            for room_name, since in self.idle.items()
+            if now - since >= Server.ROOM_IDLE_TIMEOUT
+        ]
+        if idle:
+            self.reclaim(idle, "idle")
+
+    def expire_stale(self) -> None:
+        """
+        End the games whose room no worker had for `ROOM_IDLE_TIMEOUT` seconds.
+
+        The games of the rooms in memory are marked active first, the others are open
+        games nobody connected to or games of a worker which died, see
+        `api.crud.crud_game.CRUDGame.expire_inactive`.
+
+        The lobby then forgets the games without a room here which are over, whichever
+        worker ended or expired them, so they aren't listed as open or keep their
+        players in a game.
+        """
+        if self.draining:
+            return
+        rooms = self.connections.keys() | self.chess_boards.keys()
+        game.touch(self.db, game_ids=[int(room_name) for room_name in rooms])
+        expired = game.expire_inactive(
+            self.db,
+            before=datetime.utcnow() - timedelta(seconds=Server.ROOM_IDLE_TIMEOUT),
+        )
+        if expired:
+            metrics.ROOMS_RECLAIMED.inc("stale", amount=expired)
+            log.info(f"Expired {expired} games no worker had a room for")
+
+        ongoing = game.get_ongoing_ids(self.db)
+        over = [
+            game_id
+            for game_id in lobby.games
+            if game_id not in ongoing and str(game_id) not in rooms
+        ]
+        for game_id in over:
+            lobby.finish(game_id)
+        if over:
+            log.info(f"Forgot {len(over)} games which are over from the lobby")
+
+    def flush_all(self) -> None:
+        """Write the unsaved moves and snapshots of every room to the database."""
+        moves, boards = [], []
+        for board in self.chess_boards.values():
+            # the clocks went on since the last snapshot even without a move
+            if not board.saved or board.clock is not None:
+                board_moves, snapshot = board.take_unsaved()
+                moves += board_moves
+                boards.append(snapshot)
+        if boards:
+            game_move.save_rooms(self.db, moves=moves, boards=boards)
+            log.info(f"Saved {len(moves)} moves and {len(boards)} boards")
+
+    async def drain(self) -> None:
+        """
+        Hand the rooms of this worker over to the others before it shuts down.
+
+        New rooms and connections are refused, every board is saved and the players
+        are told to reconnect, which rebuilds their room wherever they land.
+        """
+        self.draining = True
+        self.flush_all()
+        message = f"{INFO_PREFIX}::RESUME::{Server.RESUME_AFTER}"
+        spectators.close_all(message, code=1012)  # Service Restart
+        for room_name in list(self.connections):
+            for websocket in list(self.connections.get(room_name, {}).values()):
+                try:
+                    await websocket.send_text(message)
+                    await websocket.close(code=1012)  # Service Restart
+                except Exception:
+                    log.debug(f"Couldn't hand over a member of {room_name}")
 
 
 notifier = ChessNotifier()
+metrics.ACTIVE_ROOMS.set_function(lambda: len(notifier.chess_boards))
+RUNNING_CLOCKS.set_function(lambda: len(notifier.clocks))
+metrics.ROOM_MEMBERS.set_function(
+    lambda: sum(len(members) for members in notifier.connections.values())
+)
 
 
-@router.websocket("/{game_id}")
-async def game_talking_endpoint(websocket: WebSocket, game_id: str) -> None:
-    """
-    Websocket endpoint for users in `game_id` to talk/send boards to each other.
+async def turned_away(websocket: WebSocket) -> bool:
+    """Refuse a websocket while the worker is overloaded or draining, returns if so."""
+    if monitor.shed("websocket"):
+        # a close before accepting can't carry a reason, so accept to say when to retry
+        await websocket.accept()
+        await websocket.send_text(f"{INFO_PREFIX}::RETRY::{Server.RETRY_AFTER}")
+        await websocket.close(code=1013)  # Try Again Later
+        return True
 
-    All the communication in two games is done and here, the player moves, player joins,
-    reseting the game, player chat, etc.
+    if notifier.draining:
+        await websocket.accept()
+        await websocket.send_text(f"{INFO_PREFIX}::RESUME::{Server.RESUME_AFTER}")
+        await websocket.close(code=1012)  # Service Restart
+        return True
+    return False
 
-    ### Example python code
-    ```py
-    import websocket
 
-    token = input("TOKEN: ")
-    headers = {"Authorization": f"Bearer {token}"}
-    game_id = 1626474066  # Example
+async def refuse(websocket: WebSocket, reason: str) -> None:
+    """Tell the client of an accepted websocket why it is refused, and close it."""
+    await websocket.send_text(f"{INFO_PREFIX}::ERROR::{reason}")
+    await websocket.close(code=1008)  # Policy Violation
 
-    ws_local = websocket.WebSocket()
-    ws_local.connect(f"ws://127.0.0.1:800/game/{game_id}")
 
-    try:
-        while True:
-            data_received = ws_local.recv()
-            ...
-    except Exception as error:
-        print(error)
-        ws_local.close(reason=fb"Program terminated with error: {error}")
-        raise
-    ```
+async def too_many_connections(websocket: WebSocket, user_id: int) -> bool:
     """
-    user_id: int = await auth.JWTBearer().get_user_by_token_websocket(websocket)
+    Count a new websocket of the user, refusing it if they have too many.
+
+    Returns whether it was refused, a counted websocket is given back with
+    `user_connections.release` once closed.
+    """
+    if user_connections.acquire(user_id):
+        return False
+    metrics.CONNECTIONS_REFUSED.inc("connections")
+    if websocket.application_state == WebSocketState.CONNECTING:
+        await websocket.accept()
+    await refuse(websocket, "Too many connections.")
+    return True
+
+
+def already_playing(db: Session, user_id: int) -> bool:
+    """
+    Whether the user plays an ongoing game, which the database has the last word on.
 
-    # The room name would be the game ID
-    response = await notifier.connect(websocket, game_id, user_id)
-    if isinstance(response, str):
-        raise HTTPException(400, response)
+    The lobby doesn't hear of the games other workers ended or expired, so a game it
+    has for the user is looked up before turning them away, and forgotten if over.
+    """
+    if not lobby.in_game(user_id):
+        return False
+    if game.player_already_in_game(db, user_id=user_id):
+        return True
+    lobby.finish(lobby.game_of(user_id))
+    return False
 
+
+async def send_quietly(websocket: WebSocket, message: str) -> None:
+    """Send `message` unless the websocket was closed meanwhile."""
+    with suppress(Exception):
+        await websocket.send_text(message)
+
+
+async def close_quietly(websocket: WebSocket, code: int) -> None:
+    """Close a websocket unless it is closed already."""
+    with suppress(Exception):
+        await websocket.close(code=code)
+
+
+def close_dead(beat: Beat) -> None:
+    """Close a websocket which stopped answering the heartbeat."""
+    asyncio.ensure_future(close_quietly(beat.websocket, 1001))  # Going Away
+
+
+async def wait_closed(websocket: WebSocket, beat: Optional[Beat] = None) -> None:
+    """Wait until the client closes `websocket`, only marking the `beat` as seen."""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        if beat:
+            beat.seen()
+
+
+async def serve_room(websocket: WebSocket, game_id: str, user_id: int) -> None:
+    """Handle the messages of a player in the room `game_id` until they leave."""
+    limits = CommandLimits(COMMAND_LIMITS)
+    # a connection going on sending refused commands is closed once these run out
+    strikes = TokenBucket(1, Server.THROTTLE_STRIKES)
+    beat = heartbeat.watch(
+        websocket, lambda beat: notifier.lost(game_id, user_id, beat)
+    )
     try:
         while True:
             data = await websocket.receive_text()
+            beat.seen()
 
             room_members = (
                 notifier.get_members(game_id)
@@ -273,41 +780,90 @@ async def game_talking_endpoint(websocket: WebSocket, game_id: str) -> None:
             # syntax PREFIX::COMMAND::<VALUE>
             prefix, command, value = "", "", ""
             try:
-                data = data.split("::")
+                # the value is kept whole, a chat message can contain `::`
+                data = data.split("::", 2)
                 prefix = data[0]
                 command = data[1]
             except IndexError:
                 log.debug(f"Invalid command {data}")
             if len(data) == 3:
                 value = data[2]
+            if prefix == INFO_PREFIX and command == "PONG":  # answer to the heartbeat
+                continue
+
+            limited = CHAT_PREFIX if prefix == CHAT_PREFIX else command
+            if not limits.take(limited):
+                label = limited if limited in COMMAND_LIMITS else "*"
+                metrics.COMMANDS_REJECTED.inc(label)
+                if not strikes.take():
+                    metrics.CONNECTIONS_REFUSED.inc("flood")
+                    await refuse(websocket, "Too many commands.")
+                    raise WebSocketDisconnect(1008)
+                wait = math.ceil(limits.retry_after(limited))
+                if prefix == CHAT_PREFIX:
+                    message = (
+                        f"{CHAT_PREFIX}::REJECTED::Too many messages, "
+                        f"wait {wait} seconds."
+                    )
+                else:
+                    message = f"{INFO_PREFIX}::THROTTLED::{command},{wait}"
+                await notifier._notify_private(websocket, message, game_id)
+                continue
 
             if prefix == BOARD_PREFIX:
+                if game_id not in notifier.chess_boards:
+                    if websocket in room_members.values():
+                        continue  # the game didn't start yet
+                    # the game ended as the command was sent, e.g. the clock flagged
+                    await close_quietly(websocket, 1000)
+                    metrics.WEBSOCKET_DISCONNECTS.inc()
+                    return
                 # all chess_board related stuff here
                 try:
                     if command == "MOVE":
-                        if value:
-                            notifier.chess_boards[game_id].move_piece(value)
-                        await notifier._notify(
-                            f"{BOARD_PREFIX}::{BOARD_PREFIX}::{notifier.chess_boards[game_id].give_board()}",
-                            game_id,
-                        )  # send new FEN representation if move is valid
+                        with metrics.MOVE_LATENCY.time():
+                            trace = tracer.begin(game_id, value)
+                            board = notifier.chess_boards[game_id]
+                            if (
+                                TIME_CONTROL is not None
+                                and notifier.clocks.get(game_id) is None
+                            ):
+                                continue  # a recovered room waits for both players
+                            if notifier.clocks.expired(game_id):
+                                # out of time, the timer is only about to flag them
+                                await notifier.flag_fall(notifier.clocks.take_expired())
+                                continue
+                            if value:
+                                board.validate(value)
+                                if trace:
+                                    trace.mark("validated")
+                                notifier.clocks.press(game_id)
+                                board.persist()
+                                if trace:
+                                    trace.mark("persisted")
+                            message = notifier.board_message(game_id)
+                            await notifier._notify(
+                                message, game_id, trace
+                            )  # send new FEN representation if move is valid
+                            spectators.publish(game_id, message)
+                            if trace:
+                                tracer.finish(trace)
                     elif command == "GET_ALL_MOVES":
-                        await notifier._notify(
+                        await notifier._notify_private(
+                            websocket,
                             f"{BOARD_PREFIX}::{notifier.chess_boards[game_id].all_available_moves()}",
                             game_id,
                         )  # send all moves available for the current active player
                     elif command == "GET_BOARD":
                         await notifier._notify_private(
-                            websocket,
-                            f"{BOARD_PREFIX}::{BOARD_PREFIX}::{notifier.chess_boards[game_id].give_board()}",
-                            game_id,
+                            websocket, notifier.board_message(game_id), game_id
                         )
                     elif command == "RESET":
                         notifier.chess_boards[game_id].reset()
-                        await notifier._notify(
-                            f"{BOARD_PREFIX}::{BOARD_PREFIX}::{notifier.chess_boards[game_id].give_board()}",
-                            game_id,
-                        )  # reset board and send new FEN
+                        notifier.start_clock(game_id)
+                        # reset board and send new FEN
+                        await notifier._notify(notifier.board_message(game_id), game_id)
+                        notifier.show_board(game_id)
                     elif command == "SURRENDER":
                         # value is the user who surrendered, e.g. SURRENDER::p1 i.e. p1 surrendered the game
                         await notifier.mark_game_over(
@@ -321,6 +877,23 @@ async def game_talking_endpoint(websocket: WebSocket, game_id: str) -> None:
                 except Chessnut.game.InvalidMove:
                     log.debug(f"invalid move {value} , game_id : {game_id}")
                     pass
+            elif prefix == CHAT_PREFIX and command == "SEND" and value:
+                # CHAT::SEND::<text>, refused with CHAT::REJECTED::<reason> or sent to
+                # both players as CHAT::MESSAGE::<p1 or p2>,<text>
+                if len(value) > Server.CHAT_MAX_LENGTH:
+                    reason = (
+                        f"Messages are at most {Server.CHAT_MAX_LENGTH} characters."
+                    )
+                elif not value.isprintable():
+                    reason = "Messages can only contain printable characters."
+                else:
+                    reason = None
+                if reason:
+                    await notifier._notify_private(
+                        websocket, f"{CHAT_PREFIX}::REJECTED::{reason}", game_id
+                    )
+                else:
+                    await notifier.chat(game_id, user_id, value)
 
             if websocket not in room_members.values():
                 log.info("SENDER NOT IN ROOM MEMBERS: RECONNECTING")
@@ -328,4 +901,162 @@ async def game_talking_endpoint(websocket: WebSocket, game_id: str) -> None:
                 await notifier.connect(websocket, game_id, user_id)
 
     except WebSocketDisconnect:
+        metrics.WEBSOCKET_DISCONNECTS.inc()
         notifier.remove(websocket, game_id, user_id)
+    finally:
+        heartbeat.forget(beat)
+
+
+@router.websocket("/queue")
+async def matchmaking_endpoint(
+    websocket: WebSocket, rating: Optional[int] = None
+) -> None:
+    """
+    Wait for an opponent and play them, without sharing a game ID beforehand.
+
+    Players are paired in the order they came, and with a `rating` only with players
+    rated close to it, see `api.utils.matchmaking`. `INFO::QUEUED::<players waiting>`
+    is sent while waiting, then `INFO::MATCHED::<game ID>` and the game goes on in
+    this websocket, the same as in /game/{game_id}.
+    """
+    if await turned_away(websocket):
+        return
+
+    user_id: int = await auth.JWTBearer().get_user_by_token_websocket(websocket)
+    await websocket.accept()
+    if already_playing(notifier.db, user_id) or user_id in matchmaker:
+        await refuse(websocket, "You are already in a game.")
+        return
+    if await too_many_connections(websocket, user_id):
+        return
+    # counted once it isn't refused, so that every connect has its disconnect
+    metrics.WEBSOCKET_CONNECTS.inc()
+
+    try:
+        left = False
+        opponent = matchmaker.match(rating)
+        if opponent is None:
+            ticket = matchmaker.join(user_id, rating)
+            await websocket.send_text(f"{INFO_PREFIX}::QUEUED::{len(matchmaker)}")
+            beat = heartbeat.watch(websocket, close_dead)
+            closed = asyncio.ensure_future(wait_closed(websocket, beat))
+            await asyncio.wait(
+                {ticket.future, closed}, return_when=asyncio.FIRST_COMPLETED
+            )
+            heartbeat.forget(beat)
+            matchmaker.leave(ticket)
+            left = closed.done()
+            closed.cancel()
+            # the room reads from the websocket next, the pending read must go first
+            with suppress(asyncio.CancelledError):
+                await closed
+            if not ticket.future.done():
+                ticket.future.cancel()
+                metrics.WEBSOCKET_DISCONNECTS.inc()
+                return
+            TIME_TO_MATCH.observe(ticket.waited)
+            room_name = ticket.future.result()
+        else:
+            TIME_TO_MATCH.observe(0)
+            room_name = notifier.start_game(opponent.user_id, user_id)
+            opponent.future.set_result(room_name)
+
+        await notifier.join_started(websocket, room_name, user_id)
+        if left:  # matched as they were leaving
+            metrics.WEBSOCKET_DISCONNECTS.inc()
+            notifier.remove(websocket, room_name, user_id)
+            return
+        await serve_room(websocket, room_name, user_id)
+    finally:
+        user_connections.release(user_id)
+
+
+@router.websocket("/{game_id}/watch")
+async def spectate_endpoint(websocket: WebSocket, game_id: int) -> None:
+    """
+    Watch the game `game_id` without playing it, any number of users can.
+
+    `BOARD::BOARD::<fen>` is sent with the board when joining, then whenever it changes,
+    at most every `SPECTATE_INTERVAL` seconds and only the latest one. The end of the
+    game sends `BOARD::OVER::<winner>` and closes the websocket, anything sent to it is
+    ignored.
+    """
+    if await turned_away(websocket):
+        return
+
+    user_id: int = await auth.JWTBearer().get_user_by_token_websocket(websocket)
+    await websocket.accept()
+    if lobby.players_of(game_id) is None:
+        game_obj = game.get_by_game_id(notifier.db, game_id=game_id)
+        if not game_obj or not game_obj.is_ongoing:
+            await refuse(websocket, "This game isn't being played.")
+            return
+    if await too_many_connections(websocket, user_id):
+        return
+    # counted once it isn't refused, so that every connect has its disconnect
+    metrics.WEBSOCKET_CONNECTS.inc()
+
+    room_name = str(game_id)
+    audience = spectators.join(room_name)
+    if audience.frame is None and room_name in notifier.chess_boards:
+        notifier.show_board(room_name)
+    beat = heartbeat.watch(websocket, close_dead)
+    watching = asyncio.ensure_future(audience.watch(websocket))
+    closed = asyncio.ensure_future(wait_closed(websocket, beat))
+    try:
+        await asyncio.wait({watching, closed}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watching.cancel()
+        closed.cancel()
+        await asyncio.gather(watching, closed, return_exceptions=True)
+        heartbeat.forget(beat)
+        spectators.leave(room_name, audience)
+        user_connections.release(user_id)
+        metrics.WEBSOCKET_DISCONNECTS.inc()
+
+
+@router.websocket("/{game_id}")
+async def game_talking_endpoint(websocket: WebSocket, game_id: str) -> None:
+    """
+    Websocket endpoint for users in `game_id` to talk/send boards to each other.
+
+    All the communication in two games is done and here, the player moves, player joins,
+    reseting the game, player chat, etc.
+
+    ### Example python code
+    ```py
+    import websocket
+
+    token = input("TOKEN: ")
+    headers = {"Authorization": f"Bearer {token}"}
+    game_id = 1626474066  # Example
+
+    ws_local = websocket.WebSocket()
+    ws_local.connect(f"ws://127.0.0.1:800/game/{game_id}")
+
+    try:
+        while True:
+            data_received = ws_local.recv()
+            ...
+    except Exception as error:
+        print(error)
+        ws_local.close(reason=fb"Program terminated with error: {error}")
+        raise
+    ```
+    """
+    if await turned_away(websocket):
+        return
+
+    user_id: int = await auth.JWTBearer().get_user_by_token_websocket(websocket)
+    if await too_many_connections(websocket, user_id):
+        return
+
+    try:
+        # The room name would be the game ID
+        response = await notifier.connect(websocket, game_id, user_id)
+        if isinstance(response, str):
+            raise HTTPException(400, response)
+
+        await serve_room(websocket, game_id, user_id)
+    finally:
+        user_connections.release(user_id)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.utils import metrics
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def expose_metrics() -> PlainTextResponse:
+    """Expose the metrics of this worker in the Prometheus text format."""
+    return PlainTextResponse(
+        metrics.REGISTRY.expose(), media_type="text/plain; version=0.0.4"
+    )
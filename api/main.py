@@ -7,7 +7,12 @@ from fastapi.staticfiles import StaticFiles
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from api.constants import Server
-from api.endpoints import auth, games
+from api.crud import game
+from api.endpoints import admin, auth, games, get_db, metrics
+from api.utils.lobby import lobby
+from api.utils.loop_monitor import monitor
+from api.utils.metrics import MetricsMiddleware
+from api.utils.shutdown import install_drain_handler
 
 log = logging.getLogger(__name__)
 
@@ -15,6 +20,8 @@ app = FastAPI(docs_url=None, redoc_url=None)
 
 app.include_router(router=auth.router)
 app.include_router(router=games.router, prefix="/game")
+app.include_router(router=metrics.router)
+app.include_router(router=admin.router, prefix="/admin")
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,8 +29,11 @@ app.add_middleware(
     allow_methods=["GET"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 app.mount("/static", StaticFiles(directory="api/static"), name="static")
 
+install_drain_handler(games.notifier.drain, timeout=Server.DRAIN_TIMEOUT)
+
 
 @app.exception_handler(StarletteHTTPException)
 async def my_exception_handler(
@@ -36,7 +46,11 @@ async def my_exception_handler(
             context={"request": request},
             status_code=exception.status_code,
         )
-    return PlainTextResponse(str(exception.detail), status_code=exception.status_code)
+    return PlainTextResponse(
+        str(exception.detail),
+        status_code=exception.status_code,
+        headers=getattr(exception, "headers", None),
+    )
 
 
 @app.on_event("startup")
@@ -50,9 +64,13 @@ async def startup() -> None:
         datefmt=date_format_string,
         level=getattr(logging, Server.LOG_LEVEL.upper()),
     )
+    lobby.load(game.get_ongoing_games(next(get_db())))
+    monitor.start()
+    games.notifier.start_reaper()
 
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
-    """Close down the app."""
-    ...
+    """Save what the rooms didn't, if they weren't drained, and close down the app."""
+    monitor.stop()
+    games.notifier.flush_all()
@@ -1,2 +1,3 @@
 from api.models.game import Game  # noqa: F401
+from api.models.game_move import GameMove  # noqa: F401
 from api.models.user import User  # noqa: F401
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 import sqlalchemy
 from pydantic import validator
 
@@ -13,6 +15,47 @@ class Game(Base):
     player_one_id = sqlalchemy.Column(sqlalchemy.BigInteger)
     player_two_id = sqlalchemy.Column(sqlalchemy.BigInteger)
     board = sqlalchemy.Column(sqlalchemy.String)
+    # ply `board` was saved at, the moves after it are in the game_move table
+    ply = sqlalchemy.Column(sqlalchemy.Integer, default=0, nullable=False)
+    # milliseconds left on the clock of each player at `ply`, None if untimed
+    player_one_ms = sqlalchemy.Column(sqlalchemy.Integer)
+    player_two_ms = sqlalchemy.Column(sqlalchemy.Integer)
+    # last time a worker had the room of the ongoing game, it is abandoned once
+    # none did for a while, see `api.crud.crud_game.CRUDGame.expire_inactive`
+    active_at = sqlalchemy.Column(sqlalchemy.DateTime, default=datetime.utcnow)
+
+    # Finished games make up nearly the whole table and are never looked up by
+    # player or state, so these only index the ongoing ones. Queries have to
+    # filter on this exact expression for the indexes to be used.
+    ongoing = is_ongoing == sqlalchemy.true()
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_game_ongoing_player_one",
+            player_one_id,
+            game_id,
+            postgresql_where=ongoing,
+            sqlite_where=ongoing,
+        ),
+        sqlalchemy.Index(
+            "ix_game_ongoing_player_two",
+            player_two_id,
+            game_id,
+            postgresql_where=ongoing,
+            sqlite_where=ongoing,
+        ),
+        sqlalchemy.Index(
+            "ix_game_open",
+            game_id,
+            postgresql_where=sqlalchemy.and_(ongoing, player_two_id == 0),
+            sqlite_where=sqlalchemy.and_(ongoing, player_two_id == 0),
+        ),
+        sqlalchemy.Index(
+            "ix_game_ongoing_active",
+            active_at,
+            postgresql_where=ongoing,
+            sqlite_where=ongoing,
+        ),
+    )
 
     @validator("player_one_id")
     def player_one_id_must_be_snowflake(cls, player_one_id: int) -> int:  # noqa: N805
@@ -0,0 +1,22 @@
+import sqlalchemy
+
+from api.db.base_class import Base
+
+
+class GameMove(Base):
+    """A move played in a game, appended in order and never updated."""
+
+    __tablename__ = "game_move"
+
+    game_id = sqlalchemy.Column(
+        sqlalchemy.BigInteger,
+        sqlalchemy.ForeignKey("game.game_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # half move number, starting at 1 for the first move of the game
+    ply = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    # see api.utils.moves.pack_move
+    move = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    # hash of the position after the move, see api.utils.moves.position_hash
+    position_hash = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False)
+    played_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
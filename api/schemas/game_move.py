@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class GameMoveBase(BaseModel):
+    """A schema representing a GameMove model."""
+
+    game_id: int
+    ply: int
+    move: int
+    position_hash: int
+    played_at: datetime
+
+
+class GameMoveCreate(GameMoveBase):
+    """A schema representing the properties received on GameMove creation."""
+
+
+class GameMove(GameMoveBase):
+    """A schema representing additional properties to return via API."""
+
+    class Config:  # noqa: D106
+        orm_mode = True
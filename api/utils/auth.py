@@ -20,8 +20,9 @@ log = logging.getLogger(__name__)
 class JWTBearer(HTTPBearer):
     """Dependency for routes to enforce JWT auth."""
 
-    def __init__(self, auto_error: bool = True):
+    def __init__(self, auto_error: bool = True, staff_only: bool = False):
         super().__init__(auto_error=auto_error)
+        self.staff_only = staff_only
 
     async def __call__(self, request: Request):
         """Check if the supplied credentials are valid for this endpoint."""
@@ -44,6 +45,8 @@ class JWTBearer(HTTPBearer):
             raise HTTPException(status_code=403, detail=AuthState.INVALID_TOKEN.value)
         elif user_state.is_banned:
             raise HTTPException(status_code=403, detail=AuthState.BANNED.value)
+        elif self.staff_only and not user_state.is_staff:
+            raise HTTPException(status_code=403, detail=AuthState.NOT_STAFF.value)
 
         request.state.user_id = int(user_id)
         return credentials
@@ -1,9 +1,15 @@
+import asyncio
 import logging
+from datetime import datetime
+from typing import Optional
 
 from Chessnut import Game
 
-from api.crud import game
+from api.constants import Server
+from api.crud import game, game_move
 from api.endpoints import get_db
+from api.utils.clocks import Clock
+from api.utils.moves import move_flag, pack_move, position_hash, unpack_moves
 
 logger = logging.getLogger(__name__)
 
@@ -11,33 +17,172 @@ logger = logging.getLogger(__name__)
 class ChessBoard:
     """Base class for chess board game."""
 
-    def __init__(self, fen: str, game_id: int):
+    def __init__(
+        self,
+        fen: str,
+        game_id: int,
+        batch_size: int = Server.MOVE_BATCH_SIZE,
+        snapshot_interval: int = Server.SNAPSHOT_INTERVAL,
+        ply: int = 0,
+    ):
         self.FEN = fen  # will be given by server when multiplayer is added
         self.board = Game(self.FEN)
         self.game_id = game_id
         self.db = next(get_db())
 
+        self.ply = ply
+        self.batch_size = batch_size
+        # moves not written to the database yet, see `flush`
+        self.pending: list[dict] = []
+        self.last_flag = 0
+        # the board is saved with the ply it's at every `snapshot_interval` plies,
+        # so recovering a room only replays the moves played since
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_ply = ply
+        # the room's running clock, whose times are saved with the snapshots, and
+        # the seconds left to each player as last saved, until it runs again
+        self.clock: Optional[Clock] = None
+        self.clock_left: Optional[tuple[float, float]] = None
+        # legal moves of the position `_moves_fen`, see `all_available_moves`
+        self._moves_fen: Optional[str] = None
+        self._moves: list = []
+
+    @classmethod
+    def restore(cls, game_id: int) -> "ChessBoard":
+        """Rebuild the board of a game from its last snapshot and the moves since."""
+        db = next(get_db())
+        try:
+            game_obj = game.get_by_game_id(db, game_id=game_id)
+            moves = unpack_moves(
+                [
+                    row.move
+                    for row in game_move.get_by_game_id(
+                        db, game_id=game_id, after_ply=game_obj.ply
+                    )
+                ]
+            )
+        finally:
+            db.close()
+
+        chess_board = cls(game_obj.board, game_id, ply=game_obj.ply)
+        if game_obj.player_one_ms is not None:
+            chess_board.clock_left = (
+                game_obj.player_one_ms / 1000,
+                game_obj.player_two_ms / 1000,
+            )
+        # the moves were validated when they were played
+        chess_board.board.validate = False
+        for move in moves:
+            chess_board.board.apply_move(move)
+        chess_board.board.validate = True
+        chess_board.ply += len(moves)
+        logger.info(
+            f"Restored game {game_id} from ply {game_obj.ply} with {len(moves)} moves"
+        )
+        return chess_board
+
     def give_board(self) -> str:
         """Returns the board in FEN representation."""
-        return game.get_board_by_id(self.db, game_id=self.game_id)
+        # the in-memory board is the latest one, the database catches up every batch
+        return self.board.get_fen()
 
     def all_available_moves(self) -> list:
         """Returns all moves that each piece of a player can make."""
-        return self.board.get_moves()
+        # generating them is costly, they are only generated once per position
+        fen = self.board.get_fen()
+        if fen != self._moves_fen:
+            self._moves_fen, self._moves = fen, self.board.get_moves()
+        return self._moves
 
     def move_piece(self, move: str) -> None:
         """Function to apply a move defined in simple algebraic notation like a1b1."""
+        self.validate(move)
+        self.persist()
+
+    def validate(self, move: str) -> None:
+        """Apply `move` to the in-memory board, raising `InvalidMove` if illegal."""
+        # en passant captures can only be told apart with the target before the move
+        en_passant = self.board.state.en_passant
         self.board.apply_move(move)
+        move = self.board.move_history[-1]
+        self.last_flag = move_flag(
+            move, self.board.board.get_piece(Game.xy2i(move[2:4])), en_passant
+        )
 
-        game.update_board_by_id(
-            self.db, game_id=self.game_id, board=self.board.get_fen()
+    def persist(self) -> None:
+        """Queue the last move for the move history, written once a batch is full."""
+        self.ply += 1
+        self.pending.append(
+            {
+                "game_id": self.game_id,
+                "ply": self.ply,
+                "move": pack_move(self.board.move_history[-1], self.last_flag),
+                "position_hash": position_hash(self.board.get_fen()),
+                "played_at": datetime.utcnow(),
+            }
         )
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self, snapshot: bool = False) -> None:
+        """
+        Append the queued moves to the move history.
+
+        The board is saved along with them when `snapshot` is True or when
+        `snapshot_interval` plies were played since the last snapshot.
+        """
+        if snapshot or self.ply - self.snapshot_ply >= self.snapshot_interval:
+            moves, board = self.take_unsaved()
+            game_move.append_many(self.db, moves=moves, **board)
+        elif self.pending:
+            moves, self.pending = self.pending, []
+            game_move.append_many(self.db, moves=moves)
+
+    @property
+    def saved(self) -> bool:
+        """Whether the database is up to date with the board."""
+        return not self.pending and self.ply == self.snapshot_ply
+
+    def take_unsaved(self) -> tuple[list[dict], dict]:
+        """
+        Return the queued moves and the snapshot of the board, for the caller to save.
+
+        The board then considers them saved, which lets the rooms of a worker be
+        written together, see `ChessNotifier.drain`.
+        """
+        moves, self.pending = self.pending, []
+        self.snapshot_ply = self.ply
+        left = self.time_left()
+        player_one_ms, player_two_ms = (
+            (None, None) if left is None else (int(seconds * 1000) for seconds in left)
+        )
+        return moves, {
+            "game_id": self.game_id,
+            "board": self.give_board(),
+            "ply": self.ply,
+            "player_one_ms": player_one_ms,
+            "player_two_ms": player_two_ms,
+        }
+
+    def time_left(self) -> Optional[tuple[float, float]]:
+        """Seconds left to each player if timed, on the clock or as last saved."""
+        if self.clock is not None:
+            return self.clock.left(asyncio.get_event_loop().time())
+        return self.clock_left
+
+    def close(self) -> None:
+        """Release the database session of the board, once the room is gone."""
+        self.db.close()
 
     def reset(self) -> None:
-        """Reset the board to initial position."""
+        """Reset the board to initial position, forgetting the moves played so far."""
         self.board.reset()
+        self.ply = self.snapshot_ply = 0
+        self.pending = []
+        self.clock_left = None
 
+        game_move.remove_by_game_id(self.db, game_id=self.game_id)
         game.update_board_by_id(
-            self.db, game_id=self.game_id, board=self.board.get_fen()
+            self.db, game_id=self.game_id, board=self.board.get_fen(), ply=0
         )
         logger.info("Resetting the Board")
@@ -0,0 +1,175 @@
+"""
+Chess clocks of the rooms, and the timer flagging the players who run out of time.
+
+Each player of a room has `initial` seconds for the whole game and gains `increment`
+seconds with each of their moves. Only the clock of the player to move runs, on the
+event loop's monotonic time, so changes to the system time don't count.
+
+A worker has one timer for all its rooms rather than a sleeping task for each: the
+times at which the running clocks would fall are kept in a heap and the event loop
+is only asked to wake up for the earliest. A move pushes the new time of its room
+and the old one is skipped when it comes up, so a move is O(log n).
+"""
+import asyncio
+import heapq
+import itertools
+import typing as t
+
+from api.constants import Server
+from api.utils import metrics
+
+RUNNING_CLOCKS = metrics.REGISTRY.register(
+    metrics.Gauge("clocks_running", "Timed rooms of the worker whose clock runs.")
+)
+FLAGGED_GAMES = metrics.REGISTRY.register(
+    metrics.Counter("games_flagged_total", "Games lost by running out of time.")
+)
+
+
+def parse_time_control(spec: str) -> t.Optional[tuple[float, float]]:
+    """Read a `<initial seconds>+<increment seconds>` time control, None when empty."""
+    if not spec:
+        return None
+    initial, _, increment = spec.partition("+")
+    return float(initial), float(increment or 0)
+
+
+class Clock:
+    """The clocks of the two players of a room, `turn` is 0 while player one's runs."""
+
+    __slots__ = ("remaining", "increment", "turn", "started")
+
+    def __init__(
+        self,
+        initial: float,
+        increment: float,
+        now: float,
+        turn: int = 0,
+        left: t.Optional[tuple[float, float]] = None,
+    ):
+        # seconds left to each player, `initial` unless resuming a game with `left`
+        self.remaining = [initial, initial] if left is None else list(left)
+        self.increment = increment
+        self.turn = turn
+        # when the running clock was started
+        self.started = now
+
+    @property
+    def deadline(self) -> float:
+        """Event loop time at which the player to move runs out of time."""
+        return self.started + self.remaining[self.turn]
+
+    def left(self, now: float) -> tuple[float, float]:
+        """Seconds left to player one and two at `now`."""
+        left = list(self.remaining)
+        left[self.turn] = max(0.0, left[self.turn] - (now - self.started))
+        return left[0], left[1]
+
+    def press(self, now: float) -> None:
+        """End the turn of the player to move, who gains the increment."""
+        spent = now - self.started
+        self.remaining[self.turn] = (
+            max(0.0, self.remaining[self.turn] - spent) + self.increment
+        )
+        self.turn ^= 1
+        self.started = now
+
+
+class Clocks:
+    """
+    The clocks of the timed rooms of the worker, by room name.
+
+    `on_flag` is called with the (room name, turn) of the rooms whose player to move
+    ran out of time, their clocks are stopped by then.
+    """
+
+    def __init__(self, on_flag: t.Callable[[list[tuple[str, int]]], None]):
+        self.on_flag = on_flag
+        self.clocks: dict[str, Clock] = dict()
+        # (deadline, order, room name, clock), the entries of stopped or pressed
+        # clocks are left in and skipped
+        self.heap: list[tuple[float, int, str, Clock]] = []
+        self._order = itertools.count()
+        self._timer: t.Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self.clocks)
+
+    def get(self, room_name: str) -> t.Optional[Clock]:
+        """Clock of a room, None if it isn't timed."""
+        return self.clocks.get(room_name)
+
+    def start(self, room_name: str, clock: Clock) -> None:
+        """Start timing a room, replacing its previous clock."""
+        self.clocks[room_name] = clock
+        self._push(room_name, clock)
+
+    def press(self, room_name: str) -> None:
+        """Hand the move over to the other player of a timed room."""
+        clock = self.clocks.get(room_name)
+        if clock is not None:
+            clock.press(self._now())
+            self._push(room_name, clock)
+
+    def stop(self, room_name: str) -> None:
+        """Stop timing a room, its game is over."""
+        self.clocks.pop(room_name, None)
+
+    def expired(self, room_name: str) -> bool:
+        """Whether the player to move of the room is out of time, flagged or not yet."""
+        clock = self.clocks.get(room_name)
+        return clock is not None and clock.deadline <= self._now()
+
+    def take_expired(self) -> list[tuple[str, int]]:
+        """Stop the clocks which ran out, returns the room name and turn of each."""
+        now = self._now()
+        flagged = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, room_name, clock = heapq.heappop(self.heap)
+            if self._is_current(deadline, room_name, clock):
+                del self.clocks[room_name]
+                flagged.append((room_name, clock.turn))
+        return flagged
+
+    def _is_current(self, deadline: float, room_name: str, clock: Clock) -> bool:
+        return self.clocks.get(room_name) is clock and clock.deadline == deadline
+
+    def _push(self, room_name: str, clock: Clock) -> None:
+        heapq.heappush(self.heap, (clock.deadline, next(self._order), room_name, clock))
+        if len(self.heap) > 2 * len(self.clocks) + 64:
+            # mostly skipped entries, keep the heap about as big as the running clocks
+            self.heap = [
+                entry
+                for entry in self.heap
+                if self._is_current(entry[0], entry[2], entry[3])
+            ]
+            heapq.heapify(self.heap)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        while self.heap and not self._is_current(
+            self.heap[0][0], self.heap[0][2], self.heap[0][3]
+        ):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return
+        deadline = self.heap[0][0]
+        if self._timer is not None:
+            if self._timer.when() <= deadline:
+                return
+            self._timer.cancel()
+        self._timer = asyncio.get_event_loop().call_at(deadline, self._fire)
+
+    def _fire(self) -> None:
+        self._timer = None
+        flagged = self.take_expired()
+        self._schedule()
+        if flagged:
+            self.on_flag(flagged)
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_event_loop().time()
+
+
+TIME_CONTROL = parse_time_control(Server.TIME_CONTROL)
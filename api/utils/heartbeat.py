@@ -0,0 +1,193 @@
+"""
+Heartbeat of the websockets of a worker, finding the clients which silently went away.
+
+A client whose connection died without closing it, e.g. its network went down, isn't
+noticed until something is sent to it, which can take a long time. Every websocket is
+`watch`ed: one silent for `interval` seconds is sent `INFO::PING`, which the clients
+answer with `INFO::PONG`, and one still silent `timeout` seconds later is dead.
+
+The websockets don't get a timer each, receiving a message only records when it
+came. Their checks are timers of one `TimerWheel` for the whole worker, which ticks
+once a `tick` while it has timers and runs those whose tick came, so a worker wakes up
+as often with thousands of websockets as with one.
+"""
+import asyncio
+import logging
+import math
+import typing as t
+
+from starlette.websockets import WebSocket
+
+from api.constants import Server
+from api.utils import metrics
+
+log = logging.getLogger(__name__)
+
+PING = "INFO::PING"
+
+WATCHED_SOCKETS = metrics.REGISTRY.register(
+    metrics.Gauge("heartbeat_websockets", "Websockets watched by the heartbeat.")
+)
+DEAD_SOCKETS = metrics.REGISTRY.register(
+    metrics.Counter(
+        "heartbeat_dead_websockets_total", "Websockets which stopped answering pings."
+    )
+)
+
+
+class Timer:
+    """A callback of a `TimerWheel`, see `TimerWheel.schedule`."""
+
+    __slots__ = ("callback", "rounds", "slot")
+
+    def __init__(self, callback: t.Callable[[], None], rounds: int, slot: int):
+        self.callback = callback
+        # turns of the wheel left before the timer is due
+        self.rounds = rounds
+        self.slot = slot
+
+
+class TimerWheel:
+    """
+    Timers with a precision of `tick` seconds, all run by one event loop callback.
+
+    A timer goes in the slot of the tick it is due at, modulo the number of slots, so
+    setting and cancelling one is O(1) and a tick only looks at its own slot.
+    """
+
+    def __init__(self, tick: float, slots: int = 64):
+        self.tick = tick
+        self.slots: list[dict[Timer, None]] = [dict() for _ in range(slots)]
+        # slot of the next tick
+        self.cursor = 0
+        self.count = 0
+        self._handle: t.Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def schedule(self, delay: float, callback: t.Callable[[], None]) -> Timer:
+        """Call `callback` in `delay` seconds, or up to a tick later."""
+        # the next tick may come at once, the timer isn't due before the one after it
+        ticks = math.ceil(delay / self.tick) + 1
+        rounds, offset = divmod(ticks - 1, len(self.slots))
+        timer = Timer(callback, rounds, (self.cursor + offset) % len(self.slots))
+        self.slots[timer.slot][timer] = None
+        self.count += 1
+        if self._handle is None:
+            self._handle = asyncio.get_event_loop().call_later(self.tick, self._advance)
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        """Forget a timer which wasn't called yet."""
+        slot = self.slots[timer.slot]
+        if timer in slot:
+            del slot[timer]
+            self.count -= 1
+
+    def _advance(self) -> None:
+        slot = self.slots[self.cursor]
+        # the timers set from the callbacks count from the next tick
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        due = []
+        for timer in list(slot):
+            if timer.rounds:
+                timer.rounds -= 1
+            else:
+                del slot[timer]
+                due.append(timer)
+        self.count -= len(due)
+        for timer in due:
+            try:
+                timer.callback()
+            except Exception:
+                log.exception("A timer of the timer wheel failed")
+        if self.count:
+            self._handle = asyncio.get_event_loop().call_later(self.tick, self._advance)
+        else:
+            self._handle = None
+
+
+class Beat:
+    """The heartbeat of one websocket, which is `seen` whenever it sends something."""
+
+    __slots__ = ("websocket", "on_dead", "seen_at", "pinged", "timer")
+
+    def __init__(
+        self, websocket: WebSocket, on_dead: t.Callable[["Beat"], None], now: float
+    ):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.seen_at = now
+        # a ping was sent since the websocket was last seen
+        self.pinged = False
+        self.timer: t.Optional[Timer] = None
+
+    def seen(self) -> None:
+        """Record that the client sent something, so it is alive."""
+        self.seen_at = asyncio.get_event_loop().time()
+        self.pinged = False
+
+
+class Heartbeat:
+    """The websockets of the worker, by ID as websockets can't be hashed."""
+
+    def __init__(self, wheel: TimerWheel, interval: float, timeout: float):
+        self.wheel = wheel
+        self.interval = interval
+        self.timeout = timeout
+        self.beats: dict[int, Beat] = dict()
+
+    def __len__(self) -> int:
+        return len(self.beats)
+
+    def watch(self, websocket: WebSocket, on_dead: t.Callable[[Beat], None]) -> Beat:
+        """
+        Ping `websocket` while it is silent, until it is forgotten.
+
+        `on_dead` is called with the beat, which is forgotten by then, if it stops
+        answering. The caller marks the beat `seen` for each message received.
+        """
+        beat = Beat(websocket, on_dead, asyncio.get_event_loop().time())
+        self.beats[id(websocket)] = beat
+        beat.timer = self.wheel.schedule(self.interval, lambda: self._check(beat))
+        return beat
+
+    def forget(self, beat: Beat) -> None:
+        """Stop watching the websocket of `beat`, once it is closed."""
+        if self.beats.get(id(beat.websocket)) is beat:
+            del self.beats[id(beat.websocket)]
+            self.wheel.cancel(beat.timer)
+
+    def responsive(self, websocket: WebSocket) -> bool:
+        """Whether the client of `websocket` isn't keeping a ping waiting."""
+        beat = self.beats.get(id(websocket))
+        return beat is None or not beat.pinged
+
+    def _check(self, beat: Beat) -> None:
+        quiet = asyncio.get_event_loop().time() - beat.seen_at
+        if quiet < self.interval:
+            delay = self.interval - quiet
+        elif not beat.pinged:
+            beat.pinged = True
+            asyncio.ensure_future(self._ping(beat.websocket))
+            delay = self.timeout
+        else:
+            del self.beats[id(beat.websocket)]
+            DEAD_SOCKETS.inc()
+            beat.on_dead(beat)
+            return
+        beat.timer = self.wheel.schedule(delay, lambda: self._check(beat))
+
+    @staticmethod
+    async def _ping(websocket: WebSocket) -> None:
+        try:
+            await websocket.send_text(PING)
+        except Exception:
+            log.debug("Couldn't ping a websocket")
+
+
+# one wheel for every timer of the worker which can be a second late
+wheel = TimerWheel(tick=1)
+heartbeat = Heartbeat(wheel, Server.HEARTBEAT_INTERVAL, Server.HEARTBEAT_TIMEOUT)
+WATCHED_SOCKETS.set_function(lambda: len(heartbeat))
@@ -0,0 +1,140 @@
+"""
+In-memory index of the ongoing games, their players and the open lobbies of a worker.
+
+Creating and joining games asks who is already playing and who plays a game, which
+this worker knows from the games it made and joined, so most checks don't need the
+database. The index is loaded from the database at startup and kept up to date as
+games are created, joined, finished and deleted. A game unknown to the index may
+have been made by another worker, so callers look it up in the database and `track` it.
+Other workers end games without the index hearing of it, so a player it has `in_game`
+is confirmed in the database before being turned away.
+
+Clients browsing the open lobbies `subscribe` to their changes, each gets a queue of
+`LOBBY::ADD::<game ID>,<player one ID>` and `LOBBY::REMOVE::<game ID>` messages.
+A `LOBBY::RESET` tells the client to list the open games again, it is the first
+message of every queue and replaces those a client was too slow to receive.
+"""
+import asyncio
+import bisect
+import typing as t
+
+from api.models import Game
+
+LOBBY_PREFIX = "LOBBY"
+
+
+class Lobby:
+    """The ongoing games of this worker, by game ID and by player."""
+
+    def __init__(self, stream_buffer: int = 256):
+        # game ID -> [player one ID, player two ID], player two is 0 until they join
+        self.games: dict[int, list[int]] = dict()
+        # player ID -> ID of the ongoing game they play
+        self.players: dict[int, int] = dict()
+        # IDs of the games waiting for a player 2, oldest first
+        self.open: dict[int, None] = dict()
+        # `open` in game ID order, rebuilt on the first listing after it changed
+        self._open_sorted: t.Optional[list[int]] = None
+
+        self.stream_buffer = stream_buffer
+        self.listeners: set[asyncio.Queue] = set()
+
+    def load(self, games: t.Iterable[Game]) -> None:
+        """Replace the index with the ongoing `games`, as read from the database."""
+        self.games.clear()
+        self.players.clear()
+        self.open.clear()
+        self._open_sorted = None
+        for game in sorted(games, key=lambda game: game.game_id):
+            self.track(game)
+        self._publish(f"{LOBBY_PREFIX}::RESET")
+
+    def track(self, game: Game) -> list[int]:
+        """Add an ongoing game read from the database, returns its players."""
+        if game.player_two_id:
+            self.start(game.game_id, game.player_one_id, game.player_two_id)
+        else:
+            self.create(game.game_id, game.player_one_id)
+        return self.games[game.game_id]
+
+    def create(self, game_id: int, player_one_id: int) -> None:
+        """Add a new game, open until a second player joins it."""
+        self.games[game_id] = [player_one_id, 0]
+        self.players[player_one_id] = game_id
+        self.open[game_id] = None
+        self._open_sorted = None
+        self._publish(f"{LOBBY_PREFIX}::ADD::{game_id},{player_one_id}")
+
+    def start(self, game_id: int, player_one_id: int, player_two_id: int) -> None:
+        """Add a game which has both its players, it was never open."""
+        self.games[game_id] = [player_one_id, player_two_id]
+        self.players[player_one_id] = self.players[player_two_id] = game_id
+
+    def join(self, game_id: int, player_two_id: int) -> None:
+        """Set the second player of the game `game_id`, which starts it."""
+        self.games[game_id][1] = player_two_id
+        self.players[player_two_id] = game_id
+        self._close(game_id)
+
+    def finish(self, game_id: int) -> None:
+        """Remove a game which is over or was deleted."""
+        for player_id in self.games.pop(game_id, ()):
+            if self.players.get(player_id) == game_id:
+                del self.players[player_id]
+        self._close(game_id)
+
+    def _close(self, game_id: int) -> None:
+        if game_id in self.open:
+            del self.open[game_id]
+            self._open_sorted = None
+            self._publish(f"{LOBBY_PREFIX}::REMOVE::{game_id}")
+
+    def players_of(self, game_id: int) -> t.Optional[list[int]]:
+        """Player one and two IDs of an ongoing game, None if the game isn't known."""
+        return self.games.get(game_id)
+
+    def in_game(self, user_id: int) -> bool:
+        """Whether the user plays an ongoing game."""
+        return user_id in self.players
+
+    def game_of(self, user_id: int) -> t.Optional[int]:
+        """ID of the ongoing game the user plays, None if they don't play one."""
+        return self.players.get(user_id)
+
+    def player_count(self, game_id: int) -> int:
+        """Returns the number of players in an ongoing game."""
+        return sum(1 for player_id in self.games.get(game_id, ()) if player_id)
+
+    def open_games(self, after: int = 0, limit: int = 20) -> list[dict]:
+        """The first `limit` open games with an ID above `after`, by ascending ID."""
+        if self._open_sorted is None:
+            self._open_sorted = sorted(self.open)
+        start = bisect.bisect_right(self._open_sorted, after)
+        return [
+            {"game_id": str(game_id), "player_one_id": self.games[game_id][0]}
+            for game_id in self._open_sorted[start : start + limit]
+        ]
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving every change of the open games from now on."""
+        queue: asyncio.Queue = asyncio.Queue(self.stream_buffer)
+        queue.put_nowait(f"{LOBBY_PREFIX}::RESET")
+        self.listeners.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Stop sending changes to a queue made by `subscribe`."""
+        self.listeners.discard(queue)
+
+    def _publish(self, message: str) -> None:
+        for queue in self.listeners:
+            if queue.full():
+                # the changes it missed can't be told apart now, start over
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(f"{LOBBY_PREFIX}::RESET")
+            else:
+                queue.put_nowait(message)
+
+
+lobby = Lobby()
@@ -0,0 +1,152 @@
+"""
+Event loop lag monitoring and load shedding.
+
+A task on the event loop sleeps for a fixed interval and measures how late it
+wakes up, which is how long the loop was blocked by something else, e.g. a
+blocking database call. A watchdog thread checks that the task keeps waking up
+and, when it doesn't, logs the stack of the event loop thread so the culprit
+can be found. While the lag is above `Server.LOOP_LAG_SHED`, new games and
+websocket connections are turned away to protect the games being played.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import typing as t
+from collections import deque
+
+from api.constants import Server
+from api.utils import metrics
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG = metrics.REGISTRY.register(
+    metrics.Histogram(
+        "event_loop_lag_seconds", "How late the event loop ran a scheduled callback."
+    )
+)
+LOOP_LAG_QUANTILES = metrics.REGISTRY.register(
+    metrics.Gauge(
+        "event_loop_lag_quantile_seconds",
+        "Event loop lag percentiles over the recent samples.",
+        ("quantile",),
+    )
+)
+SHED_REQUESTS = metrics.REGISTRY.register(
+    metrics.Counter(
+        "shed_requests_total", "Requests rejected while overloaded.", ("kind",)
+    )
+)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class LoopMonitor:
+    """Measures the lag of the event loop it is started on."""
+
+    def __init__(
+        self,
+        interval: float,
+        warn_threshold: float,
+        shed_threshold: float,
+        window: int = 240,
+    ):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.shed_threshold = shed_threshold
+        self.samples: deque = deque(maxlen=window)
+        # the samples of about the last second, one quick sample doesn't end overload
+        self.recent: deque = deque(maxlen=max(1, round(1 / interval)))
+        self.lag = 0.0
+        self.heartbeat = time.monotonic()
+
+        self._task: t.Optional[asyncio.Task] = None
+        self._watchdog: t.Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: t.Optional[int] = None
+
+    def start(self) -> None:
+        """Start sampling the running event loop and watching it from another thread."""
+        self._loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_event_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop the sampler and the watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.heartbeat = time.monotonic()
+            self.record(self.heartbeat - start - self.interval)
+
+    def record(self, lag: float) -> None:
+        """Store a lag measurement and update the exported percentiles."""
+        self.lag = lag = max(lag, 0.0)
+        self.samples.append(lag)
+        self.recent.append(lag)
+        LOOP_LAG.observe(lag)
+        for quantile, value in zip(QUANTILES, self.percentiles()):
+            LOOP_LAG_QUANTILES.set(value, str(quantile))
+
+    def percentiles(self) -> list[float]:
+        """Lag at each of `QUANTILES` over the recent samples."""
+        samples = sorted(self.samples)
+        if not samples:
+            return [0.0 for _ in QUANTILES]
+        return [
+            samples[min(len(samples) - 1, int(len(samples) * q))] for q in QUANTILES
+        ]
+
+    def _watch(self) -> None:
+        stalled = False
+        while not self._stopped.wait(self.interval):
+            lag = time.monotonic() - self.heartbeat - self.interval
+            if lag < self.warn_threshold:
+                stalled = False
+            elif not stalled:
+                # only dump once per stall, the stack rarely changes while blocked
+                stalled = True
+                log.warning(
+                    f"Event loop blocked for {lag:.3f}s, currently at:\n"
+                    f"{self.loop_stack()}"
+                )
+
+    def loop_stack(self) -> str:
+        """Formatted stack of what the event loop thread is executing right now."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "<event loop thread not running>"
+        return "".join(traceback.format_stack(frame))
+
+    @property
+    def overloaded(self) -> bool:
+        """Whether new work should be rejected to keep the current games responsive."""
+        return bool(self.recent) and max(self.recent) > self.shed_threshold
+
+    def shed(self, kind: str) -> bool:
+        """Return whether to reject a new `kind` of request, counting the rejection."""
+        if not self.overloaded:
+            return False
+        SHED_REQUESTS.inc(kind)
+        log.info(f"Shedding {kind}, event loop lag is {self.lag:.3f}s")
+        return True
+
+
+monitor = LoopMonitor(
+    interval=Server.LOOP_LAG_INTERVAL,
+    warn_threshold=Server.LOOP_LAG_WARN,
+    shed_threshold=Server.LOOP_LAG_SHED,
+)
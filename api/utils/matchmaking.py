@@ -0,0 +1,127 @@
+"""
+Pairing of the players waiting in the /game/queue websocket.
+
+Players are paired in the order they joined the queue. A player who gives a rating
+is only paired with players whose rating is in the same band of `band_width` points,
+or in one of the two bands next to it, the others are paired among themselves.
+
+Every band is a heap of tickets ordered by when they joined. A player leaving the
+queue only marks their ticket, which is thrown away once it reaches the top of its
+heap. The heaps are rebuilt without them once they outnumber the players waiting,
+so they can't pile up deeper down, and joining, leaving and being matched all take
+amortised O(log n).
+"""
+import asyncio
+import heapq
+import itertools
+import time
+import typing as t
+from collections import defaultdict
+
+from api.constants import Server
+from api.utils import metrics
+
+QUEUE_DEPTH = metrics.REGISTRY.register(
+    metrics.Gauge("matchmaking_queue_depth", "Players waiting for an opponent.")
+)
+TIME_TO_MATCH = metrics.REGISTRY.register(
+    metrics.Histogram(
+        "matchmaking_wait_seconds",
+        "Time players waited in the queue before being paired.",
+        buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+    )
+)
+
+
+class Ticket:
+    """A player waiting in the queue, `future` gets their game's ID once matched."""
+
+    __slots__ = ("user_id", "band", "joined", "order", "future", "cancelled")
+
+    def __init__(self, user_id: int, band: t.Optional[int], order: int):
+        self.user_id = user_id
+        self.band = band
+        self.joined = time.monotonic()
+        self.order = order
+        self.future: asyncio.Future = asyncio.get_event_loop().create_future()
+        self.cancelled = False
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return self.order < other.order
+
+    @property
+    def waited(self) -> float:
+        """Seconds since the player joined the queue."""
+        return time.monotonic() - self.joined
+
+
+class Matchmaker:
+    """The players waiting for an opponent, by rating band."""
+
+    def __init__(self, band_width: int):
+        self.band_width = band_width
+        # band -> heap of tickets, None is the band of the players without a rating
+        self.bands: dict[t.Optional[int], list[Ticket]] = defaultdict(list)
+        # user ID -> ticket, of the players still waiting
+        self.waiting: dict[int, Ticket] = dict()
+        # tickets of players who left still in the heaps
+        self.cancelled = 0
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.waiting
+
+    def band_of(self, rating: t.Optional[int]) -> t.Optional[int]:
+        """Band of the players rated `rating`."""
+        return None if rating is None else rating // self.band_width
+
+    def match(self, rating: t.Optional[int]) -> t.Optional[Ticket]:
+        """Take the longest waiting player a player rated `rating` can play, if any."""
+        band = self.band_of(rating)
+        best = None
+        for neighbour in (band,) if band is None else (band - 1, band, band + 1):
+            heap = self.bands.get(neighbour)
+            while heap and heap[0].cancelled:
+                heapq.heappop(heap)
+                self.cancelled -= 1
+            if heap and (best is None or heap[0] < best):
+                best = heap[0]
+        if best is None:
+            return None
+        heapq.heappop(self.bands[best.band])
+        if not self.bands[best.band]:
+            del self.bands[best.band]
+        del self.waiting[best.user_id]
+        return best
+
+    def join(self, user_id: int, rating: t.Optional[int]) -> Ticket:
+        """Put a player in the queue, until they are matched or `leave` it."""
+        ticket = Ticket(user_id, self.band_of(rating), next(self._order))
+        heapq.heappush(self.bands[ticket.band], ticket)
+        self.waiting[user_id] = ticket
+        return ticket
+
+    def leave(self, ticket: Ticket) -> None:
+        """Take a player who is still waiting out of the queue."""
+        if self.waiting.get(ticket.user_id) is ticket:
+            del self.waiting[ticket.user_id]
+            ticket.cancelled = True
+            self.cancelled += 1
+            if self.cancelled > len(self.waiting):
+                self._compact()
+
+    def _compact(self) -> None:
+        for band, heap in list(self.bands.items()):
+            heap[:] = [ticket for ticket in heap if not ticket.cancelled]
+            if heap:
+                heapq.heapify(heap)
+            else:
+                del self.bands[band]
+        self.cancelled = 0
+
+
+matchmaker = Matchmaker(Server.MATCH_BAND_WIDTH)
+QUEUE_DEPTH.set_function(lambda: len(matchmaker))
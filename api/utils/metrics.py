@@ -0,0 +1,309 @@
+"""
+Prometheus style metrics of the worker, exposed in the text format on /metrics.
+
+Every update happens on the worker's event loop thread, so the metrics are
+plain dicts of numbers without any locking. Each gunicorn worker keeps and
+exposes its own metrics.
+"""
+import abc
+import time
+import typing as t
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# default buckets of the latency histograms, in seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(abc.ABC):
+    """Base class of the metrics, values are stored per tuple of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> t.Iterator[str]:
+        """Yield the exposition lines of the samples."""
+
+    def expose(self) -> str:
+        """Return the metric in the Prometheus text exposition format."""
+        header = (
+            f"# HELP {self.name} {self.documentation}\n"
+            f"# TYPE {self.name} {self.type}\n"
+        )
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Increment the counter of `labels` by `amount`."""
+        self.values[labels] += amount
+
+    def samples(self) -> t.Iterator[str]:
+        """Yield the exposition lines of the samples."""
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(Metric):
+    """A value that goes up and down, or is computed by a function at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict = defaultdict(float)
+        self.function: t.Optional[t.Callable[[], float]] = None
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the gauge of `labels` to `value`."""
+        self.values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Increment the gauge of `labels` by `amount`."""
+        self.values[labels] += amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        """Decrement the gauge of `labels` by `amount`."""
+        self.values[labels] -= amount
+
+    def set_function(self, function: t.Callable[[], float]) -> None:
+        """Compute the (unlabelled) value of the gauge with `function` when scraped."""
+        self.function = function
+
+    def samples(self) -> t.Iterator[str]:
+        """Yield the exposition lines of the samples."""
+        if self.function is not None:
+            self.values[()] = self.function()
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. latencies, over fixed buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count above the last bucket]
+        self.counts: dict = dict()
+        self.sums: dict = defaultdict(float)
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record `value` for `labels`."""
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing how long its body took, in seconds."""
+        return _Timer(self, labels)
+
+    def samples(self) -> t.Iterator[str]:
+        """Yield the exposition lines of the samples."""
+        for labels, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            formatted = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{formatted} {self.sums[labels]}"
+            yield f"{self.name}_count{formatted} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    """Collection of the metrics exposed together."""
+
+    def __init__(self):
+        self.metrics: dict = dict()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add `metric` to the registry and return it."""
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def expose(self) -> str:
+        """Return all the metrics in the Prometheus text exposition format."""
+        return "".join(metric.expose() for metric in self.metrics.values())
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_LATENCY = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time taken to respond to HTTP requests.",
+        ("route", "method", "status"),
+    )
+)
+WEBSOCKET_CONNECTS = REGISTRY.register(
+    Counter("websocket_connects_total", "Websocket connections accepted.")
+)
+WEBSOCKET_DISCONNECTS = REGISTRY.register(
+    Counter("websocket_disconnects_total", "Websocket connections closed.")
+)
+COMMANDS_REJECTED = REGISTRY.register(
+    Counter(
+        "websocket_commands_rejected_total",
+        "Room commands refused for going over their rate limit.",
+        ("command",),
+    )
+)
+CONNECTIONS_REFUSED = REGISTRY.register(
+    Counter(
+        "websocket_connections_refused_total",
+        "Websockets refused or closed for abusing the server.",
+        ("reason",),
+    )
+)
+ACTIVE_ROOMS = REGISTRY.register(
+    Gauge("game_rooms_active", "Game rooms with a board in this worker.")
+)
+ROOMS_RECLAIMED = REGISTRY.register(
+    Counter(
+        "game_rooms_reclaimed_total",
+        "Rooms, or games without one, abandoned because their players were gone.",
+        ("reason",),
+    )
+)
+ROOM_MEMBERS = REGISTRY.register(
+    Gauge("game_room_members", "Websockets connected to game rooms in this worker.")
+)
+MOVE_LATENCY = REGISTRY.register(
+    Histogram(
+        "game_move_processing_seconds",
+        "Time from receiving a move to broadcasting the new board.",
+    )
+)
+DB_QUERY_LATENCY = REGISTRY.register(
+    Histogram("db_query_duration_seconds", "Time taken by CRUD methods.", ("method",))
+)
+BROADCAST_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("broadcast_queue_depth", "Messages being sent to room members right now.")
+)
+
+
+def timed_query(method: str) -> t.Callable:
+    """Decorator recording the latency of a CRUD method as `method`."""
+
+    def decorator(func: t.Callable) -> t.Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> t.Any:  # noqa: ANN401
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                DB_QUERY_LATENCY.observe(time.perf_counter() - start, method)
+
+        wrapper.timed_query = True
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every HTTP request by route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.routes: dict = dict()
+
+    def route_of(self, scope: Scope) -> str:
+        """Route template (e.g. /game/{game_id}) the request was routed to."""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        route = self.routes.get(endpoint)
+        if route is None:
+            router = scope["app"].router
+            self.routes = {getattr(r, "endpoint", None): r.path for r in router.routes}
+            route = self.routes.get(endpoint, "<unmatched>")
+        return route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Time the request and label it with its route, method and status."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                self.route_of(scope),
+                scope["method"],
+                status,
+            )
@@ -0,0 +1,139 @@
+"""
+Compact encoding of moves for the `game_move` table and game archives.
+
+A move is packed into 16 bits:
+
+    bits 0-5    from square (a1 = 0, h1 = 7, h8 = 63)
+    bits 6-11   to square
+    bits 12-13  promotion piece, index into PROMOTIONS, only set for promotions
+    bits 14-15  flag, one of the FLAG_* constants
+
+so a whole game fits in two bytes per ply. `pack_moves` and `unpack_moves` do the
+same as `pack_move` and `unpack_move` over NumPy arrays, for whole games at once.
+"""
+import hashlib
+import typing as t
+
+import numpy as np
+
+FILES = "abcdefgh"
+PROMOTIONS = "nbrq"
+
+FLAG_NORMAL = 0
+FLAG_PROMOTION = 1
+FLAG_EN_PASSANT = 2
+FLAG_CASTLING = 3
+
+# byte order of archived games, independent of the machine
+ARCHIVE_DTYPE = np.dtype("<u2")
+
+# ASCII code of a promotion piece -> its index in PROMOTIONS
+_PROMOTION_INDEX = np.zeros(256, dtype=np.uint16)
+_PROMOTION_INDEX[np.frombuffer(PROMOTIONS.encode(), dtype=np.uint8)] = np.arange(
+    len(PROMOTIONS), dtype=np.uint16
+)
+_PROMOTION_CODES = np.frombuffer(PROMOTIONS.encode(), dtype=np.uint8)
+
+
+def square_index(square: str) -> int:
+    """Index of a square like e4, a1 being 0 and h8 63."""
+    return FILES.index(square[0]) + 8 * (int(square[1]) - 1)
+
+
+def square_name(index: int) -> str:
+    """Name of the square at `index`, see `square_index`."""
+    return f"{FILES[index % 8]}{index // 8 + 1}"
+
+
+def move_flag(move: str, piece: str, en_passant: str) -> int:
+    """
+    Flag of `move`, made by `piece` while `en_passant` is the en passant target square.
+
+    Chessnut's simple algebraic notation has no special castling or en passant
+    notation, so the flag needs the piece that moves and the position's en passant
+    target, which are both known before the move is applied.
+    """
+    if len(move) == 5:
+        return FLAG_PROMOTION
+    if piece in "Kk" and abs(square_index(move[:2]) - square_index(move[2:4])) == 2:
+        return FLAG_CASTLING
+    if piece in "Pp" and move[2:4] == en_passant:
+        return FLAG_EN_PASSANT
+    return FLAG_NORMAL
+
+
+def pack_move(move: str, flag: t.Optional[int] = None) -> int:
+    """Pack a move in simple algebraic notation, like e2e4 or a7a8q, into 16 bits."""
+    move = move.lower()
+    packed = square_index(move[:2]) | square_index(move[2:4]) << 6
+    if len(move) == 5:
+        packed |= PROMOTIONS.index(move[4]) << 12
+        flag = FLAG_PROMOTION
+    return packed | (flag or FLAG_NORMAL) << 14
+
+
+def unpack_move(packed: int) -> str:
+    """Turn a packed move back into simple algebraic notation."""
+    move = square_name(packed & 0x3F) + square_name(packed >> 6 & 0x3F)
+    if packed >> 14 == FLAG_PROMOTION:
+        move += PROMOTIONS[packed >> 12 & 0x3]
+    return move
+
+
+def pack_moves(
+    moves: t.Sequence[str], flags: t.Optional[t.Sequence[int]] = None
+) -> np.ndarray:
+    """Vectorised `pack_move`, returning a uint16 array."""
+    if not len(moves):
+        return np.zeros(0, dtype=np.uint16)
+    # fixed width ASCII, shorter moves are padded with NUL bytes
+    chars = np.array(moves, dtype="S5").view(np.uint8).reshape(-1, 5).astype(np.uint16)
+    chars[chars != 0] |= 0x20  # lower case
+    packed = (chars[:, 0] - ord("a")) + 8 * (chars[:, 1] - ord("1"))
+    packed |= ((chars[:, 2] - ord("a")) + 8 * (chars[:, 3] - ord("1"))) << 6
+
+    if flags is None:
+        flag = np.zeros(len(moves), dtype=np.uint16)
+    else:
+        flag = np.asarray(flags, dtype=np.uint16).copy()
+    promotion = chars[:, 4] != 0
+    flag[promotion] = FLAG_PROMOTION
+    packed |= _PROMOTION_INDEX[chars[:, 4]] << 12
+    packed |= flag << 14
+    return packed.astype(np.uint16)
+
+
+def unpack_moves(packed: np.ndarray) -> list[str]:
+    """Vectorised `unpack_move`."""
+    packed = np.asarray(packed, dtype=np.uint16)
+    chars = np.zeros((len(packed), 5), dtype=np.uint8)
+    start, end = packed & 0x3F, packed >> 6 & 0x3F
+    chars[:, 0] = ord("a") + start % 8
+    chars[:, 1] = ord("1") + start // 8
+    chars[:, 2] = ord("a") + end % 8
+    chars[:, 3] = ord("1") + end // 8
+    promotion = packed >> 14 == FLAG_PROMOTION
+    chars[promotion, 4] = _PROMOTION_CODES[packed[promotion] >> 12 & 0x3]
+    return [move.decode() for move in chars.view("S5").ravel()]
+
+
+def encode_game(packed: np.ndarray) -> bytes:
+    """Serialise packed moves into an archive, two little endian bytes per ply."""
+    return np.asarray(packed).astype(ARCHIVE_DTYPE).tobytes()
+
+
+def decode_game(data: bytes) -> np.ndarray:
+    """Read the packed moves of an archive written by `encode_game`."""
+    return np.frombuffer(data, dtype=ARCHIVE_DTYPE).astype(np.uint16)
+
+
+def position_hash(fen: str) -> int:
+    """
+    Signed 64 bit hash of the position in `fen`, ignoring the move counters.
+
+    Repeated positions hash the same, so threefold repetitions and transpositions
+    can be found with a plain index lookup.
+    """
+    position = " ".join(fen.split(" ")[:4])
+    digest = hashlib.blake2b(position.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
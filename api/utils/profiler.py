@@ -0,0 +1,148 @@
+"""
+Low overhead profiling of a running worker.
+
+`SamplingProfiler` periodically looks at the stack of one thread from another
+thread, so the profiled code isn't slowed down by tracing hooks. The samples
+can be exported as collapsed stacks, for flamegraph.pl and friends, or as a
+speedscope (https://www.speedscope.app) file.
+"""
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+import typing as t
+from collections import Counter
+from types import FrameType
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class SamplingProfiler:
+    """Samples the stack of the thread `thread_id` every `interval` seconds."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        # stack, root first, of (function, file, first line) -> times it was sampled
+        self.stacks: Counter = Counter()
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.walk(frame)] += 1
+        self.duration = time.perf_counter() - start
+
+    @staticmethod
+    def walk(frame: t.Optional[FrameType]) -> tuple:
+        """Return the stack ending in `frame`, root first."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed stack format, one `a;b;c count` line per stack."""
+        return "".join(
+            ";".join(f"{name} ({file}:{line})" for name, file, line in stack)
+            + f" {count}\n"
+            for stack, count in self.stacks.most_common()
+        )
+
+    def speedscope(self, name: str = "worker") -> dict:
+        """Samples as a sampled profile in the speedscope file format."""
+        frames: list = []
+        indices: dict = dict()
+        samples = []
+        weights = []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for frame in stack:
+                if frame not in indices:
+                    indices[frame] = len(frames)
+                    frames.append(
+                        {"name": frame[0], "file": frame[1], "line": frame[2]}
+                    )
+                sample.append(indices[frame])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "exporter": "api.utils.profiler",
+        }
+
+
+async def profile(seconds: float, interval: float) -> SamplingProfiler:
+    """Profile the thread of the running event loop for `seconds`."""
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler
+
+
+async def memory_snapshot(seconds: float, key_type: str, limit: int) -> str:
+    """
+    Report the biggest growth of allocated memory over the next `seconds`.
+
+    tracemalloc slows every allocation down, so it is only started for the
+    snapshot, unless it was already tracing.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(25)
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before, after = before.filter_traces(filters), after.filter_traces(filters)
+    stats = after.compare_to(before, key_type)[:limit]
+    lines = [f"traced: {traced / 2 ** 20:.1f} MiB, peak: {peak / 2 ** 20:.1f} MiB"]
+    for stat in stats:
+        lines.append(str(stat))
+        if key_type == "traceback":
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,115 @@
+"""
+Token buckets limiting how often a client can send a command, and caps on connections.
+
+A bucket holds up to `burst` tokens and gains `rate` of them every second, each
+command takes one and is refused while the bucket is empty. A client can then send
+`burst` commands at once, but no more than `rate` a second for long. The tokens are
+only counted when one is taken, so a bucket costs nothing while it isn't used.
+
+`CommandLimits` gives every command of a connection its own bucket, from a spec like
+`MOVE:5:20,GET_BOARD:5:20,*:5:20` where `*` is the bucket of the unlisted commands.
+"""
+import time
+import typing as t
+from collections import defaultdict
+
+
+class TokenBucket:
+    """The tokens of one client, see the module docstring."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "clock")
+
+    def __init__(
+        self, rate: float, burst: float, clock: t.Callable[[], float] = time.monotonic
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, tokens: float = 1) -> bool:
+        """Take `tokens` if the bucket has them, returns whether it had."""
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def retry_after(self, tokens: float = 1) -> float:
+        """Seconds until the bucket has `tokens` again."""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+def parse_limits(spec: str) -> dict[str, tuple[float, float]]:
+    """Read a `COMMAND:rate:burst,...` spec into a dict of command -> (rate, burst)."""
+    limits = dict()
+    for item in filter(None, (item.strip() for item in spec.split(","))):
+        try:
+            command, rate, burst = item.split(":")
+            rate, burst = float(rate), float(burst)
+            # a bucket which never refills, or never holds a token, is no limit
+            if rate <= 0 or burst <= 0:
+                raise ValueError
+            limits[command] = (rate, burst)
+        except ValueError:
+            raise ValueError(
+                f"Invalid command limit {item!r}, expected COMMAND:rate:burst with a "
+                "positive rate and burst."
+            ) from None
+    return limits
+
+
+class CommandLimits:
+    """A token bucket per command of one connection, made on the command's first use."""
+
+    def __init__(self, limits: dict[str, tuple[float, float]]):
+        self.limits = limits
+        self.buckets: dict[str, TokenBucket] = dict()
+
+    def take(self, command: str) -> bool:
+        """Take a token for `command`, returns whether it may run now."""
+        bucket = self._bucket(command)
+        return bucket is None or bucket.take()
+
+    def retry_after(self, command: str) -> float:
+        """Seconds until `command` may run again."""
+        bucket = self._bucket(command)
+        return 0.0 if bucket is None else bucket.retry_after()
+
+    def _bucket(self, command: str) -> t.Optional[TokenBucket]:
+        if command not in self.limits:
+            command = "*"
+            if command not in self.limits:  # the other commands aren't limited
+                return None
+        bucket = self.buckets.get(command)
+        if bucket is None:
+            bucket = self.buckets[command] = TokenBucket(*self.limits[command])
+        return bucket
+
+
+class ConnectionLimit:
+    """The websockets each user has open, at most `limit` of them at once."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.open: dict[int, int] = defaultdict(int)
+
+    def acquire(self, user_id: int) -> bool:
+        """Count a new connection of the user, returns False if they have too many."""
+        if self.open.get(user_id, 0) >= self.limit:
+            return False
+        self.open[user_id] += 1
+        return True
+
+    def release(self, user_id: int) -> None:
+        """Forget a connection counted by `acquire`, once it is closed."""
+        self.open[user_id] -= 1
+        if not self.open[user_id]:
+            del self.open[user_id]
@@ -0,0 +1,66 @@
+"""
+Graceful shutdown of a worker, draining its rooms before the server stops.
+
+uvicorn closes every connection before the ASGI shutdown event is sent, and
+each closed websocket would end its game, so the rooms are drained first. The
+exit signals reach `uvicorn.Server.handle_exit`, whichever event loop runs the
+server, so the drain is hooked in there and the signal handed back to uvicorn
+once it is done, which then shuts down as usual.
+"""
+import asyncio
+import logging
+import signal
+import typing as t
+from types import FrameType
+
+from uvicorn.server import Server as UvicornServer
+
+log = logging.getLogger(__name__)
+
+
+def install_drain_handler(
+    drain: t.Callable[[], t.Awaitable[None]], timeout: float
+) -> None:
+    """
+    Run `drain`, for at most `timeout` seconds, before uvicorn handles an exit signal.
+
+    uvicorn binds `handle_exit` to the signals before the app starts up, so this has
+    to be called when the app is imported. A second signal skips the rest of the
+    drain.
+    """
+    handle_exit = UvicornServer.handle_exit
+    draining: t.Optional[asyncio.Task] = None
+    handed_over = False
+
+    def hand_over(
+        server: UvicornServer, sig: int, frame: t.Optional[FrameType]
+    ) -> None:
+        nonlocal handed_over
+        handed_over = True
+        handle_exit(server, sig, frame)
+
+    def finished(
+        task: asyncio.Task,
+        server: UvicornServer,
+        sig: int,
+        frame: t.Optional[FrameType],
+    ) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Draining the rooms failed", exc_info=task.exception())
+        if not handed_over:
+            hand_over(server, sig, frame)
+
+    def on_exit(server: UvicornServer, sig: int, frame: t.Optional[FrameType]) -> None:
+        nonlocal draining
+        if draining is not None:
+            if not handed_over:
+                log.warning("Exit signal received again, not waiting for the drain")
+            hand_over(server, sig, frame)
+            return
+        log.info(f"Received {signal.Signals(sig).name}, draining the rooms")
+        draining = asyncio.get_event_loop().create_task(
+            asyncio.wait_for(drain(), timeout)
+        )
+        draining.add_done_callback(lambda task: finished(task, server, sig, frame))
+
+    UvicornServer.handle_exit = on_exit
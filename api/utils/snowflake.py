@@ -0,0 +1,81 @@
+"""
+Snowflake game IDs, unique across workers without them having to agree on anything.
+
+An ID packs, from its most significant bit:
+
+    41 bits  milliseconds since EPOCH, which lasts until 2090
+    10 bits  ID of the worker which made it, see `Server.WORKER_ID`
+    12 bits  sequence number of the ID within its millisecond
+
+so it fits a signed 64 bit column, IDs made by a worker only ever increase and the
+worker owning a room is known from its ID, see `worker_of`.
+"""
+import os
+import time
+import typing as t
+from datetime import datetime, timezone
+
+from api.constants import Server
+
+# 2021-07-01 00:00:00 UTC, in milliseconds
+EPOCH = 1625097600000
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+
+class SnowflakeGenerator:
+    """
+    Makes the IDs of one worker.
+
+    There is no lock, the generator has to be used from a single thread, which is
+    the event loop of the worker.
+    """
+
+    def __init__(self, worker_id: int, clock: t.Callable[[], float] = time.time):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}.")
+        self.worker_id = worker_id
+        self.clock = clock
+        self.last_ms = -1
+        self.sequence = 0
+
+    def next_id(self) -> int:
+        """Return a new ID, greater than all the previous ones."""
+        now = int(self.clock() * 1000) - EPOCH
+        if now > self.last_ms:
+            self.last_ms, self.sequence = now, 0
+        else:
+            # same millisecond, or the clock went back, carry on from the last ID
+            self.sequence = (self.sequence + 1) & SEQUENCE_MASK
+            if not self.sequence:
+                # borrow the next millisecond rather than wait for it
+                self.last_ms += 1
+        return (
+            self.last_ms << WORKER_BITS + SEQUENCE_BITS
+            | self.worker_id << SEQUENCE_BITS
+            | self.sequence
+        )
+
+
+def worker_of(snowflake: int) -> int:
+    """ID of the worker which made `snowflake`."""
+    return snowflake >> SEQUENCE_BITS & MAX_WORKER_ID
+
+
+def created_at(snowflake: int) -> datetime:
+    """When `snowflake` was made, to the millisecond."""
+    ms = (snowflake >> WORKER_BITS + SEQUENCE_BITS) + EPOCH
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def default_worker_id() -> int:
+    """`Server.WORKER_ID`, or one derived from the process ID if it isn't set."""
+    if Server.WORKER_ID:
+        return int(Server.WORKER_ID)
+    return os.getpid() & MAX_WORKER_ID
+
+
+generator = SnowflakeGenerator(default_worker_id())
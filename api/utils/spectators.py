@@ -0,0 +1,155 @@
+"""
+Read-only spectators of the rooms, sent the boards apart from the players.
+
+A move is sent to the players while it is handled, which a room with thousands of
+spectators can't afford. The move only `publish`es the new board to the room's
+`Audience` instead, in O(1), and every spectator has its own coroutine sending it
+the boards. They are coalesced: the spectators of a room are woken at most every
+`interval` seconds, with the latest board only, and a spectator slow to receive
+skips the boards it missed. Each board is formatted once, all the spectators are
+sent the same message.
+"""
+import asyncio
+import math
+import typing as t
+
+from starlette.websockets import WebSocket
+
+from api.constants import Server
+from api.utils import metrics
+
+SPECTATORS = metrics.REGISTRY.register(
+    metrics.Gauge("spectators", "Spectators connected to the rooms of the worker.")
+)
+SPECTATOR_FRAMES = metrics.REGISTRY.register(
+    metrics.Counter("spectator_frames_total", "Boards sent to spectators.")
+)
+COALESCED_FRAMES = metrics.REGISTRY.register(
+    metrics.Counter(
+        "spectator_frames_coalesced_total",
+        "Boards replaced by a newer one before the spectators were woken.",
+    )
+)
+
+
+class Audience:
+    """The spectators of one room and the latest board they are shown."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.watchers = 0
+        # board the spectators are shown, `version` counts the boards shown so far
+        self.frame: t.Optional[str] = None
+        self.version = 0
+        # sent after the last board before the spectators are disconnected
+        self.final: t.Optional[str] = None
+        self.close_code = 1000
+        self.closed = False
+
+        self._latest: t.Optional[str] = None
+        self._last_flush = -math.inf
+        self._flush_handle: t.Optional[asyncio.TimerHandle] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, frame: str) -> None:
+        """Show `frame` to the spectators, within `interval` seconds of the last one."""
+        if self.closed:
+            return
+        if self._latest is not None:
+            COALESCED_FRAMES.inc()
+        self._latest = frame
+        if self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            delay = self._last_flush + self.interval - loop.time()
+            if delay <= 0:
+                self._flush()
+            else:
+                self._flush_handle = loop.call_later(delay, self._flush)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        self._last_flush = asyncio.get_event_loop().time()
+        self.frame, self._latest = self._latest, None
+        self.version += 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # every watcher waits on the same event, setting it wakes them all at once
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def close(self, final: t.Optional[str] = None, code: int = 1000) -> None:
+        """Show the pending board, then `final`, and disconnect the spectators."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        if self._latest is not None:
+            self._flush()
+        self.final, self.close_code = final, code
+        self.closed = True
+        self._wake()
+
+    async def watch(self, websocket: WebSocket) -> None:
+        """Send the boards to a spectator until the room is closed."""
+        version = 0
+        while True:
+            changed = self._changed
+            if version != self.version:
+                version = self.version
+                await websocket.send_text(self.frame)
+                SPECTATOR_FRAMES.inc()
+            elif self.closed:
+                if self.final:
+                    await websocket.send_text(self.final)
+                await websocket.close(code=self.close_code)
+                return
+            else:
+                await changed.wait()
+
+
+class Spectators:
+    """The audiences of the rooms which have spectators, by room name."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.rooms: dict[str, Audience] = dict()
+
+    def __len__(self) -> int:
+        return sum(audience.watchers for audience in self.rooms.values())
+
+    def join(self, room_name: str) -> Audience:
+        """Add a spectator to a room, see `Audience.watch` for sending it the boards."""
+        audience = self.rooms.get(room_name)
+        if audience is None:
+            audience = self.rooms[room_name] = Audience(self.interval)
+        audience.watchers += 1
+        return audience
+
+    def leave(self, room_name: str, audience: Audience) -> None:
+        """Remove a spectator, and the audience of the room once it is the last one."""
+        audience.watchers -= 1
+        if not audience.watchers and self.rooms.get(room_name) is audience:
+            audience.close()
+            del self.rooms[room_name]
+
+    def publish(self, room_name: str, frame: str) -> None:
+        """Show a board of `room_name` to its spectators, if it has any."""
+        audience = self.rooms.get(room_name)
+        if audience is not None:
+            audience.publish(frame)
+
+    def close(
+        self, room_name: str, final: t.Optional[str] = None, code: int = 1000
+    ) -> None:
+        """Show `final` to the spectators of a finished room and disconnect them."""
+        audience = self.rooms.pop(room_name, None)
+        if audience is not None:
+            audience.close(final, code)
+
+    def close_all(self, final: t.Optional[str] = None, code: int = 1000) -> None:
+        """Disconnect the spectators of every room, after showing them `final`."""
+        for room_name in list(self.rooms):
+            self.close(room_name, final, code)
+
+
+spectators = Spectators(Server.SPECTATE_INTERVAL)
+SPECTATORS.set_function(lambda: len(spectators))
@@ -0,0 +1,124 @@
+"""
+Per-room timing traces of the moves, from receiving them to broadcasting the new board.
+
+Each traced move records when it was received, validated by Chessnut, persisted
+to the database, enqueued for broadcast and sent to every member of the room, so
+lag can be pinned on the move validation, the database or the socket writes.
+Tracing is off unless `Server.TRACE_MOVES` is set or it is switched on through
+/admin/trace; while it is off `Tracer.begin` returns None and nothing else runs.
+"""
+import logging
+import time
+import typing as t
+from collections import defaultdict, deque
+
+from api.constants import Server
+
+log = logging.getLogger(__name__)
+
+# stages of a move in the order they happen, `sent` is recorded once per member
+STAGES = ("received", "validated", "persisted", "broadcast_enqueued", "sent")
+
+
+class MoveTrace:
+    """Timestamps of one move going through a room."""
+
+    __slots__ = ("game_id", "move", "start", "marks")
+
+    def __init__(self, game_id: str, move: str):
+        self.game_id = game_id
+        self.move = move
+        self.start = time.perf_counter()
+        self.marks: list = [("received", None, self.start)]
+
+    def mark(self, stage: str, member: t.Optional[int] = None) -> None:
+        """Record that the move reached `stage`, for `member` of the room if given."""
+        self.marks.append((stage, member, time.perf_counter()))
+
+    def stage_durations(self) -> dict:
+        """Seconds taken to reach each stage from the previous one, `sent` last."""
+        reached = {"received": self.start}
+        for stage, _, when in self.marks:
+            reached[stage] = when
+        durations = dict()
+        previous = self.start
+        for stage in STAGES[1:]:
+            if stage in reached:
+                durations[stage] = reached[stage] - previous
+                previous = reached[stage]
+        return durations
+
+    def as_dict(self) -> dict:
+        """The trace with millisecond offsets from receiving the move."""
+        return {
+            "game_id": self.game_id,
+            "move": self.move,
+            "marks": [
+                {
+                    "stage": stage,
+                    "member": member,
+                    "ms": round((when - self.start) * 1000, 3),
+                }
+                for stage, member, when in self.marks
+            ],
+        }
+
+
+class Tracer:
+    """Keeps the last `capacity` move traces of the `max_rooms` rooms last moved in."""
+
+    def __init__(self, enabled: bool, capacity: int = 200, max_rooms: int = 1000):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.max_rooms = max_rooms
+        # kept after the room closes, so complaints about a finished game can be checked
+        self.rooms: dict = dict()
+
+    def begin(self, game_id: str, move: str) -> t.Optional[MoveTrace]:
+        """Start tracing a move received in `game_id`, None while tracing is off."""
+        if not self.enabled:
+            return None
+        return MoveTrace(game_id, move)
+
+    def finish(self, trace: MoveTrace) -> None:
+        """Store a completed trace and write it to the trace log."""
+        traces = self.rooms.pop(trace.game_id, None)
+        if traces is None:
+            traces = deque(maxlen=self.capacity)
+            if len(self.rooms) >= self.max_rooms:
+                del self.rooms[next(iter(self.rooms))]
+        # reinserting keeps the rooms ordered from the least recently traced
+        self.rooms[trace.game_id] = traces
+        traces.append(trace)
+        if log.isEnabledFor(logging.INFO):
+            log.info(f"move trace {trace.as_dict()}")
+
+    def summary(self, game_id: str) -> dict:
+        """Percentiles, in milliseconds, of the time each stage took in `game_id`."""
+        traces = self.rooms.get(game_id, ())
+        per_stage = defaultdict(list)
+        for trace in traces:
+            for stage, duration in trace.stage_durations().items():
+                per_stage[stage].append(duration)
+
+        def percentile(values: list, p: float) -> float:
+            return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 3)
+
+        stages = dict()
+        for stage in STAGES[1:]:
+            values = sorted(per_stage.get(stage, ()))
+            if values:
+                stages[stage] = {
+                    "p50_ms": percentile(values, 0.5),
+                    "p99_ms": percentile(values, 0.99),
+                    "max_ms": round(values[-1] * 1000, 3),
+                }
+        return {
+            "game_id": game_id,
+            "moves": len(traces),
+            "stages": stages,
+            "last": traces[-1].as_dict() if traces else None,
+        }
+
+
+tracer = Tracer(enabled=Server.TRACE_MOVES)
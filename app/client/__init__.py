@@ -0,0 +1,9 @@
+from app.client.aio import AsyncGameClient  # noqa: F401
+from app.client.protocol import (  # noqa: F401
+    ClientError,
+    Event,
+    GameState,
+    OpenGames,
+    ServerBusyError,
+)
+from app.client.sync import GameClient  # noqa: F401
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import typing as t
+
+import httpx
+import websockets
+
+from app.client.protocol import (
+    BOARD_PREFIX,
+    ClientError,
+    Event,
+    GameState,
+    RESUME_ATTEMPTS,
+    chat_command,
+    check_error,
+    check_response,
+    check_retry,
+    get_board_command,
+    is_ping,
+    move_command,
+    parse_board,
+    pong_command,
+    resume_after,
+)
+
+log = logging.getLogger(__name__)
+
+
+class AsyncGameClient:
+    """
+    asyncio flavour of `app.client.sync.GameClient`.
+
+    Many of these can share one event loop, and one `httpx.AsyncClient` passed as
+    `http`, which is how thousands of simulated players run in a single process.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        ws_url: str,
+        token: str,
+        http: t.Optional[httpx.AsyncClient] = None,
+        timeout: t.Optional[float] = None,
+    ):
+        self.api_url = api_url
+        self.ws_url = ws_url
+        self.token = token
+        self.timeout = timeout
+        self.http = http
+        self.web_socket: t.Optional[websockets.WebSocketClientProtocol] = None
+        self.state = GameState()
+
+    @property
+    def headers(self) -> dict:
+        """Headers authenticating the client's player."""
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def __aenter__(self) -> "AsyncGameClient":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def create_lobby(self) -> str:
+        """Make a new game on the server and return its ID."""
+        url = f"{self.api_url}/game/new"
+        if self.http is None:
+            async with httpx.AsyncClient(timeout=self.timeout) as http:
+                resp = await http.get(url, headers=self.headers)
+        else:
+            resp = await self.http.get(url, headers=self.headers)
+
+        check_response(resp.status_code, resp.headers)
+        body = resp.json()
+        if "room" not in body:
+            raise ClientError(body.get("message", "Couldn't create a game."))
+        self.state.game_id = body["room"]
+        return self.state.game_id
+
+    async def list_open_games(
+        self, after: t.Optional[str] = None, limit: int = 20
+    ) -> tuple[list[dict], t.Optional[str]]:
+        """
+        Return a page of the games waiting for a second player, and the next's cursor.
+
+        Pass the cursor as `after` to get the next page, it is None on the last one.
+        """
+        url = f"{self.api_url}/game/open"
+        params = {"after": after or 0, "limit": limit}
+        if self.http is None:
+            async with httpx.AsyncClient(timeout=self.timeout) as http:
+                resp = await http.get(url, params=params, headers=self.headers)
+        else:
+            resp = await self.http.get(url, params=params, headers=self.headers)
+
+        check_response(resp.status_code, resp.headers)
+        body = resp.json()
+        return body["games"], body["next"]
+
+    async def list_all_open_games(self) -> list[dict]:
+        """List all the games waiting for a second player, following the pages."""
+        games, after = [], None
+        while True:
+            page, after = await self.list_open_games(after, limit=100)
+            games += page
+            if after is None:
+                return games
+
+    async def lobby_events(self) -> t.AsyncIterator[Event]:
+        """
+        Iterate over the changes of the open games until the server closes the stream.
+
+        The first event asks to list the games, see `OpenGames` for keeping a listing
+        up to date with them.
+        """
+        async with websockets.connect(
+            f"{self.ws_url}/game/open/stream", extra_headers=self.headers
+        ) as web_socket:
+            async for message in web_socket:
+                event = Event.parse(message)
+                if is_ping(event):
+                    await web_socket.send(pong_command())
+                    continue
+                yield event
+
+    async def connect(
+        self, game_id: str, on_event: t.Optional[t.Callable[[Event], None]] = None
+    ) -> int:
+        """
+        Join the game `game_id` and wait until all the players have connected.
+
+        `on_event` is called with each event received while waiting,
+        the player ID (1 or 2) of the client is returned.
+        """
+        self.state.game_id = game_id
+        try:
+            self.web_socket = await asyncio.wait_for(
+                websockets.connect(
+                    f"{self.ws_url}/game/{game_id}", extra_headers=self.headers
+                ),
+                self.timeout,
+            )
+        except websockets.InvalidStatusCode as e:
+            raise ClientError("Sever Error pls.. Try Again....") from e
+        return await self._wait_until_ready(on_event)
+
+    async def queue(
+        self,
+        rating: t.Optional[int] = None,
+        on_event: t.Optional[t.Callable[[Event], None]] = None,
+    ) -> int:
+        """
+        Wait for the server to pair the client with an opponent and start the game.
+
+        Players with a `rating` are paired with players rated close to them. The game ID
+        is in `state.game_id` once matched, `on_event` and the return value are the same
+        as for `connect`.
+        """
+        url = f"{self.ws_url}/game/queue"
+        if rating is not None:
+            url += f"?rating={rating}"
+        try:
+            self.web_socket = await asyncio.wait_for(
+                websockets.connect(url, extra_headers=self.headers), self.timeout
+            )
+        except websockets.InvalidStatusCode as e:
+            raise ClientError("Sever Error pls.. Try Again....") from e
+        return await self._wait_until_ready(on_event)
+
+    async def _wait_until_ready(
+        self, on_event: t.Optional[t.Callable[[Event], None]]
+    ) -> int:
+        while not self.state.ready:
+            event = await self.recv()
+            check_retry(event)
+            check_error(event)
+            if on_event:
+                on_event(event)
+        return self.state.player_id
+
+    async def send(self, message: str) -> None:
+        """Send a raw `PREFIX::COMMAND::<VALUE>` message."""
+        await self.web_socket.send(message)
+
+    async def send_move(self, move: str) -> None:
+        """Play `move`, in simple algebraic notation like e2e4."""
+        await self.send(move_command(move))
+
+    async def send_chat(self, text: str) -> None:
+        """Send `text` to the chat, both players get it as a `CHAT::MESSAGE` event."""
+        await self.send(chat_command(text))
+
+    async def request_board(self) -> None:
+        """Ask the server for the current board, sent back as a `BOARD::BOARD` event."""
+        await self.send(get_board_command())
+
+    async def recv(self) -> Event:
+        """
+        Wait for the next event from the server and update the state with it.
+
+        When the server hands the game over to another one, the client rejoins
+        it before the `INFO::RESUME` event is returned.
+        """
+        event = Event.parse(await self.web_socket.recv())
+        self.state.apply(event)
+        log.debug(f"received {event}")
+        if is_ping(event):
+            await self.send(pong_command())
+        delay = resume_after(event)
+        if delay is not None:
+            await self.resume(delay)
+        return event
+
+    async def resume(self, delay: float) -> None:
+        """Rejoin the game in `delay` seconds, backing off while the server is away."""
+        game_id = self.state.game_id
+        await self.close()
+        self.state.ready = False
+        for _ in range(RESUME_ATTEMPTS):
+            await asyncio.sleep(delay)
+            try:
+                await self.connect(game_id)
+                return
+            except (ClientError, OSError, websockets.WebSocketException) as e:
+                log.debug(f"couldn't rejoin {game_id}: {e}")
+                delay = max(2 * delay, 1)
+        raise ClientError("Lost the connection to the game.")
+
+    async def events(self) -> t.AsyncIterator[Event]:
+        """Iterate over the events from the server until the game is over."""
+        while not self.state.is_over:
+            yield await self.recv()
+
+    async def watch(self, game_id: str) -> t.AsyncIterator[Event]:
+        """
+        Follow the game `game_id` as a spectator, until the server disconnects it.
+
+        Boards coming faster than the server sends them to spectators are skipped, the
+        latest one is always sent. The iteration ends with the game, or after an
+        `INFO::RESUME` event after which the game can be watched again.
+        """
+        self.state.game_id = game_id
+        try:
+            self.web_socket = await asyncio.wait_for(
+                websockets.connect(
+                    f"{self.ws_url}/game/{game_id}/watch", extra_headers=self.headers
+                ),
+                self.timeout,
+            )
+        except websockets.InvalidStatusCode as e:
+            raise ClientError("Sever Error pls.. Try Again....") from e
+
+        try:
+            async for message in self.web_socket:
+                event = Event.parse(message)
+                if is_ping(event):
+                    await self.send(pong_command())
+                    continue
+                check_retry(event)
+                check_error(event)
+                self.state.apply(event)
+                yield event
+        except websockets.ConnectionClosed:
+            return
+
+    async def wait_for(self, prefix: str, command: t.Optional[str] = None) -> Event:
+        """Skip events until one with `prefix`, and `command` if given, arrives."""
+        while True:
+            event = await self.recv()
+            if event.is_(prefix, command):
+                return event
+
+    async def wait_for_board(
+        self, predicate: t.Optional[t.Callable[[str], bool]] = None
+    ) -> str:
+        """Wait for a board broadcast, matching `predicate` if any, return its FEN."""
+        while True:
+            event = await self.wait_for(BOARD_PREFIX, BOARD_PREFIX)
+            fen, _ = parse_board(event.value)
+            if predicate is None or predicate(fen):
+                return fen
+
+    async def close(self) -> None:
+        """Close the connection to the game."""
+        if self.web_socket is not None:
+            await self.web_socket.close()
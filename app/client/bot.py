@@ -0,0 +1,85 @@
+"""
+Minimal SDK for writing bots on top of `AsyncGameClient`.
+
+    class FirstMoveBot(Bot):
+        def choose_move(self, fen, moves):
+            return moves[0]
+
+    async with AsyncGameClient(api_url, ws_url, token) as client:
+        await client.connect(game_id)
+        winner = await play(client, FirstMoveBot())
+"""
+import abc
+import random
+import time
+import typing as t
+
+from Chessnut import Game as ChessnutGame
+
+from app.client.aio import AsyncGameClient
+from app.client.protocol import BOARD_PREFIX, is_white_turn
+
+
+def legal_moves(fen: str) -> list:
+    """The legal moves, in simple algebraic notation, of the side to play in `fen`."""
+    return ChessnutGame(fen).get_moves()
+
+
+class Bot(abc.ABC):
+    """Base class of the bots, subclasses decide which move to play."""
+
+    @abc.abstractmethod
+    def choose_move(self, fen: str, moves: list) -> str:
+        """Pick one of the legal `moves` to play in the position `fen`."""
+
+
+class RandomBot(Bot):
+    """Bot playing uniformly random legal moves."""
+
+    def __init__(self, seed: t.Optional[int] = None):
+        self.random = random.Random(seed)
+
+    def choose_move(self, fen: str, moves: list) -> str:
+        """Pick a random legal move."""
+        return self.random.choice(moves)
+
+
+async def play(
+    client: AsyncGameClient,
+    bot: Bot,
+    max_plies: t.Optional[int] = None,
+    on_ack: t.Optional[t.Callable[[float], None]] = None,
+) -> t.Optional[str]:
+    """
+    Play the game `client` is connected to with `bot` until it's over.
+
+    Stops after `max_plies` half moves if given, `on_ack` is called with the seconds
+    between sending each move and receiving the board broadcast acknowledging it.
+    Returns the winner ("p1"/"p2") if the server declared one.
+    """
+    state = client.state
+    await client.request_board()
+    await client.wait_for_board()
+
+    while not state.is_over:
+        ply = int(state.fen.split(" ")[5]) * 2 - is_white_turn(state.fen)
+        if max_plies is not None and ply > max_plies:
+            break
+        if not state.is_my_turn:
+            await client.recv()
+            continue
+
+        moves = legal_moves(state.fen)
+        if not moves:
+            # checkmate or stalemate, there are no draws so the side to play concedes
+            await client.send(f"{BOARD_PREFIX}::SURRENDER::p{state.player_id}")
+            await client.wait_for(BOARD_PREFIX, "OVER")
+            break
+
+        fen = state.fen
+        sent = time.perf_counter()
+        await client.send_move(bot.choose_move(fen, moves))
+        await client.wait_for_board(lambda new_fen: new_fen != fen)
+        if on_ack:
+            on_ack(time.perf_counter() - sent)
+    return state.winner
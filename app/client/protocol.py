@@ -0,0 +1,211 @@
+"""
+Sans-IO side of the game protocol, shared by the blocking and asyncio clients.
+
+Every websocket message has the form `PREFIX::COMMAND::<VALUE>`, see
+`api.endpoints.games.game_talking_endpoint` for the server side.
+"""
+import typing as t
+from collections import deque
+
+BOARD_PREFIX = "BOARD"
+CHAT_PREFIX = "CHAT"
+INFO_PREFIX = "INFO"
+LOBBY_PREFIX = "LOBBY"
+
+# times a client tries to rejoin its game after the server handed it over
+RESUME_ATTEMPTS = 5
+# chat messages kept by a client, the older ones are forgotten
+CHAT_HISTORY = 100
+
+
+class ClientError(Exception):
+    """Error raised when the server refuses a request of the client."""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ServerBusyError(ClientError):
+    """Error raised when the server is overloaded and turned the client away."""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"The server is busy, try again in {retry_after} seconds.")
+
+
+class Event:
+    """A message received from the server."""
+
+    __slots__ = ("prefix", "command", "value", "raw")
+
+    def __init__(self, prefix: str, command: str, value: str, raw: str):
+        self.prefix = prefix
+        self.command = command
+        self.value = value
+        self.raw = raw
+
+    def __repr__(self) -> str:
+        return f"<Event {self.raw!r}>"
+
+    def is_(self, prefix: str, command: t.Optional[str] = None) -> bool:
+        """Whether the event has the given `prefix` and optionally `command`."""
+        return self.prefix == prefix and (command is None or self.command == command)
+
+    @classmethod
+    def parse(cls, message: str) -> "Event":
+        """Split a raw websocket message into an event."""
+        parts = message.split("::", 2)
+        parts += [""] * (3 - len(parts))
+        return cls(*parts, raw=message)
+
+
+def move_command(move: str) -> str:
+    """Command applying `move`, in simple algebraic notation like e2e4, to the board."""
+    return f"{BOARD_PREFIX}::MOVE::{move.lower()}"
+
+
+def get_board_command() -> str:
+    """Command asking the server for the current board."""
+    return f"{BOARD_PREFIX}::GET_BOARD"
+
+
+def pong_command() -> str:
+    """Answer to an `INFO::PING`, telling the server the client is still there."""
+    return f"{INFO_PREFIX}::PONG"
+
+
+def is_ping(event: Event) -> bool:
+    """Whether `event` is the server checking that the client is still there."""
+    return event.is_(INFO_PREFIX, "PING")
+
+
+def chat_command(text: str) -> str:
+    """Command sending `text` to the chat of the game."""
+    return f"{CHAT_PREFIX}::SEND::{text}"
+
+
+def parse_board(value: str) -> tuple[str, t.Optional[tuple[float, float]]]:
+    """
+    FEN of a `BOARD::BOARD` value, and the seconds left to player one and two.
+
+    The seconds are None unless the game is timed, its value is then
+    `<fen>::<p1 ms>,<p2 ms>`.
+    """
+    fen, _, clock = value.partition("::")
+    if not clock:
+        return fen, None
+    player_one, player_two = clock.split(",")
+    return fen, (int(player_one) / 1000, int(player_two) / 1000)
+
+
+def is_white_turn(fen: str) -> bool:
+    """Returns if it's white's turn in `fen`."""
+    return fen.split(" ")[1] == "w"
+
+
+def check_retry(event: Event) -> None:
+    """Raise `ServerBusyError` if `event` tells the client to come back later."""
+    if event.is_(INFO_PREFIX, "RETRY"):  # INFO::RETRY::<seconds>
+        raise ServerBusyError(int(event.value or 0))
+
+
+def check_error(event: Event) -> None:
+    """Raise `ClientError` if `event` says the server refused the client."""
+    if event.is_(INFO_PREFIX, "ERROR"):  # INFO::ERROR::<message>
+        raise ClientError(event.value)
+
+
+def resume_after(event: Event) -> t.Optional[int]:
+    """Seconds to wait before reconnecting if `event` says the game moves elsewhere."""
+    if event.is_(INFO_PREFIX, "RESUME"):  # INFO::RESUME::<seconds>
+        return int(event.value or 0)
+    return None
+
+
+def check_response(status_code: int, headers: t.Mapping) -> None:
+    """Raise `ServerBusyError` or `ClientError` for an unsuccessful HTTP response."""
+    if status_code == 503:
+        raise ServerBusyError(int(headers.get("Retry-After", 0)))
+    if status_code != 200:
+        raise ClientError(f"server returned Error code {status_code}")
+
+
+class GameState:
+    """What a client knows about its game, updated from the server events."""
+
+    def __init__(self):
+        self.game_id: t.Optional[str] = None
+        self.player_id: t.Optional[int] = None
+        self.ready = False
+        self.fen: t.Optional[str] = None
+        # seconds left to player one and two when the board was sent, in timed games
+        self.clock: t.Optional[tuple[float, float]] = None
+        self.winner: t.Optional[str] = None
+        # (sender, text) of the latest chat messages, the sender is p1 or p2, or empty
+        # for the server refusing a message of this client
+        self.chat: deque[tuple[str, str]] = deque(maxlen=CHAT_HISTORY)
+
+    @property
+    def is_over(self) -> bool:
+        """Whether the server declared the game over."""
+        return self.winner is not None
+
+    @property
+    def is_my_turn(self) -> bool:
+        """Whether it's the turn of this client's player, p1 plays white."""
+        if self.fen is None or self.player_id is None:
+            return False
+        return is_white_turn(self.fen) == (self.player_id == 1)
+
+    def apply(self, event: Event) -> None:
+        """Update the state from an event received from the server."""
+        if event.prefix == INFO_PREFIX:
+            if event.command == "PLAYER":  # INFO::PLAYER::p1
+                self.player_id = int(event.value[-1])
+            elif event.command == "READY":
+                self.ready = True
+            elif event.command == "MATCHED":  # INFO::MATCHED::<game ID>
+                self.game_id = event.value
+        elif event.prefix == BOARD_PREFIX:
+            if event.command == BOARD_PREFIX:  # BOARD::BOARD::<fen>[::<clock>]
+                self.fen, self.clock = parse_board(event.value)
+            elif event.command == "OVER":  # BOARD::OVER::p1
+                self.winner = event.value
+        elif event.prefix == CHAT_PREFIX:
+            if event.command == "MESSAGE":  # CHAT::MESSAGE::p1,<text>
+                sender, _, text = event.value.partition(",")
+                self.chat.append((sender, text))
+            elif event.command == "REJECTED":  # CHAT::REJECTED::<reason>
+                self.chat.append(("", event.value))
+
+
+class OpenGames:
+    """The games waiting for a second player, updated from the open games stream."""
+
+    def __init__(self):
+        # game ID -> ID of the player who made it
+        self.games: dict[str, int] = dict()
+        # the games need listing again, which the open games stream asks for first
+        self.stale = True
+
+    def reset(self, games: t.Iterable[dict]) -> None:
+        """Replace the games with a listing of /game/open."""
+        self.games = {game["game_id"]: game["player_one_id"] for game in games}
+        self.stale = False
+
+    def sorted(self) -> list[tuple[str, int]]:
+        """(game ID, player one ID) of every game, oldest first."""
+        return sorted(self.games.items(), key=lambda game: int(game[0]))
+
+    def apply(self, event: Event) -> None:
+        """Update the games from an event of the open games stream."""
+        if event.prefix != LOBBY_PREFIX:
+            return
+        if event.command == "ADD":  # LOBBY::ADD::<game ID>,<player one ID>
+            game_id, player_one_id = event.value.split(",")
+            self.games[game_id] = int(player_one_id)
+        elif event.command == "REMOVE":  # LOBBY::REMOVE::<game ID>
+            self.games.pop(event.value, None)
+        elif event.command == "RESET":
+            self.stale = True
@@ -0,0 +1,303 @@
+import logging
+import select
+import time
+import typing as t
+
+import httpx
+from websocket import (
+    WebSocket,
+    WebSocketBadStatusException,
+    WebSocketConnectionClosedException,
+    WebSocketException,
+)
+
+from app.client.protocol import (
+    BOARD_PREFIX,
+    ClientError,
+    Event,
+    GameState,
+    RESUME_ATTEMPTS,
+    chat_command,
+    check_error,
+    check_response,
+    check_retry,
+    get_board_command,
+    is_ping,
+    move_command,
+    parse_board,
+    pong_command,
+    resume_after,
+)
+
+log = logging.getLogger(__name__)
+
+
+class GameClient:
+    """
+    Blocking client for the game API, which doesn't need a terminal.
+
+    This is what the TUI uses to talk to the server, it can equally be driven
+    by a script or a bot.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        ws_url: str,
+        token: str,
+        timeout: t.Optional[float] = None,
+    ):
+        self.api_url = api_url
+        self.ws_url = ws_url
+        self.token = token
+        self.timeout = timeout
+        self.web_socket = WebSocket()
+        self.lobby_socket: t.Optional[WebSocket] = None
+        self.state = GameState()
+
+    @property
+    def headers(self) -> dict:
+        """Headers authenticating the client's player."""
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def create_lobby(self) -> str:
+        """Make a new game on the server and return its ID."""
+        resp = httpx.get(
+            f"{self.api_url}/game/new", headers=self.headers, timeout=self.timeout
+        )
+        check_response(resp.status_code, resp.headers)
+        body = resp.json()
+        if "room" not in body:
+            raise ClientError(body.get("message", "Couldn't create a game."))
+        self.state.game_id = body["room"]
+        return self.state.game_id
+
+    def list_open_games(
+        self, after: t.Optional[str] = None, limit: int = 20
+    ) -> tuple[list[dict], t.Optional[str]]:
+        """
+        Return a page of the games waiting for a second player, and the next's cursor.
+
+        Pass the cursor as `after` to get the next page, it is None on the last one.
+        """
+        resp = httpx.get(
+            f"{self.api_url}/game/open",
+            params={"after": after or 0, "limit": limit},
+            headers=self.headers,
+            timeout=self.timeout,
+        )
+        check_response(resp.status_code, resp.headers)
+        body = resp.json()
+        return body["games"], body["next"]
+
+    def list_all_open_games(self) -> list[dict]:
+        """List all the games waiting for a second player, following the pages."""
+        games, after = [], None
+        while True:
+            page, after = self.list_open_games(after, limit=100)
+            games += page
+            if after is None:
+                return games
+
+    def lobby_events(self) -> t.Iterator[Event]:
+        """
+        Iterate over the open games' changes until `close_lobby_events` is called.
+
+        The first event asks to list the games, see `OpenGames` for keeping a listing
+        up to date with them.
+        """
+        web_socket = self.lobby_socket = WebSocket()
+        web_socket.connect(
+            f"{self.ws_url}/game/open/stream", header=self.headers, timeout=None
+        )
+        try:
+            while True:
+                event = Event.parse(web_socket.recv())
+                if is_ping(event):
+                    web_socket.send(pong_command())
+                    continue
+                yield event
+        except WebSocketConnectionClosedException:
+            return
+        finally:
+            web_socket.close()
+
+    def close_lobby_events(self) -> None:
+        """Stop the iteration of `lobby_events`, from any thread."""
+        if self.lobby_socket is not None:
+            self.lobby_socket.abort()
+            self.lobby_socket = None
+
+    def connect(
+        self, game_id: str, on_event: t.Optional[t.Callable[[Event], None]] = None
+    ) -> int:
+        """
+        Join the game `game_id` and wait until all the players have connected.
+
+        `on_event` is called with each event received while waiting,
+        the player ID (1 or 2) of the client is returned.
+        """
+        self.state.game_id = game_id
+        url = f"{self.ws_url}/game/{game_id}"
+        try:
+            self.web_socket.connect(url, header=self.headers, timeout=self.timeout)
+        except WebSocketBadStatusException as e:
+            raise ClientError("Sever Error pls.. Try Again....") from e
+        return self._wait_until_ready(on_event)
+
+    def queue(
+        self,
+        rating: t.Optional[int] = None,
+        on_event: t.Optional[t.Callable[[Event], None]] = None,
+    ) -> int:
+        """
+        Wait for the server to pair the client with an opponent and start the game.
+
+        Players with a `rating` are paired with players rated close to them. The game ID
+        is in `state.game_id` once matched, `on_event` and the return value are the same
+        as for `connect`.
+        """
+        url = f"{self.ws_url}/game/queue"
+        if rating is not None:
+            url += f"?rating={rating}"
+        try:
+            self.web_socket.connect(url, header=self.headers, timeout=self.timeout)
+        except WebSocketBadStatusException as e:
+            raise ClientError("Sever Error pls.. Try Again....") from e
+
+        # finding an opponent can take longer than any response
+        self.web_socket.settimeout(None)
+        try:
+            return self._wait_until_ready(on_event)
+        finally:
+            self.web_socket.settimeout(self.timeout)
+
+    def _wait_until_ready(self, on_event: t.Optional[t.Callable[[Event], None]]) -> int:
+        while not self.state.ready:
+            event = self.recv()
+            check_retry(event)
+            check_error(event)
+            if on_event:
+                on_event(event)
+        return self.state.player_id
+
+    def send(self, message: str) -> None:
+        """Send a raw `PREFIX::COMMAND::<VALUE>` message."""
+        self.web_socket.send(message)
+
+    def send_move(self, move: str) -> None:
+        """Play `move`, in simple algebraic notation like e2e4."""
+        self.send(move_command(move))
+
+    def send_chat(self, text: str) -> None:
+        """Send `text` to the chat, both players get it as a `CHAT::MESSAGE` event."""
+        self.send(chat_command(text))
+
+    def request_board(self) -> None:
+        """Ask the server for the current board, sent back as a `BOARD::BOARD` event."""
+        self.send(get_board_command())
+
+    def recv(self) -> Event:
+        """
+        Wait for the next event from the server and update the state with it.
+
+        When the server hands the game over to another one, the client rejoins
+        it before the `INFO::RESUME` event is returned.
+        """
+        event = Event.parse(self.web_socket.recv())
+        self.state.apply(event)
+        log.debug(f"received {event}")
+        if is_ping(event):
+            self.send(pong_command())
+        delay = resume_after(event)
+        if delay is not None:
+            self.resume(delay)
+        return event
+
+    def poll(self) -> list[Event]:
+        """
+        Receive the events which arrived already, without waiting for more.
+
+        A client busy with something else than the game, e.g. waiting for its player
+        to pick a move, polls from time to time to answer the server's pings.
+        """
+        events = []
+        while (
+            self.web_socket.connected
+            and select.select([self.web_socket.sock], [], [], 0)[0]
+        ):
+            events.append(self.recv())
+        return events
+
+    def resume(self, delay: float) -> None:
+        """Rejoin the game in `delay` seconds, backing off while the server is away."""
+        game_id = self.state.game_id
+        self.close()
+        self.state.ready = False
+        for _ in range(RESUME_ATTEMPTS):
+            time.sleep(delay)
+            try:
+                self.web_socket = WebSocket()
+                self.connect(game_id)
+                return
+            except (ClientError, OSError, WebSocketException) as e:
+                log.debug(f"couldn't rejoin {game_id}: {e}")
+                delay = max(2 * delay, 1)
+        raise ClientError("Lost the connection to the game.")
+
+    def events(self) -> t.Iterator[Event]:
+        """Iterate over the events from the server until the game is over."""
+        while not self.state.is_over:
+            yield self.recv()
+
+    def watch(self, game_id: str) -> t.Iterator[Event]:
+        """
+        Follow the game `game_id` as a spectator, until the server disconnects it.
+
+        Boards coming faster than the server sends them to spectators are skipped, the
+        latest one is always sent. The iteration ends with the game, or after an
+        `INFO::RESUME` event after which the game can be watched again.
+        """
+        self.state.game_id = game_id
+        url = f"{self.ws_url}/game/{game_id}/watch"
+        try:
+            self.web_socket.connect(url, header=self.headers, timeout=self.timeout)
+        except WebSocketBadStatusException as e:
+            raise ClientError("Sever Error pls.. Try Again....") from e
+
+        # the boards only come when the players move
+        self.web_socket.settimeout(None)
+        try:
+            while message := self.web_socket.recv():
+                event = Event.parse(message)
+                if is_ping(event):
+                    self.send(pong_command())
+                    continue
+                check_retry(event)
+                check_error(event)
+                self.state.apply(event)
+                yield event
+        except WebSocketConnectionClosedException:
+            return
+        finally:
+            self.web_socket.settimeout(self.timeout)
+
+    def wait_for(self, prefix: str, command: t.Optional[str] = None) -> Event:
+        """Skip events until one with `prefix`, and `command` if given, arrives."""
+        while True:
+            event = self.recv()
+            if event.is_(prefix, command):
+                return event
+
+    def wait_for_board(
+        self, predicate: t.Optional[t.Callable[[str], bool]] = None
+    ) -> str:
+        """Wait for a board broadcast, matching `predicate` if any, return its FEN."""
+        while True:
+            fen, _ = parse_board(self.wait_for(BOARD_PREFIX, BOARD_PREFIX).value)
+            if predicate is None or predicate(fen):
+                return fen
+
+    def close(self) -> None:
+        """Close the connection to the game."""
+        self.web_socket.close()
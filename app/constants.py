@@ -46,7 +46,12 @@ class Menu:
             "gm_options_highlight",
         ),
         " Join Game ": (
-            "Join a pre-existing game of your choice",
+            "Browse the games waiting for an opponent and join one",
+            "gm_options",
+            "gm_options_highlight",
+        ),
+        " Quick Match ": (
+            "Waits for the server to pair you with another player",
             "gm_options",
             "gm_options_highlight",
         ),
@@ -71,6 +76,13 @@ class ChessGame:
     BLACK_PIECES = ("r", "n", "b", "q", "k", "p")
     WHITE_PIECES = ("R", "N", "B", "Q", "K", "P")
 
+    # chat lines shown above the chat box, and the longest message the server accepts
+    CHAT_LINES = 8
+    CHAT_MAX_LENGTH = 200
+    # seconds between the checks for messages while waiting for a key, the server
+    # closes a connection which doesn't answer its pings
+    POLL_INTERVAL = 1
+
 
 class Connections:
     """Stores the API connection urls i.e. the api and websocket url."""
@@ -3,23 +3,27 @@ import logging
 import os.path
 import socket
 import sys
+import threading
 from copy import deepcopy
-from typing import Optional
+from typing import Callable, Optional
 
 import httpx
 import websocket
 from blessed import Terminal
+from blessed.keyboard import Keystroke
 from numpy import ones
 from platformdirs import user_cache_dir
-from websocket import (
-    WebSocket,
-    WebSocketBadStatusException,
-)
 
 from app import ascii_art
 from app.chess import ChessBoard
+from app.client import ClientError, Event, GameClient, OpenGames
+from app.client.protocol import CHAT_PREFIX
 from app.constants import ChessGame, Connections, Menu, WelcomeScreen
 from app.ui.Colour import ColourScheme
+from app.ui.board import DirtySquares
+from app.ui.layout import Layout, ResizeWatcher
+from app.ui.renderer import FrameBuffer
+from app.ui.tiles import TileCache
 
 websocket.setdefaulttimeout(10)
 
@@ -62,18 +66,20 @@ class Game:
        - turns of players when playing locally
     """
 
-    def __init__(self):
-        self.term = Terminal()
+    def __init__(self, terminal: Optional[Terminal] = None):
+        self.term = terminal or Terminal()
+        self.frame = FrameBuffer(self.term)
+        self.dirty = DirtySquares()
         self.player = None
         self.game_id = None  # the game lobby id that the server will provide for online multiplayer
 
         self.api_url = Connections.API_URL
         self.ws_url = Connections.WEBSOCKET_URL
-        self.headers = dict()
-        self.web_socket = WebSocket()
+        self.client: Optional[GameClient] = None
 
-        self.w = self.term.width
-        self.h = self.term.height
+        self.layout = Layout(self.term.width, self.term.height)
+        self.resize = ResizeWatcher(self.term)
+        self.resize.subscribe(self.on_resize)
 
         self.colour_scheme = "default"
         self.theme = ColourScheme(self.term, theme=self.colour_scheme)
@@ -82,23 +88,23 @@ class Game:
         self.chess_board = self.fen_to_board(self.chess.give_board())
         self.fen = ChessGame.INITIAL_FEN
 
-        self.tile_width = 6
-        self.tile_height = 3
+        self.tiles = None
+        self.apply_layout()
+        light, dark = self.tiles.square_colours
+        self.square_colours = [
+            [light if (row + col) % 2 == 0 else dark for col in range(8)]
+            for row in range(8)
+        ]
 
         # self.my_color = 'white' # for future
         self.white_move = True  # this will change in multiplayer game
 
-        self.x_shift = int(self.w * 0.3)
-        self.y_shift = int(self.h * 0.2)
-
         self.x = 0
         self.y = 0
 
         self.chat_enabled = False
-        self.chat_box_width = self.w - int(self.w * 0.745) - 1
-        self.chat_hist_height = 1
-        self.full_chat_hist = ""
-        self.chat_box_x = int(self.w * 0.70)
+        # latest chat message drawn, see `show_new_chat`
+        self.chat_shown = None
 
         self.selected_row = 6
         self.selected_col = 0
@@ -118,6 +124,32 @@ class Game:
     def __len__(self) -> int:
         return 8
 
+    def apply_layout(self) -> None:
+        """Copy the geometry of `self.layout`, rebuilding the tiles if they resized."""
+        self.w, self.h = self.layout.w, self.layout.h
+        self.x_shift, self.y_shift = self.layout.x_shift, self.layout.y_shift
+        self.chat_box_width = self.layout.chat_box_width
+        self.chat_box_x = self.layout.chat_box_x
+        self.tile_width = self.layout.tile_width
+        self.tile_height = self.layout.tile_height
+
+        if self.tiles is None or (self.tiles.tile_width, self.tiles.tile_height) != (
+            self.tile_width,
+            self.tile_height,
+        ):
+            self.tiles = TileCache(
+                self.term, self.colour_scheme, self.tile_width, self.tile_height
+            )
+
+    def on_resize(self, width: int, height: int) -> None:
+        """Recompute the layout for the new terminal size and repaint the screen."""
+        self.layout.update(width, height)
+        self.apply_layout()
+        # everything on the screen moved, none of the old frame can be reused
+        self.frame.reset()
+        if self.screen == "game":
+            self.draw_game_screen()
+
     @staticmethod
     def supports_color() -> bool:
         """Check whether the user's terminal supports colors."""
@@ -170,54 +202,26 @@ class Game:
             print(ex)
             return False
 
-    @staticmethod
-    def ensure_terminal_size(terminal: Terminal) -> None:
+    def ensure_terminal_size(self) -> None:
         """Ensure that the terminal is sized so as to properly render the entire game."""
-        t = terminal
-        min_height = 33
-        min_width = 133
-        height, width = t.height, t.width
-        midline = height // 2
-        size_good = False
-        while not size_good:
-            if height >= min_height and width >= min_width:
+        t = self.term
+        while not self.layout.fits:
+            if self.layout.h < self.layout.MIN_HEIGHT:
+                message = "Please increase the height of your terminal window!"
+            else:
+                message = "Please increase the width of your terminal window!"
+            print(t.clear + t.move_y(self.layout.h // 2) + t.center(message).rstrip())
+            # sleeps until SIGWINCH, `on_resize` updates the layout
+            self.resize.wait()
 
-                print(
-                    t.clear
-                    + t.move_y(midline)
-                    + t.center("Nicely done! Hit [ENTER]] to continue...").rstrip()
-                )
-                while not size_good:
-                    key = t.inkey()
-                    if not key:
-                        continue
-                    elif key.name == "KEY_ENTER":
-                        break
-                size_good = True
-            elif height < min_height:
-                print(
-                    t.clear
-                    + t.move_y(midline)
-                    + t.center(
-                        "Please increase the height of your terminal window!"
-                    ).rstrip()
-                )
-                while height == t.height:
-                    pass
-                height = t.height
-            elif width < min_width:
-                print(
-                    t.clear
-                    + t.move_y(midline)
-                    + t.center(
-                        "Please increase the width of your terminal window!"
-                    ).rstrip()
-                )
-                while width == t.width:
-                    pass
-                width = t.width
-            midline = height // 2
-        return
+        print(
+            t.clear
+            + t.move_y(self.layout.h // 2)
+            + t.center("Nicely done! Hit [ENTER]] to continue...").rstrip()
+        )
+        with t.cbreak():
+            while t.inkey().name != "KEY_ENTER":
+                pass
 
     def ask_or_get_token(self) -> str:
         """
@@ -280,60 +284,165 @@ class Game:
                 return "BACK"
 
             self.player = Player(token)
+            self.client = GameClient(self.api_url, self.ws_url, self.player.token)
             # get the game id
-            self.headers.update({"Authorization": f"Bearer {self.player.token}"})
-            resp = ""
-            url = f"{self.api_url}/game/new"
-
             try:
-                resp = httpx.get(url, headers=self.headers)
-                if resp.status_code != 200:
-                    return f"server returned Error code {resp.status_code}"
-                self.game_id = resp.json()["room"]
+                self.game_id = self.client.create_lobby()
                 return "New lobby created Press [ENTER] to continue"
+            except ClientError as e:
+                return e.message
             except httpx.HTTPError:
-                print(url)
-                raise
-            except httpx.ReadTimeout:
-                print(url)
+                print(f"{self.api_url}/game/new")
                 raise
         else:
             return "Restart Game ..."
 
     def connect_to_lobby(self) -> str:
-        """Connect to a lobby after Creating one or with game_id."""
-        if not self.game_id:
-            self.game_id = input("Enter Game id :- ").strip()
+        """Connect to a lobby after Creating one, or to one picked in the browser."""
         if not self.player:
             if Connections.LOCAL_TESTING == "True":
                 self.player = Player(Connections.TOKEN_2)
             else:
                 self.player = Player(self.ask_or_get_token())
-            self.headers = {"Authorization": f"Bearer {self.player.token}"}
+        if not self.client:
+            self.client = GameClient(self.api_url, self.ws_url, self.player.token)
+        if not self.game_id:
+            try:
+                self.game_id = self.browse_lobbies()
+            except ClientError as e:
+                return e.message
+            if not self.game_id:
+                return "BACK"
+
+        def show_player_id(event: Event) -> None:
+            if event.is_("INFO", "PLAYER"):  # INFO::PLAYER::p1
+                print(self.client.state.player_id)
 
-        ws_url = f"{self.ws_url}/game/{self.game_id}"
-        data = ""
         try:
-            self.web_socket.connect(ws_url, header=self.headers)
-            data = "INFO::INIT"
             print(self.term.home + self.theme.background + self.term.clear)
             print(f"lobby id :- {self.game_id}")
             print("Waiting for all players to connect ....")
+            self.player.player_id = self.client.connect(
+                self.game_id, on_event=show_player_id
+            )
+            return "READY"
+
+        except ClientError as e:
+            return e.message
+        except Exception:
+            log.error(f"{self.ws_url}/game/{self.game_id}")
+            raise
+
+    def quick_match(self) -> str:
+        """Wait in the matchmaking queue until the server pairs the player up."""
+        if not self.player:
+            if Connections.LOCAL_TESTING == "True":
+                self.player = Player(Connections.TOKEN_2)
+            else:
+                self.player = Player(self.ask_or_get_token())
+        if not self.client:
+            self.client = GameClient(self.api_url, self.ws_url, self.player.token)
 
-            while data[1] != "READY":
-                data = self.web_socket.recv().split("::")
-                if data[1] == "PLAYER":  # INFO::PLAYER::p1
-                    self.player.player_id = int(data[2][-1])
-                    print(self.player.player_id)
+        def show_progress(event: Event) -> None:
+            if event.is_("INFO", "QUEUED"):  # INFO::QUEUED::<players waiting>
+                print(f"Players waiting :- {event.value}")
+            elif event.is_("INFO", "MATCHED"):  # INFO::MATCHED::<game id>
+                print(f"lobby id :- {event.value}")
+                print("Waiting for all players to connect ....")
 
+        try:
+            print(self.term.home + self.theme.background + self.term.clear)
+            print("Looking for an opponent ....")
+            self.player.player_id = self.client.queue(on_event=show_progress)
+            self.game_id = self.client.state.game_id
             return "READY"
 
-        except WebSocketBadStatusException:
-            return "Sever Error pls.. Try Again...."
+        except ClientError as e:
+            return e.message
         except Exception:
-            log.error(f"{data} {ws_url}")
+            log.error(f"{self.ws_url}/game/queue")
             raise
 
+    def browse_lobbies(self) -> Optional[str]:
+        """
+        Show the games waiting for a second player and return the ID of the chosen one.
+
+        The list follows the games opened and closed on the server. [UP]/[DOWN] move the
+        selection, [ENTER] joins the selected game, [I] asks for a game ID instead and
+        [Q] goes back to the menu, returning None.
+        """
+        games = OpenGames()
+        lock = threading.Lock()
+        changed = threading.Event()
+
+        def follow_changes() -> None:
+            try:
+                for event in self.client.lobby_events():
+                    with lock:
+                        games.apply(event)
+                    if games.stale:
+                        listing = self.client.list_all_open_games()
+                        with lock:
+                            games.reset(listing)
+                    changed.set()
+            except (ClientError, OSError, websocket.WebSocketException) as e:
+                log.debug(f"stopped following the open games: {e}")
+
+        def draw(listing: list, selected: int) -> None:
+            rows = max(1, self.term.height - 8)
+            top = min(max(0, selected - rows // 2), max(0, len(listing) - rows))
+            print(self.term.home + self.theme.background + self.term.clear)
+            print(self.term.move_y(1) + self.term.center("Open Games"))
+            print(self.term.move_down(1), end="")
+            if not listing:
+                print(self.term.center("No open games yet, waiting for one..."))
+            for i, (game_id, player_one_id) in enumerate(
+                listing[top : top + rows], start=top
+            ):
+                line = f"  {game_id:<20} made by User#{player_one_id}  "
+                if i == selected:
+                    line = self.theme.gm_options_highlight + line + self.term.normal
+                print(self.term.center(line))
+            print(
+                self.term.move_y(self.term.height - 2)
+                + self.term.center(
+                    "[UP]/[DOWN] select   [ENTER] join   [I] enter a game ID   [Q] back"
+                ),
+                end="",
+                flush=True,
+            )
+
+        watcher = threading.Thread(
+            target=follow_changes, name="lobby-browser", daemon=True
+        )
+        watcher.start()
+        selected = 0
+        try:
+            with self.term.cbreak(), self.term.hidden_cursor():
+                while True:
+                    with lock:
+                        listing = games.sorted()
+                    selected = min(selected, max(0, len(listing) - 1))
+                    draw(listing, selected)
+
+                    key = self.term.inkey(timeout=0.5)
+                    while not key and not changed.is_set():
+                        key = self.term.inkey(timeout=0.5)
+                    changed.clear()
+                    if key.name == "KEY_UP":
+                        selected = max(0, selected - 1)
+                    elif key.name == "KEY_DOWN":
+                        selected += 1
+                    elif key.name == "KEY_ENTER" and listing:
+                        return listing[selected][0]
+                    elif key.lower() == "i":
+                        print(self.term.home + self.term.clear)
+                        return input("Enter Game id :- ").strip() or None
+                    elif key.lower() == "q" or key.name == "KEY_ESCAPE":
+                        return None
+        finally:
+            self.client.close_lobby_events()
+
     def show_welcome_screen(self) -> str:
         """
         Prints startup screen and return pressed key.
@@ -397,9 +506,9 @@ class Game:
         """
         Main game menu.
 
-        This is the main game menu showing all the four possible options i.e.
-        Create Game, Join Game, settings and exit. Each have a description which
-        can be rendered on pressing `KEY_TAB`.
+        This is the main game menu showing all the five possible options i.e.
+        Create Game, Join Game, Quick Match, settings and exit. Each have a description
+        which can be rendered on pressing `KEY_TAB`.
         """
         # print all game menu options
         def print_options() -> None:
@@ -451,7 +560,7 @@ class Game:
                 )
 
         def select_option() -> None:  # updates the highlighter variable
-            if self.curr_highlight < 3:
+            if self.curr_highlight < len(Menu.MENU_MAPPING) - 1:
                 self.curr_highlight += 1
             else:
                 self.curr_highlight = 0
@@ -498,6 +607,8 @@ class Game:
         elif self.curr_highlight == 1:
             return "CONNECT_TO_LOBBY"
         elif self.curr_highlight == 2:
+            return "QUICK_MATCH"
+        elif self.curr_highlight == 3:
             return "SETTINGS"
         else:
             return "EXIT"
@@ -626,33 +737,55 @@ class Game:
             + self.term.normal
         )
 
-    def chatbox_history(self, text: str) -> None:
-        """Manages chat history to be displayed."""
-        if len(text) > self.chat_box_width:
-            self.chat_hist_height += (len(text)) // self.chat_box_width
-        formatted_text = ""
-        text = self.term.green + text[:4] + self.term.yellow + text[4:]
-        for i, char in enumerate(text):
-            if (i + 1) % self.chat_box_width == 0:
-                formatted_text += "\n" + self.term.move_x(self.chat_box_x + 1) + char
-            else:
-                formatted_text += char
+    def chatbox_history(self) -> None:
+        """Draws as many of the latest chat messages as fit the history box."""
+        own = f"p{self.player.player_id}"
+        lines = []
+        for sender, text in reversed(self.client.state.chat):
+            name = ("OPP:", "YOU:")[sender == own] if sender else "SRV:"
+            message = name + text
+            wrapped = [
+                message[i : i + self.chat_box_width]
+                for i in range(0, len(message), self.chat_box_width)
+            ]
+            wrapped[0] = (
+                self.term.green + wrapped[0][:4] + self.term.yellow + wrapped[0][4:]
+            )
+            lines[:0] = wrapped
+            if len(lines) >= ChessGame.CHAT_LINES:
+                break
+        lines = lines[-ChessGame.CHAT_LINES :]
+        self.chat_shown = self.client.state.chat[-1] if self.client.state.chat else None
 
-        self.chat_hist_height += 1
-        self.full_chat_hist += (
-            formatted_text + "\n" + self.term.move_x(self.chat_box_x + 1)
-        )
+        chat_hist_height = 1 + len(lines)
         self.box(
-            height=(1 + self.chat_hist_height),
+            height=(1 + chat_hist_height),
             width=self.chat_box_width,
             x_pos=self.chat_box_x,
-            y_pos=self.h - 6 - self.chat_hist_height,
+            y_pos=self.h - 6 - chat_hist_height,
             visibility_dull=True,
-            text=self.full_chat_hist,
+            text="".join(
+                line + "\n" + self.term.move_x(self.chat_box_x + 1) for line in lines
+            ),
             no_checks=True,
-            shift_y=self.chat_hist_height,
+            shift_y=chat_hist_height,
         )
 
+    def show_new_chat(self) -> None:
+        """Redraw the chat history if messages came since it was last drawn."""
+        if self.client.state.chat and self.client.state.chat[-1] is not self.chat_shown:
+            self.chatbox_history()
+
+    def send_chat(self, text: str) -> None:
+        """Send a chat message and wait for the server to echo or refuse it."""
+        self.client.send_chat(text)
+        own = f"p{self.player.player_id},"
+        while True:
+            event = self.client.wait_for(CHAT_PREFIX)
+            if event.command == "REJECTED" or event.value.startswith(own):
+                break
+        self.chatbox_history()
+
     def chatbox(self) -> None:
         """Creates chat box for the players."""
         self.box(
@@ -672,6 +805,7 @@ class Game:
                     char is not None
                     and len(char.lower()) == 1
                     and flag != "KEY_BACKSPACE"
+                    and len(text) < ChessGame.CHAT_MAX_LENGTH
                 ):
                     text += char.lower()
                     self.box(
@@ -692,7 +826,7 @@ class Game:
                         visibility_dull=False,
                         text=text_prefix + text,
                     )
-                char = self.term.inkey()
+                char = self.read_key()
                 flag = char.name
             if flag == "KEY_ENTER":
                 self.box(
@@ -702,7 +836,8 @@ class Game:
                     y_pos=self.h - 4,
                     visibility_dull=True,
                 )
-                self.chatbox_history(text=text_prefix + text)  # Send the message
+                if text:
+                    self.send_chat(text)  # Send the message
             else:
                 self.box(
                     height=1,
@@ -722,27 +857,16 @@ class Game:
         text: str = None,
         fg: str = "black",
         bg: str = "white",
+        highlight: Optional[str] = None,
     ) -> None:
-        """Draws a single chess tile and prints the `text` in the middle of it."""
-        style = getattr(self.term, f"{fg}_on_{bg}")
-        # draw the tiles row by row
-        for j in range(y, y + self.tile_height):
-            for i in range(x, x + self.tile_width):
-                with self.term.location(i + x_offset, j + y_offset):
-                    print(style(" "))
-        # draw the chess piece
-        with self.term.location(x + x_offset, y + y_offset + (self.tile_height // 2)):
-            print(style(str.center(text, self.tile_width)))
+        """Composes a chess tile with the `text` in the middle of it into the frame."""
+        tile = self.tiles.get(text, fg, bg, highlight)
+        self.frame.put_cells(x + x_offset, y + y_offset, tile)
 
     def get_piece_meta(self, row: int, col: int) -> tuple:
         """Get colour and piece information of the cell."""
-        if (row + col) % 2 == 0:
-            bg = "grey"  # self.theme.themes[self.colour_scheme]["white_squares"]
-        else:
-            bg = self.theme.themes[self.colour_scheme]["black_squares"]
-        piece_value = self.chess_board[row][col]
-        piece, color = mapper[piece_value]
-        return (piece, color, bg)
+        piece, color = mapper[self.chess_board[row][col]]
+        return (piece, color, self.square_colours[row][col])
 
     @staticmethod
     def fen_to_board(fen: str) -> list:
@@ -793,29 +917,24 @@ class Game:
         )
 
     def highlight_check(self) -> None:
-        """Higligh king if its CHECK."""
+        """Higligh king if its CHECK, by marking the kings dirty to be repainted."""
         for i, row in enumerate(self.chess_board):
             for j, col in enumerate(row):
-                # identify whose piece in in check
-                if (col == "K" and self.is_white_turn()) or (
-                    col == "k" and not self.is_white_turn()
-                ):
-                    # highlight the KING
-                    piece, color, _ = self.get_piece_meta(i, j)
-                    self.draw_tile(
-                        self.tile_width + j * (self.tile_width + self.offset_x),
-                        i * (self.tile_height + self.offset_y),
-                        self.x_shift,
-                        self.y_shift,
-                        text=piece,
-                        fg=color,
-                        bg=self.theme.themes[self.colour_scheme]["check"],
-                    )
-                    break
+                if col in ("K", "k"):
+                    self.update_block(i, j)
 
-    def show_game_screen(self) -> None:
-        """Shows the chess board."""
+    def set_board(self, fen: str) -> None:
+        """Switch to the board of `fen`, marking only the changed squares dirty."""
+        board = self.fen_to_board(fen)
+        self.dirty.mark_changed(self.chess_board, board)
+        self.fen = fen
+        self.chess_board = board
+
+    def draw_game_screen(self) -> None:
+        """Clears the screen and draws the whole game i.e. board, labels and chat."""
         print(self.term.home + self.term.clear + self.theme.background)
+        self.frame.invalidate()
+        self.dirty.mark_all()
         self.box(
             height=1,
             width=self.chat_box_width,
@@ -823,36 +942,34 @@ class Game:
             y_pos=self.h - 4,
             visibility_dull=True,
         )
+        for i in range(len(self)):
+            # Adding Numbers to indicate rows
+            num = len(self) - i
+            x = self.tile_width // 2
+            y = i * self.tile_height + self.tile_height // 2
+            with self.term.location(x + self.x_shift, y + self.y_shift):
+                print(num)
+        self.render_frame()
+        # Adding Alphabets to indicate columns
+        for i in range(len(self)):
+            with self.term.location(
+                x * 2 - 1 + i * self.tile_width + self.x_shift,
+                len(self) * self.tile_height + self.y_shift + 1,
+            ):
+                print(str.center(ChessGame.COL[i], len(self)))
+        self.chat_shown = None
+        self.show_new_chat()
+
+    def show_game_screen(self) -> None:
+        """Shows the chess board."""
+        self.screen = "game"
         with self.term.hidden_cursor():
-            for i in range(len(self)):
-                # Adding Numbers to indicate rows
-                num = len(self) - i
-                x = self.tile_width // 2
-                y = i * self.tile_height + self.tile_height // 2
-                with self.term.location(x + self.x_shift, y + self.y_shift):
-                    print(num)
-
-                for j in range(len(self)):
-                    self.update_block(i, j)
-            # Adding Alphabets to indicate columns
-            for i in range(len(self)):
-                with self.term.location(
-                    x * 2 - 1 + i * self.tile_width + self.x_shift,
-                    len(self) * self.tile_height + self.y_shift + 1,
-                ):
-                    print(str.center(ChessGame.COL[i], len(self)))
+            self.draw_game_screen()
 
-            try:
-                self.web_socket.send("BOARD::GET_BOARD")
-                no = True
-                while no:
-                    data = self.web_socket.recv().split("::")
-                    self.chess.set_fen(data[2])
-                    self.fen = self.chess.give_board()
-                    no = False
-            except Exception:
-                print(data)
-                raise
+            self.client.request_board()
+            self.chess.set_fen(self.client.wait_for_board())
+            self.set_board(self.chess.give_board())
+            self.render_frame()
 
             while True:
                 # available_moves = chessboard.all_available_moves()
@@ -867,46 +984,31 @@ class Game:
                 self.render_board(start_move, end_move)
 
                 # update the server
-                self.web_socket.send(f"BOARD::MOVE::{move}")
-                try:
-                    data = [""]
-                    self.web_socket.send("BOARD::GET_BOARD")
-                    while data[0] != "BOARD":
-                        data = self.web_socket.recv().split("::")
-                    self.chess.set_fen(data[2])
-                except Exception:
-                    print(data)
-                    raise
+                self.client.send_move(move)
+                self.client.request_board()
+                self.chess.set_fen(self.client.wait_for_board())
 
     def player_1_update(self) -> None:
         """Function to get the latest FEN from the server after P2 makes a move."""
         if not self.is_white_turn():  # the last move was made by black (p2)
-            new_board = False
-            while not new_board:  # wait till server broadcasts the new FEN string
-                data = self.web_socket.recv().split("::")
-                # todo add Waiting for enemy to make a move GUI here for player 1
-                if data[0] == "BOARD" and data[1] == "BOARD":
-                    if self.is_white_turn(data[2]):
-                        self.chess.set_fen(data[2])
-                        self.fen = self.chess.give_board()
-                        self.chess_board = self.fen_to_board(self.fen)
-                        self.update_board()
-                        new_board = True
+            # wait till server broadcasts the new FEN string
+            # todo add Waiting for enemy to make a move GUI here for player 1
+            self.chess.set_fen(self.client.wait_for_board(self.is_white_turn))
+            self.set_board(self.chess.give_board())
+            self.render_frame()
+            self.show_new_chat()
 
     def player_2_update(self) -> None:
         """Function to get the latest FEN from the server after P1 makes a move."""
         if self.is_white_turn():  # the last move was made by white (p1)
-            new_board = False
-            while not new_board:  # wait till server broadcasts the new FEN string
-                data = self.web_socket.recv().split("::")
-                # todo add Waiting for enemy to make a move GUI here for player 2
-                if data[0] == "BOARD" and data[1] == "BOARD":
-                    if not self.is_white_turn(data[2]):
-                        self.chess.set_fen(data[2])
-                        self.fen = self.chess.give_board()
-                        self.chess_board = self.fen_to_board(self.fen)
-                        self.update_board()
-                        new_board = True
+            # wait till server broadcasts the new FEN string
+            # todo add Waiting for enemy to make a move GUI here for player 2
+            self.chess.set_fen(
+                self.client.wait_for_board(lambda fen: not self.is_white_turn(fen))
+            )
+            self.set_board(self.chess.give_board())
+            self.render_frame()
+            self.show_new_chat()
 
     def render_board(self, start_move: list, end_move: list) -> None:
         """
@@ -916,31 +1018,24 @@ class Game:
         """
         move = "".join((*start_move, *end_move)).lower()
         self.chess.move_piece(move)
-        self.king_check = False
+        if self.king_check:
+            self.king_check = False
+            self.highlight_check()
         # post the message according to which users move it is
         content = "WHITEs MOVE" if not self.is_white_turn() else "BLACKs MOVE"
         self.print_message("STATUS", content=content)
-        self.fen = self.chess.give_board()
-        self.chess_board = self.fen_to_board(self.fen)
+        # castling and en passant change more than the from/to squares
+        self.set_board(self.chess.give_board())
         self.chess_status_display(
             start="".join(start_move),
             end="".join(end_move),
             x_pos=ChessGame.COL.index(end_move[0].upper()),
             y_pos=8 - int(end_move[1]),
         )
-        # check for CASTLING
-        if move in ChessGame.POSSIBLE_CASTLING_MOVES:
-            self.update_board()
-            return
-        self.update_block(
-            len(self) - int(end_move[1]), ChessGame.COL.index(end_move[0].upper())
-        )
-        self.update_block(
-            len(self) - int(start_move[1]), ChessGame.COL.index(start_move[0].upper())
-        )
         self.moves_played += 1
         # check for checkmate and end game
         if self.get_game_status() == ChessGame.STATUS["CHECKMATE"]:
+            self.render_frame()
             self.print_message(
                 "CHECKMATE. GAME OVER",
                 content="PRESS Q TO EXIT",
@@ -949,34 +1044,38 @@ class Game:
         # check for CHECK and display status
         elif self.get_game_status() == ChessGame.STATUS["CHECK"]:
             self.print_message("CHECK", content="PLAY YOUR KING")
-            self.highlight_check()
             self.king_check = True
+            self.highlight_check()
 
-        self.update_block(
-            len(self) - int(end_move[1]), ChessGame.COL.index(end_move[0].upper())
-        )
-        self.update_block(
-            len(self) - int(start_move[1]),
-            ChessGame.COL.index(start_move[0].upper()),
-        )
         self.moves_played += 1
         # change visible zone
         if self.moves_played % self.moves_limit == 0 and self.visible_layers > 2:
+            old_hidden_layer = self.hidden_layer.copy()
             self.visible_layers -= 2
             invisible_layers = (8 - self.visible_layers) // 2
             self.hidden_layer[0:invisible_layers, :] = 0
             self.hidden_layer[-invisible_layers:, :] = 0
             self.hidden_layer[:, 0:invisible_layers] = 0
             self.hidden_layer[:, -invisible_layers:] = 0
-            self.update_board()
+            self.dirty.mark_mask_changed(old_hidden_layer, self.hidden_layer)
+        self.render_frame()
 
     def update_block(self, row: int, col: int) -> None:
-        """Updates block on row and col(we must first mutate actual list first)."""
+        """Marks block on row and col dirty, repainted on the next `render_frame`."""
+        self.dirty.mark(row, col)
+
+    def paint_block(self, row: int, col: int) -> None:
+        """Composes the tile of block on row and col(mutate the actual list first)."""
         piece, color, bg = self.get_piece_meta(row, col)
+        highlight = None
         if self.selected_row == row and self.selected_col == col:
-            bg = self.theme.themes[self.colour_scheme]["selected_square"]
+            highlight = "selected_square"
         elif [row, col] in self.possible_moves:
-            bg = self.theme.themes[self.colour_scheme]["legal_squares"]
+            highlight = "legal_squares"
+        elif self.king_check and self.chess_board[row][col] == (
+            "K" if self.is_white_turn() else "k"
+        ):
+            highlight = "check"
         if self.flag:
             self.flag = False
         visible_pieces = (
@@ -999,13 +1098,19 @@ class Game:
             text=piece,
             fg=color,
             bg=bg,
+            highlight=highlight,
         )
 
+    def render_frame(self) -> None:
+        """Paints every dirty block and flushes them to the screen in one frame."""
+        for row, col in self.dirty.drain():
+            self.paint_block(row, col)
+        self.frame.flush()
+
     def update_board(self) -> None:
         """Updates whole board when needed. Simplest Solution but expensive."""
-        for i in range(8):
-            for j in range(8):
-                self.update_block(i, j)
+        self.dirty.mark_all()
+        self.render_frame()
 
     @staticmethod
     def get_row_col(row: int, col: str) -> tuple:
@@ -1049,21 +1154,32 @@ class Game:
             self.possible_moves.append([x, y])
             self.update_block(x, y)
 
+    def read_key(self, on_idle: Optional[Callable[[], None]] = None) -> Keystroke:
+        """Wait for a key press, receiving the game's messages meanwhile."""
+        while not (key := self.term.inkey(timeout=ChessGame.POLL_INTERVAL)):
+            self.client.poll()
+            if on_idle:
+                on_idle()
+        return key
+
     def handle_arrows(self) -> tuple:
         """Manages the arrow movement on board."""
         start_move = end_move = False
         # look for arrow movements
         while True:
-            # print(
-            #     self.term.color_rgb(100, 100, 100)
-            #     + self.term.move_xy(self.chat_box_x + 1, self.h - 2)
-            #     + "Press [TAB] to message your opponent"
-            # )
-            with self.term.cbreak():
-                inp = self.term.inkey()
+            print(
+                self.term.color_rgb(100, 100, 100)
+                + self.term.move_xy(self.chat_box_x + 1, self.h - 2)
+                + "Press [TAB] to message your opponent"
+            )
+            # paint everything the previous key press changed as one frame
+            self.render_frame()
+            with self.term.cbreak(), self.resize.idle():
+                inp = self.read_key(on_idle=self.show_new_chat)
             # take action according to the key pressed
-            # if inp.name == "KEY_TAB":
-            #     self.chatbox()
+            if inp.name == "KEY_TAB":
+                self.chatbox()
+                continue
             input_key = repr(inp)
             if input_key == "KEY_DOWN":
                 if self.selected_row < 7:
@@ -1118,6 +1234,7 @@ class Game:
                         self.possible_moves = []
                         for i in old_moves:
                             self.update_block(i[0], i[1])
+                        self.render_frame()
                         return start_move, end_move
                     else:
                         if move == "em":
@@ -1141,14 +1258,15 @@ class Game:
                         start_move = False
                         end_move = False
                         self.highlight_moves(start_move)
-            if self.king_check:
-                self.highlight_check()
 
     def reset_class(self) -> None:
         """Reset player game room info."""
         self.game_id = None
         if self.player:
             self.player.player_id = None
+        if self.client:
+            self.client.close()
+            self.client = None
 
     def start_game(self) -> None:
         """
@@ -1156,7 +1274,8 @@ class Game:
 
         TODO: Check if console supported
         """
-        self.ensure_terminal_size(self.term)
+        self.resize.start()
+        self.ensure_terminal_size()
         if self.show_welcome_screen() == "q":
             print(self.term.clear + self.term.exit_fullscreen)
         else:
@@ -1177,6 +1296,11 @@ class Game:
                     resp = self.connect_to_lobby()
                     if resp != "READY":
                         print(resp)
+                elif menu_choice == "QUICK_MATCH":
+                    # wait for the server to find an opponent
+                    resp = self.quick_match()
+                    if resp != "READY":
+                        print(resp)
                 elif menu_choice == "SETTINGS":
                     # open settings menu
                     pass
@@ -1189,5 +1313,6 @@ class Game:
                             print(e)
                             raise
             # exit the game peacefully
-            self.web_socket.close()
+            if self.client:
+                self.client.close()
             print(self.term.clear + self.term.exit_fullscreen + self.term.clear)
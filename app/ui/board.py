@@ -0,0 +1,42 @@
+"""Bookkeeping of the board squares that need to be repainted."""
+from numpy import argwhere, ndarray
+
+
+class DirtySquares:
+    """Set of (row, col) squares that changed since the board was last painted."""
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self.squares: set = set()
+
+    def __len__(self) -> int:
+        return len(self.squares)
+
+    def mark(self, row: int, col: int) -> None:
+        """Mark a single square as dirty."""
+        self.squares.add((row, col))
+
+    def mark_all(self) -> None:
+        """Mark every square of the board as dirty."""
+        self.squares.update(
+            (row, col) for row in range(self.size) for col in range(self.size)
+        )
+
+    def mark_changed(self, old_board: list, new_board: list) -> None:
+        """Mark the squares whose piece differs between two `chess_board` grids."""
+        for row, (old_row, new_row) in enumerate(zip(old_board, new_board)):
+            if old_row == new_row:
+                continue
+            for col, (old, new) in enumerate(zip(old_row, new_row)):
+                if old != new:
+                    self.squares.add((row, col))
+
+    def mark_mask_changed(self, old_mask: ndarray, new_mask: ndarray) -> None:
+        """Mark the squares whose visibility differs between two hidden layer masks."""
+        self.squares.update(map(tuple, argwhere(old_mask != new_mask).tolist()))
+
+    def drain(self) -> list:
+        """Return the dirty squares in row-major order and clear them."""
+        squares = sorted(self.squares)
+        self.squares.clear()
+        return squares
@@ -0,0 +1,114 @@
+"""Screen geometry and terminal resize events."""
+import signal
+import time
+import typing as t
+from contextlib import contextmanager
+
+from blessed import Terminal
+
+
+class Layout:
+    """Geometry of the game screen, derived from the terminal size."""
+
+    MIN_WIDTH = 133
+    MIN_HEIGHT = 33
+
+    def __init__(
+        self, width: int, height: int, tile_width: int = 6, tile_height: int = 3
+    ):
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.update(width, height)
+
+    def update(self, width: int, height: int) -> None:
+        """Recompute every position on the screen for a `width` x `height` terminal."""
+        self.w = width
+        self.h = height
+
+        self.x_shift = int(self.w * 0.3)
+        self.y_shift = int(self.h * 0.2)
+
+        self.chat_box_width = self.w - int(self.w * 0.745) - 1
+        self.chat_box_x = int(self.w * 0.70)
+
+    @property
+    def fits(self) -> bool:
+        """Whether the terminal is big enough to render the entire game."""
+        return self.w >= self.MIN_WIDTH and self.h >= self.MIN_HEIGHT
+
+
+class ResizeWatcher:
+    """
+    Turns SIGWINCH signals into resize events, so nobody has to poll the terminal size.
+
+    Subscribers are called with the new (width, height). A resize which arrives while
+    the program is blocked waiting for input (inside `idle`) is dispatched right away,
+    otherwise it is dispatched at the next `dispatch`, so a frame is never redrawn
+    halfway through being written.
+    """
+
+    # Windows has no SIGWINCH, resizes are then only noticed by `wait`
+    supported = hasattr(signal, "SIGWINCH")
+    fallback_interval = 0.25
+
+    def __init__(self, terminal: Terminal):
+        self.term = terminal
+        self.subscribers: list = []
+        self.pending = False
+        self._idle = False
+        self._previous_handler = None
+
+    def subscribe(self, callback: t.Callable[[int, int], None]) -> None:
+        """Call `callback` with the new width and height on every resize."""
+        self.subscribers.append(callback)
+
+    def start(self) -> None:
+        """Install the SIGWINCH handler."""
+        if self.supported and self._previous_handler is None:
+            self._previous_handler = signal.signal(signal.SIGWINCH, self._on_signal)
+
+    def stop(self) -> None:
+        """Restore the SIGWINCH handler that was there before `start`."""
+        if self.supported and self._previous_handler is not None:
+            signal.signal(signal.SIGWINCH, self._previous_handler)
+            self._previous_handler = None
+
+    def _on_signal(self, *_) -> None:
+        self.pending = True
+        if self._idle:
+            self.dispatch()
+
+    @contextmanager
+    def idle(self) -> t.Iterator[None]:
+        """Mark a section where the screen can be redrawn as soon as it's resized."""
+        self._idle = True
+        try:
+            self.dispatch()
+            yield
+        finally:
+            self._idle = False
+
+    def dispatch(self) -> None:
+        """Notify the subscribers if the terminal was resized since the last one."""
+        if not self.pending:
+            return
+        self.pending = False
+        width, height = self.term.width, self.term.height
+        for callback in self.subscribers:
+            callback(width, height)
+
+    def wait(self) -> None:
+        """Block until the terminal is resized and dispatch the event."""
+        if self.supported:
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGWINCH})
+            try:
+                # a resize before the signal was blocked went to `_on_signal`, and
+                # sigwait would only return on the next one
+                if not self.pending:
+                    signal.sigwait({signal.SIGWINCH})
+            finally:
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGWINCH})
+        else:
+            time.sleep(self.fallback_interval)
+        self.pending = True
+        self.dispatch()
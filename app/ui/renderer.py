@@ -0,0 +1,81 @@
+"""
+Off-screen rendering for the chess board.
+
+Everything drawn on the board is first composed into a `FrameBuffer`, which
+remembers what is already on the screen and only writes the cells that changed
+when it is flushed, in one single write.
+"""
+from blessed import Terminal
+
+
+class FrameBuffer:
+    """A double buffered, diffing frame of styled terminal cells."""
+
+    def __init__(self, terminal: Terminal):
+        self.term = terminal
+        # (x, y) -> (style, char) of what is currently on the screen
+        self._front: dict = dict()
+        # (x, y) -> (style, char) composed since the last flush
+        self._back: dict = dict()
+
+    def put(self, x: int, y: int, text: str, style: str = "") -> None:
+        """Compose `text` at (`x`, `y`) with the escape sequence `style`, undrawn."""
+        style = str(style)
+        for i, char in enumerate(text):
+            self._back[(x + i, y)] = (style, char)
+
+    def put_cells(self, x: int, y: int, rows: tuple) -> None:
+        """Compose rows of prerendered (style, char) cells, top left at (`x`, `y`)."""
+        back = self._back
+        for j, cells in enumerate(rows):
+            row = y + j
+            for i, cell in enumerate(cells):
+                back[(x + i, row)] = cell
+
+    def invalidate(self) -> None:
+        """Forget what is on the screen, so the next flush repaints every known cell."""
+        self._front, self._back = dict(), {**self._front, **self._back}
+
+    def reset(self) -> None:
+        """Forget every cell, e.g. once the screen was cleared for a new layout."""
+        self._front.clear()
+        self._back.clear()
+
+    def diff(self) -> list:
+        """Return the composed cells which differ from the screen, in drawing order."""
+        front = self._front
+        changed = [
+            (position, cell)
+            for position, cell in self._back.items()
+            if front.get(position) != cell
+        ]
+        # sort row by row so consecutive cells don't need a cursor move
+        changed.sort(key=lambda item: (item[0][1], item[0][0]))
+        return changed
+
+    def render(self, changed: list) -> str:
+        """Build the escape sequence drawing `changed` cells with few cursor moves."""
+        if not changed:
+            return ""
+        out = [self.term.save]
+        cursor = style = None
+        for (x, y), (cell_style, char) in changed:
+            if cursor != (x, y):
+                out.append(self.term.move_xy(x, y))
+            if cell_style != style:
+                out.append(self.term.normal + cell_style)
+                style = cell_style
+            out.append(char)
+            cursor = (x + 1, y)
+        out.append(self.term.normal + self.term.restore)
+        return "".join(out)
+
+    def flush(self) -> int:
+        """Draw what changed since the last flush and return the changed cell count."""
+        changed = self.diff()
+        if changed:
+            self.term.stream.write(self.render(changed))
+            self.term.stream.flush()
+            self._front.update(changed)
+        self._back.clear()
+        return len(changed)
@@ -0,0 +1,78 @@
+"""Precomputed, fully styled chess tiles."""
+from blessed import Terminal
+
+from app.constants import ChessGame
+from app.ui.Colour import ColourScheme
+
+# colours the pieces are drawn in, see `mapper` in `app.game_manager`
+PIECE_COLOURS = ("white", "black")
+# theme keys of the squares which are drawn on top of the normal square colour
+HIGHLIGHTS = (None, "selected_square", "legal_squares", "check")
+
+
+class TileCache:
+    """
+    Table of rendered tiles keyed by (piece, fg, bg, highlight).
+
+    A tile is a tuple of rows, each row being a tuple of (style, char) cells
+    ready to be handed to `FrameBuffer.put_cells`. The table is built once per
+    theme and tile size, anything missing is rendered and stored on first use.
+    """
+
+    def __init__(
+        self, terminal: Terminal, theme: str, tile_width: int, tile_height: int
+    ):
+        self.term = terminal
+        self.theme = theme
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.tiles: dict = dict()
+        self.styles: dict = dict()
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    @property
+    def square_colours(self) -> tuple:
+        """Background colour names of the light and dark squares."""
+        # the light squares aren't themed yet,
+        # ColourScheme.themes[theme]["white_squares"] isn't a valid colour.
+        return "grey", ColourScheme.themes[self.theme]["black_squares"]
+
+    def build(self) -> None:
+        """Render every tile the board can show with the current theme and size."""
+        self.tiles.clear()
+        self.styles.clear()
+        for piece in ("", " ", *ChessGame.PIECES):
+            for fg in PIECE_COLOURS:
+                for bg in self.square_colours:
+                    for highlight in HIGHLIGHTS:
+                        self.get(piece, fg, bg, highlight)
+
+    def style(self, fg: str, bg: str) -> str:
+        """Return the escape sequence drawing `fg` text on a `bg` background."""
+        key = (fg, bg)
+        if key not in self.styles:
+            self.styles[key] = str(getattr(self.term, f"{fg}_on_{bg}"))
+        return self.styles[key]
+
+    def render(self, piece: str, fg: str, bg: str) -> tuple:
+        """Render a tile with `piece` in the middle of it."""
+        style = self.style(fg, bg)
+        blank = tuple((style, " ") for _ in range(self.tile_width))
+        middle = tuple((style, char) for char in str.center(piece, self.tile_width))
+        return tuple(
+            middle if row == self.tile_height // 2 else blank
+            for row in range(self.tile_height)
+        )
+
+    def get(self, piece: str, fg: str, bg: str, highlight: str = None) -> tuple:
+        """Return the tile for `piece` on a `bg` square, optionally highlighted."""
+        key = (piece, fg, bg, highlight)
+        tile = self.tiles.get(key)
+        if tile is None:
+            if highlight:
+                bg = ColourScheme.themes[self.theme][highlight]
+            tile = self.tiles[key] = self.render(piece, fg, bg)
+        return tile
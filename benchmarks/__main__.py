@@ -0,0 +1,73 @@
+"""
+Run the micro-benchmarks, optionally saving them and comparing them to a baseline.
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --baseline baseline.json --threshold 0.1
+"""
+
+import argparse
+import sys
+
+from benchmarks import suite
+from benchmarks.micro import configure_api
+
+
+def main() -> int:
+    """Run the suite and return the exit status, 1 if anything regressed."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n")[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("names", nargs="*", help="benchmarks to run, default all")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown ratio flagged as a regression, default 0.1 i.e. 10%%",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--database-url",
+        help="database for the API benchmarks, default temporary SQLite",
+    )
+    args = parser.parse_args()
+
+    configure_api(args.database_url)
+    unknown = set(args.names) - set(suite.BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = suite.run(args.names, repeat=args.repeat)
+    baseline = suite.load(args.baseline) if args.baseline else None
+    regressions = (
+        suite.compare(results, baseline, args.threshold) if baseline else dict()
+    )
+
+    print(f"{'benchmark':<42}{'min µs':>10}{'median µs':>12}{'vs baseline':>14}")
+    for name, result in results["results"].items():
+        change = ""
+        if baseline and name in baseline["results"]:
+            ratio = result["min_s"] / baseline["results"][name]["min_s"]
+            change = f"{(ratio - 1) * 100:+.1f}%"
+            if name in regressions:
+                change += " !"
+        print(
+            f"{name:<42}{result['min_s'] * 1e6:>10.2f}"
+            f"{result['median_s'] * 1e6:>12.2f}{change:>14}"
+        )
+
+    if args.save:
+        suite.save(results, args.save)
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmark(s) regressed by more than "
+            f"{args.threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Micro-benchmarks of the functions that run for every message or frame.
+
+The API benchmarks run on a throwaway SQLite database, `configure_api` has to
+be called before anything from `api` is imported.
+"""
+
+import functools
+import os
+import tempfile
+import typing as t
+
+from benchmarks.paint import make_game
+from benchmarks.suite import benchmark
+
+MIDGAME_FEN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+BENCHMARK_USER_ID = 10 ** 15
+BENCHMARK_GAME_ID = 1
+
+
+def configure_api(database_url: t.Optional[str] = None) -> None:
+    """Point the API at a benchmark database, filling in the config it requires."""
+    if database_url is None:
+        directory = tempfile.mkdtemp(prefix="arapaimas-bench-")
+        database_url = f"sqlite:///{directory}/bench.db"
+    os.environ["DATABASE_URL"] = database_url
+    # discord OAuth isn't benchmarked, but its config is required
+    for name in ("CLIENT_ID", "CLIENT_SECRET", "AUTH_URL"):
+        os.environ.setdefault(name, "benchmark")
+    os.environ.setdefault("JWT_SECRET", "benchmark")
+
+
+def api_database() -> None:
+    """Create the tables and the rows the API benchmarks use."""
+    from api.crud import game, user
+    from api.db.base import Base
+    from api.db.session import SessionLocal, engine
+    from api.schemas.game import GameCreate
+    from api.schemas.user import UserCreate
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    if not user.get_by_user_id(db, user_id=BENCHMARK_USER_ID):
+        user.create(
+            db,
+            obj_in=UserCreate(
+                user_id=BENCHMARK_USER_ID,
+                username="benchmark",
+                token_salt="benchmark",
+                is_banned=False,
+            ),
+        )
+    if not game.get_by_game_id(db, game_id=BENCHMARK_GAME_ID):
+        game.create(
+            db,
+            obj_in=GameCreate(
+                game_id=BENCHMARK_GAME_ID,
+                is_ongoing=True,
+                winner_id=0,
+                player_one_id=BENCHMARK_USER_ID,
+                player_two_id=0,
+                board=MIDGAME_FEN,
+            ),
+        )
+    db.close()
+
+
+class FakeWebSocket:
+    """Stands in for `starlette.websockets.WebSocket`, sending goes nowhere."""
+
+    async def send_text(self, _: str) -> None:
+        """Drop the message."""
+
+
+@benchmark("app.Game.fen_to_board")
+def fen_to_board() -> t.Callable:
+    """Parse a midgame FEN into the TUI's board grid."""
+    from app.game_manager import Game
+
+    return lambda: Game.fen_to_board(MIDGAME_FEN)
+
+
+@benchmark("app.ChessBoard.move_piece")
+def client_move_piece() -> t.Callable:
+    """Apply a move on the TUI's board, after resetting its position."""
+    from app.chess import ChessBoard
+
+    board = ChessBoard(MIDGAME_FEN)
+
+    def move() -> None:
+        # resetting the position is part of the timing, as it is for every broadcast
+        board.set_fen(MIDGAME_FEN)
+        board.move_piece("e1g1")
+
+    return move
+
+
+@benchmark("app.ChessBoard.all_available_moves")
+def client_all_available_moves() -> t.Callable:
+    """Generate all the legal moves of a midgame position."""
+    from app.chess import ChessBoard
+
+    return ChessBoard(MIDGAME_FEN).all_available_moves
+
+
+@benchmark("app.Game.draw_tile")
+def draw_tile() -> t.Callable:
+    """Compose a single tile into the frame buffer."""
+    game = make_game()
+
+    def draw() -> None:
+        game.draw_tile(
+            6, 0, game.x_shift, game.y_shift, text="♘", fg="white", bg="grey"
+        )
+
+    return draw
+
+
+@benchmark("app.Game.update_board")
+def update_board() -> t.Callable:
+    """Repaint the whole board into an in-memory terminal."""
+    game = make_game()
+
+    def repaint() -> None:
+        game.frame.invalidate()
+        game.update_board()
+
+    return repaint
+
+
+@benchmark("api.ChessNotifier._notify")
+def notify() -> t.Callable:
+    """Broadcast a board to the two members of a room."""
+    from api.endpoints.games import ChessNotifier
+
+    notifier = ChessNotifier()
+    notifier.connections["1"] = {1: FakeWebSocket(), 2: FakeWebSocket()}
+    message = f"BOARD::BOARD::{MIDGAME_FEN}"
+
+    async def broadcast() -> None:
+        await notifier._notify(message, "1")
+
+    return broadcast
+
+
+@benchmark("api.jwt.decode")
+def jwt_decode() -> t.Callable:
+    """Decode a user's token, as done for every authenticated request."""
+    from jose import jwt
+
+    from api.constants import Server
+
+    token = jwt.encode(
+        {"id": str(BENCHMARK_USER_ID), "salt": "benchmark"},
+        Server.JWT_SECRET,
+        algorithm="HS256",
+    )
+    return lambda: jwt.decode(token, Server.JWT_SECRET)
+
+
+@benchmark("api.JWTBearer.get_user_by_plain_token")
+def jwt_bearer() -> t.Callable:
+    """Authenticate a plain token, including the user lookup."""
+    from jose import jwt
+
+    from api.constants import Server
+    from api.utils.auth import JWTBearer
+
+    api_database()
+    token = jwt.encode(
+        {"id": str(BENCHMARK_USER_ID), "salt": "benchmark"},
+        Server.JWT_SECRET,
+        algorithm="HS256",
+    )
+    bearer = JWTBearer()
+
+    async def authenticate() -> None:
+        await bearer.get_user_by_plain_token(token)
+
+    return authenticate
+
+
+@benchmark("api.CRUDGame.update_board_by_id")
+def update_board_by_id() -> t.Callable:
+    """Persist a board, as done for every move."""
+    from api.crud import game
+    from api.db.session import SessionLocal
+
+    api_database()
+    db = SessionLocal()
+    return lambda: game.update_board_by_id(
+        db, game_id=BENCHMARK_GAME_ID, board=MIDGAME_FEN
+    )
+
+
+@functools.lru_cache()
+def random_games(count: int, seed: int = 0, max_plies: int = 120) -> list[list[str]]:
+    """Play `count` games of random legal moves, returning their moves."""
+    import random
+
+    from Chessnut import Game
+
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board, moves = Game(), []
+        while len(moves) < max_plies and (legal := board.get_moves()):
+            moves.append(rng.choice(legal))
+            board.apply_move(moves[-1])
+        games.append(moves)
+    return games
+
+
+@benchmark("api.moves.pack_move")
+def pack_move() -> t.Callable:
+    """Pack 10k moves one by one."""
+    from api.utils.moves import pack_move
+
+    moves = [move for game in random_games(100) for move in game][:10_000]
+    return lambda: [pack_move(move) for move in moves]
+
+
+@benchmark("api.moves.pack_moves")
+def pack_moves() -> t.Callable:
+    """Pack the same 10k moves as `api.moves.pack_move` in one vectorised call."""
+    from api.utils.moves import pack_moves
+
+    moves = [move for game in random_games(100) for move in game][:10_000]
+    return lambda: pack_moves(moves)
+
+
+@benchmark("api.moves.unpack_moves")
+def unpack_moves() -> t.Callable:
+    """Unpack 10k packed moves in one vectorised call."""
+    from api.utils.moves import pack_moves, unpack_moves
+
+    packed = pack_moves([move for game in random_games(100) for move in game][:10_000])
+    return lambda: unpack_moves(packed)
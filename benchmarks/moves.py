@@ -0,0 +1,57 @@
+"""
+Storage and throughput of the packed move encoding of `api.utils.moves`.
+
+    python -m benchmarks.moves --games 200
+"""
+
+import argparse
+import time
+
+from api.utils.moves import decode_game, encode_game, pack_moves, unpack_moves
+from benchmarks.micro import random_games
+
+
+def storage(games: list[list[str]]) -> dict:
+    """Average bytes per game of the move text against the packed archive."""
+    text = sum(len(" ".join(moves).encode()) for moves in games)
+    packed = sum(len(encode_game(pack_moves(moves))) for moves in games)
+    return {
+        "plies_per_game": sum(map(len, games)) / len(games),
+        "text_bytes_per_game": text / len(games),
+        "packed_bytes_per_game": packed / len(games),
+        "saving": 1 - packed / text,
+    }
+
+
+def throughput(games: list[list[str]], repeat: int = 20) -> dict:
+    """Moves per second encoded and decoded, one game per call as when archiving."""
+    moves = sum(map(len, games)) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        archives = [encode_game(pack_moves(game)) for game in games]
+    encoding = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for archive in archives:
+            unpack_moves(decode_game(archive))
+    decoding = time.perf_counter() - start
+    return {
+        "encode_moves_per_s": moves / encoding,
+        "decode_moves_per_s": moves / decoding,
+    }
+
+
+def main() -> None:
+    """Play random games and print how well their moves pack."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    games = random_games(args.games, args.seed)
+    for key, value in {**storage(games), **throughput(games)}.items():
+        print(f"{key:<24} {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark of the time it takes the TUI to paint a frame of the chess board.
+
+The board is painted into an in-memory terminal, so the numbers are the cost of
+composing and diffing the frame plus the size of what would be written to a
+real terminal.
+
+    python -m benchmarks.paint --frames 500
+"""
+import argparse
+import io
+import statistics
+import time
+import typing as t
+
+from blessed import Terminal
+
+from app.constants import ChessGame
+from app.game_manager import Game, Player
+
+# a few plies from the opening, including castling
+FENS = (
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "r1bqkbnr/1ppp1ppp/p1n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 0 4",
+    "r1bqkbnr/1ppp1ppp/p1n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQ1RK1 b kq - 1 4",
+)
+
+
+def make_game() -> Game:
+    """Make a game drawing into an in-memory, colour capable terminal."""
+    terminal = Terminal(stream=io.StringIO(), force_styling=True)
+    game = Game(terminal)
+    game.player = Player()
+    game.player.player_id = 1
+    return game
+
+
+def timed_frame(game: Game, prepare: t.Callable[[], None]) -> tuple[float, int]:
+    """Run `prepare`, paint the frame and return the time taken and bytes written."""
+    stream = game.term.stream
+    stream.seek(0)
+    stream.truncate()
+    start = time.perf_counter()
+    prepare()
+    game.render_frame()
+    return time.perf_counter() - start, stream.tell()
+
+
+def full_repaint(game: Game) -> None:
+    """Repaint the entire board, as after clearing the screen."""
+    game.frame.invalidate()
+    game.dirty.mark_all()
+
+
+def cursor_move(game: Game) -> None:
+    """Move the selected square one column, as on an arrow key press."""
+    old_col = game.selected_col
+    game.selected_col = (old_col + 1) % len(game)
+    game.update_block(game.selected_row, old_col)
+    game.update_block(game.selected_row, game.selected_col)
+
+
+def fen_update(game: Game, fens: t.Iterator[str]) -> None:
+    """Switch to the next position, as on a move broadcast by the server."""
+    game.set_board(next(fens))
+
+
+def run(frames: int) -> dict:
+    """Paint `frames` frames of each kind and return the timings in milliseconds."""
+    game = make_game()
+    game.update_board()
+
+    def cycle_fens() -> t.Iterator[str]:
+        while True:
+            yield ChessGame.INITIAL_FEN
+            yield from FENS
+
+    fens = cycle_fens()
+    scenarios = {
+        "full_repaint": lambda: full_repaint(game),
+        "cursor_move": lambda: cursor_move(game),
+        "fen_update": lambda: fen_update(game, fens),
+    }
+    results = {}
+    for name, prepare in scenarios.items():
+        timings, sizes = [], []
+        for _ in range(frames):
+            elapsed, size = timed_frame(game, prepare)
+            timings.append(elapsed * 1000)
+            sizes.append(size)
+        timings.sort()
+        results[name] = {
+            "mean_ms": statistics.fmean(timings),
+            "p50_ms": timings[len(timings) // 2],
+            "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            "mean_bytes": statistics.fmean(sizes),
+        }
+    return results
+
+
+def main() -> None:
+    """Run the paint benchmark and print a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--frames", type=int, default=200, help="frames per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<14}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'bytes':>10}")
+    for name, result in run(args.frames).items():
+        print(
+            f"{name:<14}{result['mean_ms']:>10.3f}{result['p50_ms']:>10.3f}"
+            f"{result['p99_ms']:>10.3f}{result['mean_bytes']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
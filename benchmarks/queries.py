@@ -0,0 +1,133 @@
+"""
+Game lookups on a table of millions of finished games, with and without the indexes.
+
+    python -m benchmarks.queries --games 2000000
+    python -m benchmarks.queries --database-url postgresql://...@localhost/bench
+
+A database given with --database-url is filled on the first run and reused by the
+next ones. The indexes of `api.models.game.Game` are dropped for the first
+measurements, then recreated.
+"""
+
+import argparse
+import random
+import statistics
+import time
+import typing as t
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from benchmarks.micro import configure_api
+
+# a random player of a finished game has played this many on average
+GAMES_PER_PLAYER = 20
+# stored as the board of every game, a row is then about as wide as a real one
+BOARD = "r1bqkb1r/pppp1Qpp/2n2n2/4p3/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 4"
+
+
+def fill(db: Session, games: int, ongoing: int, chunk: int = 50_000) -> None:
+    """Insert `games` finished games then `ongoing` ongoing ones, half of them open."""
+    from api.models import Game
+
+    players = max(2, games // GAMES_PER_PLAYER)
+    rng = random.Random(0)
+    for start in range(0, games + ongoing, chunk):
+        rows = []
+        for game_id in range(start + 1, min(start + chunk, games + ongoing) + 1):
+            finished = game_id <= games
+            player_one, player_two = rng.sample(range(1, players + 1), 2)
+            if not finished and game_id % 2:
+                player_two = 0
+            rows.append(
+                {
+                    "game_id": game_id,
+                    "is_ongoing": not finished,
+                    "winner_id": player_one if finished else 0,
+                    "player_one_id": player_one,
+                    "player_two_id": player_two,
+                    "board": BOARD,
+                    "ply": 0,
+                }
+            )
+        db.execute(Game.__table__.insert(), rows)
+        db.commit()
+
+
+def measure(func: t.Callable[[], t.Any], repeat: int) -> float:
+    """Median seconds a call of `func` takes."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def lookups(db: Session, games: int, ongoing: int) -> dict:
+    """The lookups the API makes, on a player with finished games and one playing."""
+    from api.crud import game
+    from api.models import Game
+
+    idle = db.query(Game.player_one_id).filter(Game.game_id == 1).scalar()
+    playing = db.query(Game.player_one_id).filter(Game.game_id == games + 1).scalar()
+    return {
+        "player_already_in_game (idle)": lambda: game.player_already_in_game(
+            db, user_id=idle
+        ),
+        "player_already_in_game (playing)": lambda: game.player_already_in_game(
+            db, user_id=playing
+        ),
+        "get_open_games": lambda: game.get_open_games(db),
+        "get_by_game_id": lambda: game.get_by_game_id(
+            db, game_id=random.randint(1, games + ongoing)
+        ),
+    }
+
+
+def main() -> None:
+    """Fill the game table if needed, time the lookups without and with the indexes."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--games", type=int, default=2_000_000)
+    parser.add_argument("--ongoing", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--database-url", help="database to fill, default temporary SQLite"
+    )
+    args = parser.parse_args()
+
+    configure_api(args.database_url)
+    from api.db.base import Base
+    from api.db.session import SessionLocal, engine
+    from api.models import Game
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    if db.query(Game).count() != args.games + args.ongoing:
+        db.query(Game).delete()
+        print(f"inserting {args.games + args.ongoing:,} games...")
+        fill(db, args.games, args.ongoing)
+
+    queries = lookups(db, args.games, args.ongoing)
+    results = dict()
+    existing = {index["name"] for index in inspect(engine).get_indexes("game")}
+    for index in Game.__table__.indexes:
+        if index.name in existing:
+            index.drop(engine)
+    for name, func in queries.items():
+        results[name] = [measure(func, args.repeat)]
+    for index in Game.__table__.indexes:
+        index.create(engine)
+    for name, func in queries.items():
+        results[name].append(measure(func, args.repeat))
+
+    print(f"{'lookup':<36}{'no index ms':>14}{'indexed ms':>14}{'speedup':>10}")
+    for name, (before, after) in results.items():
+        print(
+            f"{name:<36}{before * 1e3:>14.3f}{after * 1e3:>14.3f}"
+            f"{before / after:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
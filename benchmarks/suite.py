@@ -0,0 +1,113 @@
+"""Registry, runner and baseline comparison of the micro-benchmarks."""
+
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import time
+import typing as t
+from datetime import datetime, timezone
+
+# name -> setup function returning the callable (or coroutine function) to time
+BENCHMARKS: dict[str, t.Callable[[], t.Callable]] = {}
+
+
+def benchmark(name: str) -> t.Callable:
+    """Register a benchmark, the decorated function sets up and returns what to time."""
+
+    def decorator(setup: t.Callable[[], t.Callable]) -> t.Callable[[], t.Callable]:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def _timer(func: t.Callable) -> t.Callable[[int], float]:
+    """Return a function timing `number` calls of `func`, awaited if coroutines."""
+    if inspect.iscoroutinefunction(func):
+        loop = asyncio.new_event_loop()
+
+        async def calls(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                await func()
+            return time.perf_counter() - start
+
+        return lambda number: loop.run_until_complete(calls(number))
+
+    def timer(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+
+    return timer
+
+
+def measure(func: t.Callable, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Time `func` and return per call statistics in seconds.
+
+    The number of calls per repeat is calibrated so that a repeat takes at least
+    `min_time` seconds, the fastest repeat is the most stable figure to compare.
+    """
+    timer = _timer(func)
+    number = 1
+    while (elapsed := timer(number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = sorted(
+        [elapsed / number] + [timer(number) / number for _ in range(repeat - 1)]
+    )
+    return {
+        "min_s": per_call[0],
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(names: t.Optional[t.Iterable[str]] = None, **kwargs) -> dict:
+    """Run the benchmarks called `names`, or all of them, and return the results."""
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = measure(BENCHMARKS[name](), **kwargs)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    """
+    Compare the fastest per call time of every benchmark to the baseline.
+
+    Returns name -> ratio of new to baseline time, for the benchmarks which
+    got slower by more than `threshold` (e.g. 0.1 for 10%).
+    """
+    regressions = {}
+    for name, result in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = result["min_s"] / old["min_s"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def save(results: dict, path: str) -> None:
+    """Write a results document as JSON."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+
+
+def load(path: str) -> dict:
+    """Read a results document written by `save`."""
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
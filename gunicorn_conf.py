@@ -4,6 +4,9 @@ import json
 import multiprocessing
 import os
 
+from gunicorn.arbiter import Arbiter
+from gunicorn.workers.base import Worker
+
 use_max_workers = int(os.getenv("MAX_WORKERS", "0"))
 web_concurrency = int(os.getenv("WEB_CONCURRENCY", "0"))
 workers_per_core = float(os.getenv("WORKERS_PER_CORE", "1"))
@@ -33,6 +36,13 @@ secure_scheme_headers = {
     "X-FORWARDED-SSL": "on",
 }
 
+
+def post_fork(server: Arbiter, worker: Worker) -> None:
+    """Give every worker its own ID, which goes into the IDs of the games it makes."""
+    worker_id_offset = int(os.getenv("WORKER_ID_OFFSET", "0"))
+    os.environ["WORKER_ID"] = str((worker_id_offset + worker.age) % 1024)
+
+
 # For debugging and testing
 log_data = {
     "loglevel": loglevel,